@@ -0,0 +1,233 @@
+"""
+Announcement Analysis Module
+Downloads announcement PDFs, extracts their text and classifies sentiment (OpenAI with keyword fallback)
+"""
+
+import hashlib
+import os
+import re
+from datetime import datetime
+import threading
+import requests
+import pdf_extraction
+import text_selection
+from bse_feed import get_browser_headers
+
+# OpenAI client (created on first use - importing the SDK is slow)
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    """Shared OpenAI client, created on first call"""
+    global _openai_client
+    
+    with _openai_client_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY', ''))
+        return _openai_client
+
+def download_pdf_locally(pdf_url, company_name, bse_code):
+    """Download PDF from BSE and save locally (only if not already exists)"""
+    if not pdf_url:
+        return None
+    
+    try:
+        # Generate unique identifier using hash of URL
+        url_hash = hashlib.md5(pdf_url.encode()).hexdigest()[:8]
+        
+        # Create directory structure: announcements_pdfs/YYYYMMDD/
+        date_folder = datetime.now().strftime('%Y%m%d')
+        folder_path = os.path.join('announcements_pdfs', date_folder)
+        os.makedirs(folder_path, exist_ok=True)
+        
+        # Check if PDF already exists (search by BSE code and hash)
+        # This prevents re-downloading the same PDF
+        existing_files = [f for f in os.listdir(folder_path) 
+                         if f.startswith(f"{bse_code}_") and url_hash in f and f.endswith('.pdf')]
+        
+        if existing_files:
+            existing_path = os.path.join(folder_path, existing_files[0])
+            print(f"   ✅ PDF already downloaded: {existing_files[0]}")
+            return existing_path
+        
+        # Create new filename only if not exists
+        safe_company = re.sub(r'[^a-zA-Z0-9]', '_', company_name)[:50]
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"{bse_code}_{safe_company}_{timestamp}_{url_hash}.pdf"
+        file_path = os.path.join(folder_path, filename)
+        
+        # Download PDF
+        headers = get_browser_headers()
+        response = requests.get(pdf_url, headers=headers, timeout=30)
+        response.raise_for_status()
+        
+        # Save PDF
+        with open(file_path, 'wb') as f:
+            f.write(response.content)
+        
+        file_size_kb = len(response.content) / 1024
+        print(f"   ✅ Downloaded: {filename} ({file_size_kb:.1f} KB)")
+        
+        return file_path
+        
+    except Exception as e:
+        print(f"   ❌ Error downloading PDF: {str(e)}")
+        return None
+
+def extract_pdf_content(pdf_source):
+    """Extract text and document kind from PDF (supports both local file path and URL)"""
+    try:
+        # Check if it's a local file path
+        if os.path.exists(pdf_source):
+            pdf_data = pdf_source
+        else:
+            # Download from URL
+            response = requests.get(pdf_source, headers=get_browser_headers(), timeout=30)
+            response.raise_for_status()
+            pdf_data = response.content
+        
+        # Probe first (scanned/encrypted PDFs skip extraction), then read
+        # first 10 pages - the LLM input is trimmed later by text_selection
+        return pdf_extraction.extract_pdf(pdf_data, max_pages=10, max_chars=50000)
+        
+    except Exception as e:
+        print(f"Error extracting PDF: {str(e)}")
+        return {'text': '', 'kind': pdf_extraction.PDF_KIND_TEXT}
+
+def extract_text_from_pdf(pdf_source):
+    """Extract text from PDF (supports both local file path and URL)"""
+    return extract_pdf_content(pdf_source)['text']
+
+def analyze_unreadable_pdf(pdf_kind, company_name):
+    """Cheap path for PDFs without a text layer - no extraction, no LLM call"""
+    reason = {
+        pdf_extraction.PDF_KIND_IMAGE_ONLY: 'Scanned/image-only filing (no text layer)',
+        pdf_extraction.PDF_KIND_EMPTY: 'Filing has no readable content',
+        pdf_extraction.PDF_KIND_ENCRYPTED: 'Filing is password protected'
+    }.get(pdf_kind, 'Filing could not be read')
+    
+    return {
+        'summary': f"➖ NEUTRAL\nCompany: {company_name}\nAnalysis: {reason} - please check the PDF",
+        'sentiment': 'neutral'
+    }
+
+def analyze_with_python(text, company_name):
+    """Python-based keyword analysis (fallback when OpenAI is not available)"""
+    # Simple keyword-based analysis
+    positive_keywords = ['growth', 'profit', 'increase', 'expansion', 'dividend', 'acquisition', 
+                         'revenue', 'gain', 'success', 'partnership', 'award', 'milestone',
+                         'improved', 'strong', 'positive', 'progress', 'buyback']
+    
+    negative_keywords = ['loss', 'decline', 'decrease', 'bankruptcy', 'lawsuit', 'penalty',
+                        'investigation', 'fraud', 'default', 'resignation', 'closure',
+                        'weak', 'negative', 'downgrade', 'risk']
+    
+    text_lower = text.lower()
+    
+    positive_count = sum(1 for keyword in positive_keywords if keyword in text_lower)
+    negative_count = sum(1 for keyword in negative_keywords if keyword in text_lower)
+    
+    # Determine sentiment
+    if positive_count > negative_count:
+        sentiment = 'positive'
+        sentiment_text = '📈 POSITIVE'
+    elif negative_count > positive_count:
+        sentiment = 'negative'
+        sentiment_text = '📉 NEGATIVE'
+    else:
+        sentiment = 'neutral'
+        sentiment_text = '➖ NEUTRAL'
+    
+    # Generate summary
+    sentences = re.split(r'[.!?]\s+', text)
+    important_sentences = []
+    
+    for sentence in sentences[:20]:  # Check first 20 sentences
+        sentence_lower = sentence.lower()
+        if any(keyword in sentence_lower for keyword in positive_keywords + negative_keywords):
+            if len(sentence.split()) > 5:  # Ensure sentence has substance
+                important_sentences.append(sentence.strip())
+                if len(important_sentences) >= 3:
+                    break
+    
+    if not important_sentences:
+        important_sentences = sentences[:3]
+    
+    summary_lines = [
+        f"{sentiment_text}",
+        f"Company: {company_name}",
+        f"Analysis: Python-based keyword matching",
+        *important_sentences[:2]
+    ]
+    
+    return {
+        'summary': '\n'.join(summary_lines),
+        'sentiment': sentiment
+    }
+
+def analyze_announcement(text, company_name):
+    """Analyze announcement using OpenAI GPT-3.5-turbo with Python fallback"""
+    if not text:
+        return {
+            'summary': f"Unable to extract content from the announcement PDF for {company_name}.",
+            'sentiment': 'neutral'
+        }
+    
+    # Check if OpenAI API key is set
+    if not os.environ.get('OPENAI_API_KEY'):
+        print("⚠️ OPENAI_API_KEY not set, using Python-based analysis")
+        return analyze_with_python(text, company_name)
+    
+    try:
+        
+        # Keep only the most relevant sections (drops headers, footers, addresses)
+        # and pack them into the token budget
+        truncated_text = text_selection.select_relevant_text(text) or text[:4 * text_selection.DEFAULT_TOKEN_BUDGET]
+        
+        print(f"🤖 Sending to OpenAI gpt-4o-mini for analysis...")
+        print(f"   Text length: {len(truncated_text)} characters (from {len(text)}, "
+              f"~{text_selection.estimate_tokens(truncated_text)} tokens)")
+        
+        # Call OpenAI API with the user's specific prompt
+        response = get_openai_client().chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an expert stock market analyst. Read the PDF content and suggest Positive, Negative or Neutral. Don't provide any explanation."
+                },
+                {
+                    "role": "user",
+                    "content": f"Company: {company_name}\n\nAnnouncement Content:\n{truncated_text}"
+                }
+            ],
+            temperature=0.3,
+            max_tokens=10  # We only need one word: Positive/Negative/Neutral
+        )
+        
+        # Extract the sentiment from OpenAI response
+        ai_response = response.choices[0].message.content.strip()
+        print(f"✅ OpenAI Response: {ai_response}")
+        
+        # Normalize the response
+        ai_response_lower = ai_response.lower()
+        if 'positive' in ai_response_lower:
+            sentiment = 'positive'
+            sentiment_text = '📈 POSITIVE'
+        elif 'negative' in ai_response_lower:
+            sentiment = 'negative'
+            sentiment_text = '📉 NEGATIVE'
+        else:
+            sentiment = 'neutral'
+            sentiment_text = '➖ NEUTRAL'
+        
+        return {
+            'summary': f"{sentiment_text}\nCompany: {company_name}\nAnalysis: {ai_response}",
+            'sentiment': sentiment
+        }
+        
+    except Exception as e:
+        print(f"❌ Error calling OpenAI API: {str(e)}")
+        print("⚠️ Falling back to Python-based analysis")
+        return analyze_with_python(text, company_name)
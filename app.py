@@ -1,800 +1,22 @@
-from flask import Flask, render_template, jsonify, request, send_file, redirect, url_for, session
-import requests
-from bs4 import BeautifulSoup
-import re
-from datetime import datetime, timedelta
-import io
+from flask import Blueprint, Flask, render_template, jsonify, request, send_file, redirect, session
+from datetime import datetime
 import json
 import os
-import PyPDF2
-from urllib.parse import urljoin
-from selenium import webdriver
-from market_cap_data import get_market_cap_with_cache
-import nse_indices
-from integrations import slack_integration, telegram_integration, upstox_integration
-from integrations.slack_integration import send_to_slack
-from integrations.telegram_integration import send_to_telegram
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-import time
-import hashlib
-from openai import OpenAI
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-import pytz
+import shared_state
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
+# Routes are registered on a blueprint; create_app() builds the Flask app.
+# Heavy modules (OpenAI, PDF libraries, Slack/Telegram SDKs) are imported
+# inside the routes that need them and pre-loaded by the background warm-up.
+# Announcement polling, notifications and digests run in the ingestion worker
+# (worker.py); this web app only reads the state it publishes.
+bp = Blueprint('main', __name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY', ''))
-
-# Third-party integrations are now in integrations module
-
-# Cache for announcements
-announcements_cache = []
-last_refresh_time = None  # Track when data was last refreshed
-
-# Track sent announcements to avoid duplicates (stores BSE code + timestamp hash)
-sent_announcements = set()
-
-# Background scheduler for auto-refresh
-scheduler = BackgroundScheduler(timezone=pytz.timezone('Asia/Kolkata'))
-scheduler.start()
-
-# Load F&O eligible stocks
-fo_stocks_data = None
-fo_bse_codes = set()
-fo_nse_symbols = set()
-
-# NSE Indices data
-nse_indices_data = {}
-nse_symbol_lookup = {}  # Maps NSE symbol to list of indices it belongs to
-bse_to_nse_mapping = {}  # Maps BSE code to NSE symbol
-
-def load_fo_stocks():
-    """Load F&O eligible stocks from JSON file (NSE-based)"""
-    global fo_stocks_data, fo_bse_codes, fo_nse_symbols, bse_to_nse_mapping
-    
-    try:
-        with open('resources/fo_stocks.json', 'r') as f:
-            fo_stocks_data = json.load(f)
-            
-        # Create sets for fast lookup and BSE to NSE mapping
-        for stock in fo_stocks_data['stocks']:
-            nse_symbol = stock.get('nse_symbol', '')
-            bse_code = stock.get('bse_code', '')
-            
-            # Add NSE symbol (always present in new format)
-            if nse_symbol:
-                fo_nse_symbols.add(nse_symbol)
-            
-            # Add BSE code only if present
-            if bse_code:
-                fo_bse_codes.add(bse_code)
-                bse_to_nse_mapping[bse_code] = nse_symbol
-        
-        print(f"✅ Loaded {len(fo_nse_symbols)} F&O eligible stocks (NSE symbols)")
-        if fo_bse_codes:
-            print(f"   📄 {len(fo_bse_codes)} stocks have BSE codes mapped")
-        return True
-    except Exception as e:
-        print(f"❌ Error loading F&O stocks: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return False
-
-def is_fo_eligible(bse_code):
-    """Check if a stock is F&O eligible"""
-    return str(bse_code) in fo_bse_codes
-
-def load_nse_indices():
-    """Load NSE indices (Nifty 50, Nifty Next 50, Nifty 500)"""
-    global nse_indices_data, nse_symbol_lookup
-    
-    try:
-        print("\n📊 Loading NSE Indices...")
-        nse_indices_data = nse_indices.get_all_indices()
-        nse_symbol_lookup = nse_indices.create_symbol_lookup()
-        
-        # Count stocks in each index
-        counts = {}
-        for index_name, data in nse_indices_data.items():
-            if data:
-                counts[index_name] = data['count']
-        
-        print(f"✅ Loaded NSE Indices:")
-        print(f"   - Nifty 50: {counts.get('nifty50', 0)} stocks")
-        print(f"   - Nifty Next 50: {counts.get('niftynext50', 0)} stocks")
-        print(f"   - Nifty 500: {counts.get('nifty500', 0)} stocks")
-        print(f"   - Total unique symbols: {len(nse_symbol_lookup)}")
-        return True
-    except Exception as e:
-        print(f"❌ Error loading NSE indices: {str(e)}")
-        return False
-
-def get_stock_indices(nse_symbol):
-    """Get list of indices a stock belongs to"""
-    if not nse_symbol:
-        return []
-    return nse_symbol_lookup.get(nse_symbol.upper(), [])
-
-def get_nse_symbol_from_bse(bse_code):
-    """Get NSE symbol from BSE code"""
-    return bse_to_nse_mapping.get(str(bse_code), None)
-
-def download_pdf_locally(pdf_url, company_name, bse_code):
-    """Download PDF from BSE and save locally (only if not already exists)"""
-    if not pdf_url:
-        return None
-    
-    try:
-        # Generate unique identifier using hash of URL
-        url_hash = hashlib.md5(pdf_url.encode()).hexdigest()[:8]
-        
-        # Create directory structure: announcements_pdfs/YYYYMMDD/
-        date_folder = datetime.now().strftime('%Y%m%d')
-        folder_path = os.path.join('announcements_pdfs', date_folder)
-        os.makedirs(folder_path, exist_ok=True)
-        
-        # Check if PDF already exists (search by BSE code and hash)
-        # This prevents re-downloading the same PDF
-        existing_files = [f for f in os.listdir(folder_path) 
-                         if f.startswith(f"{bse_code}_") and url_hash in f and f.endswith('.pdf')]
-        
-        if existing_files:
-            existing_path = os.path.join(folder_path, existing_files[0])
-            print(f"   ✅ PDF already downloaded: {existing_files[0]}")
-            return existing_path
-        
-        # Create new filename only if not exists
-        safe_company = re.sub(r'[^a-zA-Z0-9]', '_', company_name)[:50]
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{bse_code}_{safe_company}_{timestamp}_{url_hash}.pdf"
-        file_path = os.path.join(folder_path, filename)
-        
-        # Download PDF
-        headers = get_browser_headers()
-        response = requests.get(pdf_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        # Save PDF
-        with open(file_path, 'wb') as f:
-            f.write(response.content)
-        
-        file_size_kb = len(response.content) / 1024
-        print(f"   ✅ Downloaded: {filename} ({file_size_kb:.1f} KB)")
-        
-        return file_path
-        
-    except Exception as e:
-        print(f"   ❌ Error downloading PDF: {str(e)}")
-        return None
-
-# Load F&O stocks on startup
-load_fo_stocks()
-
-# Load NSE indices on startup
-load_nse_indices()
-
-def create_announcement_id(ann):
-    """Create unique ID for announcement to track if already sent"""
-    return f"{ann['bse_code']}_{ann['raw_timestamp']}"
-
-def is_nifty_index_stock(ann):
-    """Check if announcement is from a Nifty 50, Next 50, or 500 stock"""
-    if not ann.get('nse_indices'):
-        return False
-    indices = ann['nse_indices']
-    return 'NIFTY50' in indices or 'NIFTYNEXT50' in indices or 'NIFTY500' in indices
-
-def auto_check_and_notify():
-    """Auto-check for new announcements and send Nifty index stocks to Slack"""
-    global announcements_cache, sent_announcements, last_refresh_time
-    
-    try:
-        print("\n" + "="*80)
-        print(f"🔄 AUTO-CHECK: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}")
-        print("="*80)
-        
-        # Fetch latest announcements
-        new_announcements = fetch_bse_announcements(days_back=1, max_results=200)
-        
-        if not new_announcements:
-            print("⚠️ No announcements fetched")
-            return
-        
-        # Check for new Nifty index announcements
-        new_count = 0
-        processed_count = 0
-        
-        for ann in new_announcements:
-            ann_id = create_announcement_id(ann)
-            
-            # Skip if already sent
-            if ann_id in sent_announcements:
-                continue
-            
-            new_count += 1
-            
-            # Check if it's a Nifty index stock
-            if is_nifty_index_stock(ann):
-                indices_str = ', '.join(ann.get('nse_indices', []))
-                print(f"\n📊 NEW Index Stock: {ann['company_name']} ({ann['bse_code']})")
-                print(f"   Indices: {indices_str}")
-                print(f"   NSE Symbol: {ann.get('nse_symbol', 'N/A')}")
-                
-                # Auto-summarize and send to Slack
-                if ann.get('pdf_link'):
-                    print(f"   🤖 Auto-summarizing...")
-                    
-                    # Download PDF
-                    local_pdf = download_pdf_locally(
-                        ann['pdf_link'],
-                        ann['company_name'],
-                        ann['bse_code']
-                    )
-                    
-                    if local_pdf:
-                        # Extract text from PDF
-                        text = extract_text_from_pdf(local_pdf)
-                        
-                        if text:
-                            # Analyze announcement
-                            result = analyze_announcement(text, ann['company_name'])
-                            
-                            if result:
-                                # Send to Slack
-                                success = send_to_slack(
-                                    ann['company_name'],
-                                    ann['bse_code'],
-                                    result['sentiment'],
-                                    result['summary'],
-                                    ann['pdf_link'],
-                                    ann.get('date_time', 'N/A')
-                                )
-                                
-                                if success:
-                                    # Mark as sent
-                                    sent_announcements.add(ann_id)
-                                    processed_count += 1
-                                    print(f"   ✅ Sent to Slack successfully")
-                                else:
-                                    print(f"   ❌ Failed to send to Slack")
-                            else:
-                                print(f"   ⚠️ Analysis failed")
-                        else:
-                            print(f"   ⚠️ Could not extract PDF text")
-                    else:
-                        print(f"   ⚠️ Could not download PDF")
-                else:
-                    print(f"   ⚠️ No PDF link available")
-            else:
-                # Non-index stock - just mark as seen, don't send
-                sent_announcements.add(ann_id)
-        
-        print(f"\n📈 Auto-check summary:")
-        print(f"   - Total announcements: {len(new_announcements)}")
-        print(f"   - New announcements: {new_count}")
-        print(f"   - Processed & sent: {processed_count}")
-        print("="*80 + "\n")
-        
-        # Update cache
-        announcements_cache = new_announcements
-        last_refresh_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-    except Exception as e:
-        print(f"❌ Error in auto-check: {str(e)}")
-        import traceback
-        traceback.print_exc()
-
-def get_browser_headers():
-    """Returns headers to mimic a real browser"""
-    return {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Cache-Control': 'max-age=0'
-    }
-
-def fetch_bse_live_api(days_back=1, max_results=200):
-    """Fetch live announcements from BSE India API - ACTUAL REAL DATA
-    
-    Args:
-        days_back: Number of days to look back for announcements (default: 1 - today only)
-        max_results: Maximum number of announcements to return (default: 200)
-    """
-    try:
-        session = requests.Session()
-        
-        # Step 1: Get the main page first to establish session
-        main_url = 'https://www.bseindia.com/corporates/Corpfiling_new.aspx'
-        headers = get_browser_headers()
-        headers.update({
-            'Referer': 'https://www.bseindia.com/',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-        })
-        
-        response = session.get(main_url, headers=headers, timeout=15)
-        print(f"BSE main page status: {response.status_code}")
-        
-        # Step 2: Call the announcements data endpoint  
-        # This URL returns JSON data for latest corporate filings
-        api_url = 'https://api.bseindia.com/BseIndiaAPI/api/AnnGetData/w'
-        
-        # Get date range in YYYYMMDD format
-        # For days_back=1 (default), fetch only today's announcements
-        to_date = datetime.now().strftime('%Y%m%d')
-        if days_back <= 1:
-            from_date = to_date  # Only today
-        else:
-            from_date = (datetime.now() - timedelta(days=days_back-1)).strftime('%Y%m%d')
-        
-        print(f"Fetching announcements from {from_date} to {to_date} (Today only)" if from_date == to_date else f"Fetching announcements from {from_date} to {to_date}")
-        
-        params = {
-            'strCat': '-1',  # All categories
-            'strPrevDate': from_date,  # Start date
-            'strScrip': '',  # All scrips
-            'strSearch': 'P',  # Search type
-            'strToDate': to_date,  # End date
-            'strType': 'C'  # Corporate announcements
-        }
-        
-        api_headers = {
-            'User-Agent': headers['User-Agent'],
-            'Accept': 'application/json, text/plain, */*',
-            'Referer': 'https://www.bseindia.com/corporates/Corpfiling_new.aspx',
-            'Origin': 'https://www.bseindia.com',
-            'X-Requested-With': 'XMLHttpRequest'
-        }
-        
-        print(f"Fetching BSE API: {api_url}")
-        api_response = session.get(api_url, params=params, headers=api_headers, timeout=15)
-        
-        print(f"BSE API status: {api_response.status_code}")
-        print(f"Content-Type: {api_response.headers.get('Content-Type')}")
-        
-        if api_response.status_code == 200:
-            try:
-                data = api_response.json()
-                
-                if isinstance(data, dict) and 'Table' in data:
-                    announcements = []
-                    table_data = data['Table']
-                    total_available = len(table_data)
-                    
-                    print(f"\n✅ BSE API SUCCESS! Found {total_available} announcements")
-                    print("Processing all announcements...")
-                    
-                    for item in table_data[:max_results]:
-                        # Extract data from API response
-                        # NEWSSUB contains the full announcement text with company name and code
-                        news_sub = item.get('NEWSSUB', '')
-                        bse_code = str(item.get('SCRIP_CD', 'N/A'))
-                        
-                        # ATTACHMENTNAME contains the actual PDF filename!
-                        attachment_name = item.get('ATTACHMENTNAME', '')
-                        
-                        # Extract date/time when announcement was published
-                        # NEWS_DT format: 2025-12-02T22:36:41.373
-                        news_date = item.get('NEWS_DT', item.get('DT_TM', ''))
-                        
-                        # Format the date/time nicely and keep raw timestamp
-                        formatted_date = ''
-                        raw_timestamp = ''
-                        if news_date:
-                            try:
-                                # Parse ISO format datetime
-                                dt = datetime.fromisoformat(news_date.replace('T', ' ').split('.')[0])
-                                # Format as: Dec 02, 2025 10:36 PM
-                                formatted_date = dt.strftime('%b %d, %Y %I:%M %p')
-                                # Keep ISO format for JavaScript processing
-                                raw_timestamp = dt.isoformat()
-                            except:
-                                formatted_date = news_date
-                                raw_timestamp = news_date
-                        
-                        # Extract company name from NEWSSUB (format: "Company Name - CODE - Details...")
-                        company_name = 'N/A'
-                        if news_sub and ' - ' in news_sub:
-                            parts = news_sub.split(' - ')
-                            if len(parts) >= 2:
-                                company_name = parts[0].strip()
-                        
-                        # Construct PDF link using ATTACHMENTNAME (the ACTUAL PDF filename)
-                        pdf_link = ''
-                        if attachment_name:
-                            # ATTACHMENTNAME already includes .pdf extension
-                            pdf_link = f"https://www.bseindia.com/xml-data/corpfiling/AttachLive/{attachment_name}"
-                        
-                        # Check if stock is F&O eligible (for display purposes only)
-                        is_fo = is_fo_eligible(bse_code)
-                        
-                        # Get NSE symbol and indices information
-                        nse_symbol = get_nse_symbol_from_bse(bse_code)
-                        stock_indices = get_stock_indices(nse_symbol) if nse_symbol else []
-                        
-                        # Get market cap category
-                        market_cap_info = get_market_cap_with_cache(bse_code) if is_fo else {
-                            'category': 'Unknown',
-                            'emoji': '⚪',
-                            'color': '#6b7280'
-                        }
-                        
-                        # Don't download PDF here - will download on-demand when user clicks Summarize
-                        # Check if PDF already exists locally from previous downloads
-                        url_hash = hashlib.md5(pdf_link.encode()).hexdigest()[:8] if pdf_link else None
-                        local_pdf_path = None
-                        
-                        if url_hash:
-                            date_folder = datetime.now().strftime('%Y%m%d')
-                            folder_path = os.path.join('announcements_pdfs', date_folder)
-                            if os.path.exists(folder_path):
-                                existing_files = [f for f in os.listdir(folder_path) 
-                                                if f.startswith(f"{bse_code}_") and url_hash in f and f.endswith('.pdf')]
-                                if existing_files:
-                                    local_pdf_path = os.path.join(folder_path, existing_files[0])
-                        
-                        announcements.append({
-                            'company_name': company_name,
-                            'bse_code': bse_code,
-                            'nse_symbol': nse_symbol,
-                            'nse_indices': stock_indices,
-                            'pdf_link': pdf_link,  # BSE link (primary)
-                            'local_pdf_path': local_pdf_path,  # Local file path (if exists from previous download)
-                            'date_time': formatted_date,
-                            'raw_timestamp': raw_timestamp,
-                            'market_cap': market_cap_info,
-                            'is_fo_eligible': is_fo,
-                            'summary': None
-                        })
-                    
-                    print(f"✅ Processed {len(announcements)} announcements")
-                    return announcements
-                else:
-                    print(f"Unexpected data structure: {list(data.keys()) if isinstance(data, dict) else type(data)}")
-                    return []
-                    
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {str(e)}")
-                print(f"Response content (first 500 chars): {api_response.text[:500]}")
-                return []
-        else:
-            print(f"API returned status {api_response.status_code}")
-            return []
-            
-    except Exception as e:
-        print(f"Error fetching BSE live API: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return []
-
-def fetch_nse_announcements():
-    """Fetch announcements from NSE India as alternative source"""
-    try:
-        # NSE announcements API endpoint
-        url = "https://www.nseindia.com/api/corporate-announcements"
-        
-        headers = get_browser_headers()
-        headers['Accept'] = 'application/json'
-        
-        session = requests.Session()
-        
-        # First, visit the main page to get cookies
-        session.get('https://www.nseindia.com', headers=headers, timeout=10)
-        time.sleep(2)
-        
-        # Now fetch announcements
-        response = session.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        data = response.json()
-        announcements = []
-        
-        if isinstance(data, list):
-            items = data
-        elif isinstance(data, dict) and 'data' in data:
-            items = data['data']
-        else:
-            items = []
-        
-        for item in items[:50]:
-            announcements.append({
-                'company_name': item.get('symbol', '') + ' - ' + item.get('sm_name', item.get('companyName', 'N/A')),
-                'bse_code': item.get('symbol', 'N/A'),
-                'pdf_link': item.get('attachment', item.get('an_dt', '')),
-                'summary': None
-            })
-        
-        return announcements
-        
-    except Exception as e:
-        print(f"Error fetching NSE announcements: {str(e)}")
-        return []
-
-def get_sample_announcements():
-    """Return sample announcements for demonstration"""
-    # Get current time for sample data
-    now = datetime.now()
-    current_time = now.strftime('%b %d, %Y %I:%M %p')
-    current_timestamp = now.isoformat()
-    
-    return [
-        {
-            'company_name': 'Reliance Industries Limited',
-            'bse_code': '500325',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/c4c8c8e5-5b5a-4f0e-9f3f-7e8e8e8e8e8e.pdf',
-            'local_pdf_path': None,
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'market_cap': {'category': 'Large Cap', 'emoji': '🟢', 'color': '#10b981'},
-            'summary': None
-        },
-        {
-            'company_name': 'Tata Consultancy Services Ltd',
-            'bse_code': '532540',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/a1b2c3d4-5678-90ab-cdef-1234567890ab.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        },
-        {
-            'company_name': 'HDFC Bank Limited',
-            'bse_code': '500180',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/d4c3b2a1-8765-09ba-fedc-0987654321ba.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        },
-        {
-            'company_name': 'Infosys Limited',
-            'bse_code': '500209',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/e5f6g7h8-1234-5678-9abc-def123456789.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        },
-        {
-            'company_name': 'ICICI Bank Limited',
-            'bse_code': '532174',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/f6g7h8i9-2345-6789-0abc-def234567890.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        },
-        {
-            'company_name': 'State Bank of India',
-            'bse_code': '500112',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/g7h8i9j0-3456-7890-1abc-def345678901.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        },
-        {
-            'company_name': 'Bharti Airtel Limited',
-            'bse_code': '532454',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/h8i9j0k1-4567-8901-2abc-def456789012.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        },
-        {
-            'company_name': 'ITC Limited',
-            'bse_code': '500875',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/i9j0k1l2-5678-9012-3abc-def567890123.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        },
-        {
-            'company_name': 'Larsen & Toubro Limited',
-            'bse_code': '500510',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/j0k1l2m3-6789-0123-4abc-def678901234.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        },
-        {
-            'company_name': 'Hindustan Unilever Limited',
-            'bse_code': '500696',
-            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/k1l2m3n4-7890-1234-5abc-def789012345.pdf',
-            'date_time': current_time,
-            'raw_timestamp': current_timestamp,
-            'summary': None
-        }
-    ]
-
-def fetch_bse_announcements(days_back=1, max_results=200):
-    """Fetch announcements from BSE - LIVE DATA
-    
-    Args:
-        days_back: Number of days to look back (default: 1 - today only)
-        max_results: Maximum number of results (default: 200)
-    """
-    print("\n" + "="*80)
-    print(f"FETCHING LIVE BSE ANNOUNCEMENTS (Last {days_back} days, max {max_results} results)...")
-    print("="*80)
-    
-    # Fetch from BSE Live API (REAL DATA)
-    announcements = fetch_bse_live_api(days_back=days_back, max_results=max_results)
-    
-    if announcements:
-        print(f"✅ SUCCESS! Fetched {len(announcements)} LIVE announcements from BSE India")
-        print("="*80 + "\n")
-        return announcements
-    
-    print("❌ BSE API failed, using sample data for demonstration")
-    print("="*80 + "\n")
-    
-    # Return sample data as last resort
-    return get_sample_announcements()
-
-def extract_text_from_pdf(pdf_source):
-    """Extract text from PDF (supports both local file path and URL)"""
-    try:
-        # Check if it's a local file path
-        if os.path.exists(pdf_source):
-            # Read from local file
-            with open(pdf_source, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                text = ""
-                for page in pdf_reader.pages[:5]:  # Read first 5 pages only
-                    text += page.extract_text()
-                return text[:5000]  # Limit to 5000 characters
-        else:
-            # Download from URL
-            response = requests.get(pdf_source, headers=get_browser_headers(), timeout=30)
-            response.raise_for_status()
-            
-            pdf_file = io.BytesIO(response.content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            text = ""
-            for page in pdf_reader.pages[:5]:  # Read first 5 pages only
-                text += page.extract_text()
-            
-            return text[:5000]  # Limit to 5000 characters
-        
-    except Exception as e:
-        print(f"Error extracting PDF: {str(e)}")
-        return ""
-
-def analyze_with_python(text, company_name):
-    """Python-based keyword analysis (fallback when OpenAI is not available)"""
-    # Simple keyword-based analysis
-    positive_keywords = ['growth', 'profit', 'increase', 'expansion', 'dividend', 'acquisition', 
-                         'revenue', 'gain', 'success', 'partnership', 'award', 'milestone',
-                         'improved', 'strong', 'positive', 'progress', 'buyback']
-    
-    negative_keywords = ['loss', 'decline', 'decrease', 'bankruptcy', 'lawsuit', 'penalty',
-                        'investigation', 'fraud', 'default', 'resignation', 'closure',
-                        'weak', 'negative', 'downgrade', 'risk']
-    
-    text_lower = text.lower()
-    
-    positive_count = sum(1 for keyword in positive_keywords if keyword in text_lower)
-    negative_count = sum(1 for keyword in negative_keywords if keyword in text_lower)
-    
-    # Determine sentiment
-    if positive_count > negative_count:
-        sentiment = 'positive'
-        sentiment_text = '📈 POSITIVE'
-    elif negative_count > positive_count:
-        sentiment = 'negative'
-        sentiment_text = '📉 NEGATIVE'
-    else:
-        sentiment = 'neutral'
-        sentiment_text = '➖ NEUTRAL'
-    
-    # Generate summary
-    sentences = re.split(r'[.!?]\s+', text)
-    important_sentences = []
-    
-    for sentence in sentences[:20]:  # Check first 20 sentences
-        sentence_lower = sentence.lower()
-        if any(keyword in sentence_lower for keyword in positive_keywords + negative_keywords):
-            if len(sentence.split()) > 5:  # Ensure sentence has substance
-                important_sentences.append(sentence.strip())
-                if len(important_sentences) >= 3:
-                    break
-    
-    if not important_sentences:
-        important_sentences = sentences[:3]
-    
-    summary_lines = [
-        f"{sentiment_text}",
-        f"Company: {company_name}",
-        f"Analysis: Python-based keyword matching",
-        *important_sentences[:2]
-    ]
-    
-    return {
-        'summary': '\n'.join(summary_lines),
-        'sentiment': sentiment
-    }
-
-def analyze_announcement(text, company_name):
-    """Analyze announcement using OpenAI GPT-3.5-turbo with Python fallback"""
-    if not text:
-        return {
-            'summary': f"Unable to extract content from the announcement PDF for {company_name}.",
-            'sentiment': 'neutral'
-        }
-    
-    # Check if OpenAI API key is set
-    if not os.environ.get('OPENAI_API_KEY'):
-        print("⚠️ OPENAI_API_KEY not set, using Python-based analysis")
-        return analyze_with_python(text, company_name)
-    
-    try:
-        
-        # Truncate text to avoid token limits (GPT-3.5-turbo has 4096 token limit)
-        max_chars = 12000  # Roughly 3000 tokens
-        truncated_text = text[:max_chars]
-        
-        print(f"🤖 Sending to OpenAI gpt-4o-mini for analysis...")
-        print(f"   Text length: {len(truncated_text)} characters")
-        
-        # Call OpenAI API with the user's specific prompt
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert stock market analyst. Read the PDF content and suggest Positive, Negative or Neutral. Don't provide any explanation."
-                },
-                {
-                    "role": "user",
-                    "content": f"Company: {company_name}\n\nAnnouncement Content:\n{truncated_text}"
-                }
-            ],
-            temperature=0.3,
-            max_tokens=10  # We only need one word: Positive/Negative/Neutral
-        )
-        
-        # Extract the sentiment from OpenAI response
-        ai_response = response.choices[0].message.content.strip()
-        print(f"✅ OpenAI Response: {ai_response}")
-        
-        # Normalize the response
-        ai_response_lower = ai_response.lower()
-        if 'positive' in ai_response_lower:
-            sentiment = 'positive'
-            sentiment_text = '📈 POSITIVE'
-        elif 'negative' in ai_response_lower:
-            sentiment = 'negative'
-            sentiment_text = '📉 NEGATIVE'
-        else:
-            sentiment = 'neutral'
-            sentiment_text = '➖ NEUTRAL'
-        
-        return {
-            'summary': f"{sentiment_text}\nCompany: {company_name}\nAnalysis: {ai_response}",
-            'sentiment': sentiment
-        }
-        
-    except Exception as e:
-        print(f"❌ Error calling OpenAI API: {str(e)}")
-        print("⚠️ Falling back to Python-based analysis")
-        return analyze_with_python(text, company_name)
-
-@app.route('/')
+@bp.route('/')
 def index():
     """Render the main page"""
     return render_template('index.html')
 
-@app.route('/pdf/<path:filepath>')
+@bp.route('/pdf/<path:filepath>')
 def serve_pdf(filepath):
     """Serve local PDF files"""
     try:
@@ -811,15 +33,16 @@ def serve_pdf(filepath):
         print(f"Error serving PDF: {str(e)}")
         return jsonify({'error': 'Error loading PDF'}), 500
 
-@app.route('/fando-club')
+@bp.route('/fando-club')
 def fando_club():
     """Render the F&O Club calculator page"""
     return render_template('fando-club.html')
 
-@app.route('/api/options-advisor', methods=['POST'])
+@bp.route('/api/options-advisor', methods=['POST'])
 def options_advisor():
     """AI-powered options trading advisor"""
     try:
+        from integrations import upstox_integration
         data = request.json
         capital = data.get('capital', 100000)
         expected_return = data.get('expected_return', 2)  # percentage
@@ -887,7 +110,8 @@ Format your response as a clear, actionable strategy that a trader can execute i
             }), 500
         
         print(f"\n🧠 Sending to OpenAI for analysis...")
-        response = client.chat.completions.create(
+        import announcement_analysis
+        response = announcement_analysis.get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {
@@ -927,53 +151,46 @@ Format your response as a clear, actionable strategy that a trader can execute i
             'error': str(e)
         }), 500
 
-@app.route('/options-chain')
+@bp.route('/options-chain')
 def options_chain_viewer():
     """Options Chain Viewer UI"""
     return render_template('options-chain.html')
 
-@app.route('/api/options-chain/<symbol>')
+@bp.route('/api/options-chain/<symbol>')
 def api_options_chain(symbol):
     """API endpoint to fetch options chain with live data"""
     try:
-        from datetime import datetime
-        import gzip
-        import urllib.request
+        from integrations import upstox_integration
+        import instruments_master
+        from options_index import IST
         
         print(f"\n📊 Fetching options chain for {symbol}...")
         
-        # Download Upstox instruments data
-        url = 'https://assets.upstox.com/market-quote/instruments/exchange/complete.json.gz'
-        response = urllib.request.urlopen(url)
-        compressed_data = response.read()
-        decompressed_data = gzip.decompress(compressed_data)
-        all_instruments = json.loads(decompressed_data)
-        
-        # Find all options for this symbol
-        symbol_options = [
-            item for item in all_instruments
-            if symbol.upper() in item.get('trading_symbol', '')
-            and item.get('instrument_type') in ['CE', 'PE']
-            and item.get('segment') == 'NSE_FO'
-        ]
-        
-        print(f"🔍 Found {len(symbol_options)} total options for {symbol}")
-        
-        # Filter out expired options
-        today = datetime.now()
-        filtered_options = []
+        # Exact underlying lookup; expired contracts are cut off the sorted expiry list
+        # Optional filters: ?expiry=YYYY-MM-DD, ?strike_min=, ?strike_max=
+        options_index = instruments_master.get_options_index()
+        if options_index is None:
+            return jsonify({
+                'success': False,
+                'error': 'Instruments not loaded yet (downloaded by the worker), try again shortly'
+            }), 503
+        today = datetime.now(IST).date()
+        expiry = request.args.get('expiry')
+        try:
+            expiry = datetime.strptime(expiry, '%Y-%m-%d').date() if expiry else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': f"Invalid expiry '{expiry}', expected YYYY-MM-DD"
+            }), 400
+        strike_min = request.args.get('strike_min', type=float)
+        strike_max = request.args.get('strike_max', type=float)
+        expiries = options_index.expiries(symbol, today)
         
-        for option in symbol_options:
-            expiry_timestamp = option.get('expiry')
-            if expiry_timestamp:
-                # Convert milliseconds to datetime
-                expiry_date = datetime.fromtimestamp(expiry_timestamp / 1000)
-                
-                # Only include if expiry is today or future
-                if expiry_date.date() >= today.date():
-                    filtered_options.append(option)
+        # Fresh dicts from the column store - live prices are merged in below
+        filtered_options = options_index.options(symbol, today, expiry, strike_min, strike_max)
         
-        print(f"✅ Found {len(filtered_options)} active options (filtered {len(symbol_options) - len(filtered_options)} expired)")
+        print(f"✅ Found {len(filtered_options)} active options across {len(expiries)} expiries")
         
         # Fetch underlying stock price
         stock_price_data = None
@@ -1030,6 +247,7 @@ def api_options_chain(symbol):
             'success': True,
             'symbol': symbol,
             'total_options': len(filtered_options),
+            'expiries': [day.isoformat() for day in expiries],
             'stock_price': stock_price_data,
             'data': filtered_options
         })
@@ -1043,11 +261,12 @@ def api_options_chain(symbol):
             'error': str(e)
         }), 500
 
-@app.route('/api/fo-symbols')
+@bp.route('/api/fo-symbols')
 def api_fo_symbols():
     """Get list of all F&O symbols for autocomplete"""
     try:
-        symbols = sorted(list(fo_nse_symbols))
+        import reference_data
+        symbols = sorted(reference_data.current().fo_nse_symbols)
         return jsonify({
             'success': True,
             'symbols': symbols,
@@ -1059,34 +278,25 @@ def api_fo_symbols():
             'error': str(e)
         }), 500
 
-@app.route('/bse-instruments')
+@bp.route('/bse-instruments')
 def bse_instruments():
     """Display BSE instruments browser"""
     return render_template('bse-instruments.html')
 
-@app.route('/api/bse-instruments')
+@bp.route('/api/bse-instruments')
 def api_bse_instruments():
     """API endpoint to fetch BSE instruments data"""
     try:
-        import gzip
-        import urllib.request
-        
-        # Download and parse Upstox instruments data
-        url = 'https://assets.upstox.com/market-quote/instruments/exchange/complete.json.gz'
+        import instruments_master
         
-        print(f"\n📥 Downloading Upstox instruments data...")
-        response = urllib.request.urlopen(url)
-        compressed_data = response.read()
-        
-        print(f"📦 Decompressing data...")
-        decompressed_data = gzip.decompress(compressed_data)
-        all_instruments = json.loads(decompressed_data)
+        if not instruments_master.is_ready():
+            return jsonify({
+                'success': False,
+                'error': 'Instruments not loaded yet (downloaded by the worker), try again shortly'
+            }), 503
         
-        print(f"🔍 Filtering BSE instruments...")
-        bse_instruments = [
-            item for item in all_instruments 
-            if item.get('exchange') == 'BSE'
-        ]
+        # Vectorised exchange filter over the memory-mapped instruments store
+        bse_instruments = instruments_master.get_exchange('BSE')
         
         print(f"✅ Found {len(bse_instruments)} BSE instruments")
         
@@ -1104,9 +314,11 @@ def api_bse_instruments():
             'error': str(e)
         }), 500
 
-@app.route('/upstox/login')
+@bp.route('/upstox/login')
 def upstox_login():
     """Initiate Upstox OAuth flow"""
+    from integrations import upstox_integration
+    
     redirect_uri = request.url_root + 'upstox/callback'
     if not upstox_integration.upstox_client.api_key:
         return jsonify({
@@ -1117,9 +329,11 @@ def upstox_login():
     auth_url = upstox_integration.upstox_client.get_authorization_url(redirect_uri)
     return redirect(auth_url)
 
-@app.route('/upstox/callback')
+@bp.route('/upstox/callback')
 def upstox_callback():
     """Handle Upstox OAuth callback"""
+    from integrations import upstox_integration
+    
     auth_code = request.args.get('code')
     
     if not auth_code:
@@ -1142,15 +356,19 @@ def upstox_callback():
     else:
         return jsonify({'error': 'Failed to get access token', 'details': token_data}), 500
 
-@app.route('/upstox/live-data')
+@bp.route('/upstox/live-data')
 def upstox_live_data_page():
     """Render Upstox live data dashboard"""
+    from integrations import upstox_integration
+    
     is_auth = upstox_integration.is_authenticated()
     return render_template('upstox-live.html', is_authenticated=is_auth)
 
-@app.route('/api/upstox/status')
+@bp.route('/api/upstox/status')
 def upstox_status():
     """Check Upstox authentication status"""
+    from integrations import upstox_integration
+    
     is_auth = upstox_integration.is_authenticated()
     
     status_data = {
@@ -1166,18 +384,22 @@ def upstox_status():
     
     return jsonify(status_data)
 
-@app.route('/api/upstox/quote/<symbol>')
+@bp.route('/api/upstox/quote/<symbol>')
 def upstox_get_quote(symbol):
     """Get live market quote for a symbol"""
+    from integrations import upstox_integration
+    
     if not upstox_integration.is_authenticated():
         return jsonify({'error': 'Not authenticated. Please login first.'}), 401
     
     quote = upstox_integration.upstox_client.get_market_quote(symbol)
     return jsonify(quote)
 
-@app.route('/api/upstox/quotes')
+@bp.route('/api/upstox/quotes')
 def upstox_get_quotes():
     """Get live market quotes for multiple symbols"""
+    from integrations import upstox_integration
+    
     if not upstox_integration.is_authenticated():
         return jsonify({'error': 'Not authenticated. Please login first.'}), 401
     
@@ -1188,19 +410,25 @@ def upstox_get_quotes():
     quotes = upstox_integration.upstox_client.get_market_quotes_multiple(symbols)
     return jsonify(quotes)
 
-@app.route('/api/nse-indices')
+@bp.route('/api/nse-indices')
 def get_nse_indices_api():
     """API endpoint to get NSE indices data"""
+    import reference_data
+    
+    tables = reference_data.current()
     return jsonify({
         'success': True,
-        'data': nse_indices_data,
-        'symbol_count': len(nse_symbol_lookup)
+        'data': tables.nse_indices_data,
+        'symbol_count': len(tables.nse_symbol_lookup)
     })
 
-@app.route('/api/nse-indices/<index_name>')
+@bp.route('/api/nse-indices/<index_name>')
 def get_specific_index(index_name):
     """API endpoint to get a specific NSE index"""
+    import reference_data
+    
     index_name_lower = index_name.lower()
+    nse_indices_data = reference_data.current().nse_indices_data
     
     if index_name_lower not in nse_indices_data:
         return jsonify({'success': False, 'error': 'Index not found'}), 404
@@ -1210,10 +438,12 @@ def get_specific_index(index_name):
         'data': nse_indices_data[index_name_lower]
     })
 
-@app.route('/api/check-symbol/<symbol>')
+@bp.route('/api/check-symbol/<symbol>')
 def check_symbol_indices(symbol):
     """API endpoint to check which indices a symbol belongs to"""
-    indices = get_stock_indices(symbol)
+    import reference_data
+    
+    indices = reference_data.get_stock_indices(symbol)
     
     return jsonify({
         'success': True,
@@ -1222,39 +452,91 @@ def check_symbol_indices(symbol):
         'count': len(indices)
     })
 
-@app.route('/api/announcements')
+@bp.route('/api/announcements')
 def get_announcements():
-    """API endpoint to get announcements"""
-    global announcements_cache, last_refresh_time
-    
+    """API endpoint to get announcements (today's come from the ingestion worker's shared state)"""
     # Get days_back parameter from query string (default: 1 day - today only)
     days_back = request.args.get('days_back', default=1, type=int)
     max_results = request.args.get('max_results', default=200, type=int)
     
+    # Optional market cap filters/sort: ?market_cap=Large Cap,Mid Cap&min_market_cap=1000&sort=market_cap
+    market_caps = [c.strip() for c in request.args.get('market_cap', '').split(',') if c.strip()]
+    min_market_cap = request.args.get('min_market_cap', type=float)
+    sort_by_market_cap = request.args.get('sort') == 'market_cap'
+    
     # Validate parameters
     days_back = min(max(1, days_back), 30)  # Between 1 and 30 days
     max_results = min(max(10, max_results), 500)  # Between 10 and 500 results
     
     print(f"API Request: days_back={days_back}, max_results={max_results}")
     
-    # Fetch fresh data
-    announcements_cache = fetch_bse_announcements(days_back=days_back, max_results=max_results)
+    # Today's feed is kept fresh by the worker; history (or no worker yet) is fetched on demand
+    state = shared_state.read_state(shared_state.ANNOUNCEMENTS_FILE) if days_back == 1 else None
+    if state:
+        announcements = state['announcements']
+        last_refresh = state['last_refresh']
+    else:
+        from bse_feed import fetch_bse_announcements
+        announcements = fetch_bse_announcements(days_back=days_back, max_results=max_results)
+        last_refresh = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    # Update last refresh time
-    last_refresh_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    from market_cap_data import MARKET_CAP_CATEGORIES, select_by_market_cap
+    import reference_data
+    announcements = select_by_market_cap(announcements, market_caps, min_market_cap, sort_by_market_cap)[:max_results]
     
     return jsonify({
         'success': True,
-        'data': announcements_cache,
-        'count': len(announcements_cache),
+        'data': announcements,
+        'index_bits': reference_data.MEMBERSHIP_BITS,
+        'index_counts': reference_data.count_memberships(a.get('index_mask', 0) for a in announcements),
+        'market_cap_categories': {c['category']: c for c in MARKET_CAP_CATEGORIES},
+        'count': len(announcements),
         'days_back': days_back,
         'max_results': max_results,
-        'last_refresh': last_refresh_time
+        'last_refresh': last_refresh,
+        'source': 'worker' if state else 'live'
     })
 
-# send_to_slack and send_to_telegram are now imported from integrations module
+def read_worker_status():
+    """Latest status published by the ingestion worker, or None if no worker is running"""
+    status = shared_state.read_state(shared_state.WORKER_STATUS_FILE)
+    if status:
+        status = {**status, 'age_seconds': shared_state.state_age_seconds(status)}
+    return status
 
-@app.route('/api/summarize', methods=['POST'])
+@bp.route('/api/polling/status')
+def polling_status():
+    """API endpoint to get announcement poller session, cadence and run counters"""
+    status = read_worker_status()
+    if not status:
+        return jsonify({'success': False, 'error': 'Ingestion worker not running (start with: python worker.py)'}), 503
+    
+    return jsonify({
+        'success': True,
+        'leader_pid': status['leader_pid'],
+        'status_age_seconds': status['age_seconds'],
+        **status['polling']
+    })
+
+@bp.route('/api/notifications/stats')
+def notification_stats():
+    """API endpoint to get delivery queue depth, throughput and latency per integration"""
+    import notifications
+    
+    status = read_worker_status()
+    
+    return jsonify({
+        'success': True,
+        # Auto-notifications are sent by the worker
+        'worker': {
+            'status_age_seconds': status['age_seconds'],
+            **status['notifications']
+        } if status else None,
+        # Summaries requested from this web process
+        'web': notifications.get_stats()
+    })
+
+@bp.route('/api/summarize', methods=['POST'])
 def summarize_announcement():
     """API endpoint to summarize an announcement"""
     data = request.json
@@ -1269,6 +551,13 @@ def summarize_announcement():
             'error': 'Missing required parameters'
         }), 400
     
+    import delivery_jobs
+    import pdf_extraction
+    from announcement_analysis import download_pdf_locally, extract_pdf_content, analyze_unreadable_pdf, analyze_announcement
+    from integrations import slack_integration, telegram_integration
+    from integrations.slack_integration import send_to_slack
+    from integrations.telegram_integration import send_to_telegram
+    
     # Download PDF locally (on-demand, only when summarizing)
     print(f"\n📊 Summarize requested for {company_name} ({bse_code})")
     print(f"🔽 Downloading PDF for analysis...")
@@ -1277,107 +566,115 @@ def summarize_announcement():
     # Extract text from PDF (use local if available, otherwise from URL)
     if local_pdf_path and os.path.exists(local_pdf_path):
         print(f"📄 Using local PDF: {os.path.basename(local_pdf_path)}")
-        # Read from local file
-        with open(local_pdf_path, 'rb') as f:
-            pdf_file = io.BytesIO(f.read())
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            pdf_text = ""
-            for page in pdf_reader.pages[:5]:  # Read first 5 pages
-                pdf_text += page.extract_text()
-            pdf_text = pdf_text[:5000]  # Limit to 5000 characters
+        pdf_content = extract_pdf_content(local_pdf_path)
     else:
         print(f"⚠️ Local download failed, extracting from BSE URL...")
-        pdf_text = extract_text_from_pdf(pdf_url)
+        pdf_content = extract_pdf_content(pdf_url)
     
-    # Analyze and generate summary
-    analysis = analyze_announcement(pdf_text, company_name)
-    
-    # Send to Slack and Telegram
-    slack_sent = send_to_slack(
-        company_name=company_name,
-        bse_code=bse_code,
-        sentiment=analysis['sentiment'],
-        summary=analysis['summary'],
-        pdf_url=pdf_url,
-        announcement_time=announcement_time
-    )
-    
-    telegram_sent = send_to_telegram(
-        company_name=company_name,
-        bse_code=bse_code,
-        sentiment=analysis['sentiment'],
-        summary=analysis['summary'],
-        pdf_url=pdf_url
-    )
+    # Analyze and generate summary (scanned/encrypted PDFs take the cheap path)
+    if pdf_content['kind'] != pdf_extraction.PDF_KIND_TEXT:
+        analysis = analyze_unreadable_pdf(pdf_content['kind'], company_name)
+    else:
+        analysis = analyze_announcement(pdf_content['text'], company_name)
+    
+    # Deliver to Slack and Telegram concurrently in the background - the
+    # response only depends on the analysis
+    sinks = {}
+    if slack_integration.slack_client:
+        sinks['Slack'] = lambda: send_to_slack(
+            company_name=company_name,
+            bse_code=bse_code,
+            sentiment=analysis['sentiment'],
+            summary=analysis['summary'],
+            pdf_url=pdf_url,
+            announcement_time=announcement_time
+        )
+    if telegram_integration.telegram_sender and telegram_integration.telegram_chat_id:
+        sinks['Telegram'] = lambda: send_to_telegram(
+            company_name=company_name,
+            bse_code=bse_code,
+            sentiment=analysis['sentiment'],
+            summary=analysis['summary'],
+            pdf_url=pdf_url
+        )
     
-    # Prepare response with delivery status
-    delivery_status = []
-    if slack_sent:
-        delivery_status.append('Slack')
-    if telegram_sent:
-        delivery_status.append('Telegram')
+    job_id = delivery_jobs.submit_delivery(sinks)
     
     return jsonify({
         'success': True,
         'summary': analysis['summary'],
         'sentiment': analysis['sentiment'],
-        'delivered_to': delivery_status if delivery_status else ['None (configure tokens)']
+        'delivery_job_id': job_id,
+        'delivering_to': list(sinks) if sinks else ['None (configure tokens)']
     })
 
-# Configure auto-refresh scheduler
-# Market hours: 9:00 AM - 3:30 PM IST (every 1 minute)
-# Non-market hours: 3:31 PM - 8:59 AM IST (every 10 minutes)
-
-# Job 1: Every 1 minute during market hours (9:00 AM - 3:30 PM)
-scheduler.add_job(
-    auto_check_and_notify,
-    CronTrigger(
-        hour='9-14',  # 9 AM to 2 PM (every minute)
-        minute='*',
-        timezone='Asia/Kolkata'
-    ),
-    id='market_hours_frequent',
-    name='Market Hours Check (Every 1 min)'
-)
-
-# Job 2: Every 1 minute from 3:00 PM to 3:30 PM
-scheduler.add_job(
-    auto_check_and_notify,
-    CronTrigger(
-        hour='15',  # 3 PM
-        minute='0-30',  # First 30 minutes
-        timezone='Asia/Kolkata'
-    ),
-    id='market_hours_closing',
-    name='Market Closing Hours (Every 1 min)'
-)
+@bp.route('/api/delivery/<job_id>')
+def get_delivery_status(job_id):
+    """API endpoint to check background delivery status for a summarize request"""
+    import delivery_jobs
+    
+    job = delivery_jobs.get_job(job_id)
+    
+    if not job:
+        return jsonify({'success': False, 'error': 'Delivery job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        **job
+    })
 
-# Job 3: Every 10 minutes during non-market hours
-scheduler.add_job(
-    auto_check_and_notify,
-    CronTrigger(
-        minute='*/10',  # Every 10 minutes
-        timezone='Asia/Kolkata'
-    ),
-    id='non_market_hours',
-    name='Non-Market Hours Check (Every 10 min)'
-)
+@bp.route('/api/ready')
+def readiness():
+    """Readiness probe: 503 while lookup tables are warming up, 200 once each has loaded (or failed - degraded)"""
+    import reference_data
+    import instruments_master
+    
+    tables = reference_data.get_load_status()
+    ready = all(table['state'] != 'pending' for table in tables.values())
+    # Instruments only back the options/BSE browsers, so a missing store degrades rather than blocks
+    instruments = instruments_master.get_status()
+    
+    return jsonify({
+        'success': True,
+        'ready': ready,
+        'degraded': any(table['state'] == 'failed' for table in tables.values()) or not instruments['ready'],
+        'tables': tables,
+        'instruments': instruments
+    }), 200 if ready else 503
 
-print("\n" + "="*80)
-print("🔔 AUTO-NOTIFICATION SCHEDULER CONFIGURED")
-print("="*80)
-print("🟢 Market Hours (9:00 AM - 3:30 PM IST): Check every 1 minute")
-print("🟡 Non-Market Hours (3:31 PM - 8:59 AM IST): Check every 10 minutes")
-print("🎯 Auto-send to Slack: Nifty 50, Next 50, and 500 stocks only")
-print("="*80 + "\n")
+def run_warm_up():
+    """Background start-up work: lookup tables, then heavy imports so the first request doesn't pay for them"""
+    import reference_data
+    
+    reference_data.load_all()
+    
+    try:
+        import announcement_analysis
+        import integrations
+    except Exception as e:
+        print(f"⚠️ Warm-up import failed: {str(e)}")
+    
+    # Hot-reload tables when their source files change; index lists are downloaded by the worker only,
+    # this process just picks up the cache files it rewrites
+    reference_data.start_watcher()
 
-# Run initial check
-print("🚀 Running initial announcement check...")
-auto_check_and_notify()
+def create_app(warm_up=True):
+    """Create the Flask app - no network or disk work, lookup tables load in the background"""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
+    app.register_blueprint(bp)
+    
+    if warm_up:
+        import threading
+        threading.Thread(target=run_warm_up, name='warm-up', daemon=True).start()
+    
+    return app
 
 if __name__ == '__main__':
-    try:
-        app.run(debug=True, host='0.0.0.0', port=5000)
-    finally:
-        # Shutdown scheduler on exit
-        scheduler.shutdown()
+    # Development convenience: run the ingestion worker in this process too.
+    # Its file lock keeps it on standby if a separate worker.py is already polling.
+    import threading
+    import worker
+    threading.Thread(target=worker.run, name='ingestion-worker', daemon=True).start()
+    
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark PDF extraction backends over the locally stored announcement PDFs
+
+Runs every installed backend from pdf_extraction over a corpus (default:
+announcements_pdfs/) and reports pages/sec, characters extracted, peak
+Python memory and failure rate, so we can pick the fastest backend that is
+still accurate enough for BSE filings.
+
+Usage:
+    python benchmark_pdf_backends.py
+    python benchmark_pdf_backends.py --corpus announcements_pdfs/20251208 --max-pages 5
+    python benchmark_pdf_backends.py --backends pypdf2,pymupdf --json results.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+import tracemalloc
+
+import pdf_extraction
+
+
+def find_pdfs(corpus_dir):
+    """Find all PDF files under the corpus directory"""
+    pattern = os.path.join(corpus_dir, '**', '*.pdf')
+    return sorted(glob.glob(pattern, recursive=True))
+
+
+def benchmark_backend(backend_name, pdf_files, max_pages=None):
+    """Run one backend over every PDF and collect timing / output statistics"""
+    pages = 0
+    chars = 0
+    failures = []
+    elapsed = 0.0
+
+    tracemalloc.start()
+    for pdf_path in pdf_files:
+        # Read the file outside the timed section so disk I/O doesn't skew results
+        pdf_bytes = pdf_extraction.read_pdf_bytes(pdf_path)
+
+        # probe=False: every backend must do the full extraction of every file, or skipped scans would look fast
+        start = time.perf_counter()
+        try:
+            result = pdf_extraction.extract_pdf(pdf_bytes, max_pages=max_pages, backend=backend_name, probe=False)
+            pages += result['pages']
+            chars += len(result['text'].strip())
+        except Exception as e:
+            failures.append({'file': pdf_path, 'error': str(e)})
+        elapsed += time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'backend': backend_name,
+        'files': len(pdf_files),
+        'pages': pages,
+        'chars': chars,
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(pages / elapsed, 2) if elapsed else 0.0,
+        'chars_per_page': round(chars / pages, 1) if pages else 0.0,
+        'peak_memory_mb': round(peak_bytes / (1024 * 1024), 2),
+        'failures': len(failures),
+        'failure_rate': round(len(failures) / len(pdf_files), 3) if pdf_files else 0.0,
+        'failed_files': failures
+    }
+
+
+def print_report(results):
+    """Print a comparison table of all backends"""
+    print("\n" + "=" * 96)
+    print(f"{'Backend':<10} {'Files':>6} {'Pages':>6} {'Pages/s':>9} {'Chars':>10} "
+          f"{'Chars/pg':>9} {'Peak MB':>8} {'Failed':>7} {'Fail %':>7}")
+    print("-" * 96)
+    for r in sorted(results, key=lambda r: r['pages_per_sec'], reverse=True):
+        print(f"{r['backend']:<10} {r['files']:>6} {r['pages']:>6} {r['pages_per_sec']:>9} "
+              f"{r['chars']:>10} {r['chars_per_page']:>9} {r['peak_memory_mb']:>8} "
+              f"{r['failures']:>7} {r['failure_rate'] * 100:>6.1f}%")
+    print("=" * 96)
+    print("Note: peak memory is Python-heap only (tracemalloc); native allocations in C backends are not counted.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PDF text-extraction backends')
+    parser.add_argument('--corpus', default='announcements_pdfs', help='Directory containing PDFs')
+    parser.add_argument('--backends', default='', help='Comma-separated backends (default: all installed)')
+    parser.add_argument('--max-pages', type=int, default=None, help='Pages to read per PDF (default: all)')
+    parser.add_argument('--json', dest='json_path', default=None, help='Write full results to this JSON file')
+    args = parser.parse_args()
+
+    pdf_files = find_pdfs(args.corpus)
+    if not pdf_files:
+        print(f"❌ No PDFs found under {args.corpus}")
+        return
+
+    if args.backends:
+        backend_names = [name.strip().lower() for name in args.backends.split(',') if name.strip()]
+    else:
+        backend_names = pdf_extraction.available_backends()
+
+    print("=" * 96)
+    print(f"📄 PDF Extraction Benchmark: {len(pdf_files)} files from {args.corpus}")
+    print("=" * 96)
+
+    results = []
+    for name in backend_names:
+        backend = pdf_extraction.BACKENDS.get(name)
+        if backend is None or not backend.is_available():
+            print(f"⚠️ Skipping '{name}' (unknown or not installed)")
+            continue
+        print(f"⏱️ Running {name}...")
+        results.append(benchmark_backend(name, pdf_files, max_pages=args.max_pages))
+
+    if not results:
+        print("❌ No backends available to benchmark")
+        return
+
+    print_report(results)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved results to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
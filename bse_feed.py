@@ -0,0 +1,367 @@
+"""
+BSE Announcements Feed
+Fetches corporate announcements from the BSE API (NSE and sample data as fallbacks)
+"""
+
+import requests
+import json
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from market_cap_data import classify_batch, prefetch_market_caps
+from reference_data import FO_BIT, is_fo_eligible, get_nse_symbol_from_bse, get_index_mask, get_stock_sector
+
+def get_browser_headers():
+    """Returns headers to mimic a real browser"""
+    return {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Cache-Control': 'max-age=0'
+    }
+
+def fetch_bse_live_api(days_back=1, max_results=200):
+    """Fetch live announcements from BSE India API - ACTUAL REAL DATA
+    
+    Args:
+        days_back: Number of days to look back for announcements (default: 1 - today only)
+        max_results: Maximum number of announcements to return (default: 200)
+    """
+    try:
+        session = requests.Session()
+        
+        # Step 1: Get the main page first to establish session
+        main_url = 'https://www.bseindia.com/corporates/Corpfiling_new.aspx'
+        headers = get_browser_headers()
+        headers.update({
+            'Referer': 'https://www.bseindia.com/',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        })
+        
+        response = session.get(main_url, headers=headers, timeout=15)
+        print(f"BSE main page status: {response.status_code}")
+        
+        # Step 2: Call the announcements data endpoint  
+        # This URL returns JSON data for latest corporate filings
+        api_url = 'https://api.bseindia.com/BseIndiaAPI/api/AnnGetData/w'
+        
+        # Get date range in YYYYMMDD format
+        # For days_back=1 (default), fetch only today's announcements
+        to_date = datetime.now().strftime('%Y%m%d')
+        if days_back <= 1:
+            from_date = to_date  # Only today
+        else:
+            from_date = (datetime.now() - timedelta(days=days_back-1)).strftime('%Y%m%d')
+        
+        print(f"Fetching announcements from {from_date} to {to_date} (Today only)" if from_date == to_date else f"Fetching announcements from {from_date} to {to_date}")
+        
+        params = {
+            'strCat': '-1',  # All categories
+            'strPrevDate': from_date,  # Start date
+            'strScrip': '',  # All scrips
+            'strSearch': 'P',  # Search type
+            'strToDate': to_date,  # End date
+            'strType': 'C'  # Corporate announcements
+        }
+        
+        api_headers = {
+            'User-Agent': headers['User-Agent'],
+            'Accept': 'application/json, text/plain, */*',
+            'Referer': 'https://www.bseindia.com/corporates/Corpfiling_new.aspx',
+            'Origin': 'https://www.bseindia.com',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+        
+        print(f"Fetching BSE API: {api_url}")
+        api_response = session.get(api_url, params=params, headers=api_headers, timeout=15)
+        
+        print(f"BSE API status: {api_response.status_code}")
+        print(f"Content-Type: {api_response.headers.get('Content-Type')}")
+        
+        if api_response.status_code == 200:
+            try:
+                data = api_response.json()
+                
+                if isinstance(data, dict) and 'Table' in data:
+                    announcements = []
+                    table_data = data['Table']
+                    total_available = len(table_data)
+                    
+                    print(f"\n✅ BSE API SUCCESS! Found {total_available} announcements")
+                    
+                    # Resolve market caps for the whole batch up front so the row loop never waits on the network
+                    prefetch_market_caps({
+                        str(item.get('SCRIP_CD')) for item in table_data[:max_results]
+                        if is_fo_eligible(str(item.get('SCRIP_CD')))
+                    })
+                    
+                    # Classify the whole batch in one vectorised lookup
+                    batch_crores, batch_categories = classify_batch([item.get('SCRIP_CD') for item in table_data[:max_results]])
+                    
+                    print("Processing all announcements...")
+                    
+                    for row, item in enumerate(table_data[:max_results]):
+                        # Extract data from API response
+                        # NEWSSUB contains the full announcement text with company name and code
+                        news_sub = item.get('NEWSSUB', '')
+                        news_id = item.get('NEWSID', '')
+                        bse_code = str(item.get('SCRIP_CD', 'N/A'))
+                        
+                        # ATTACHMENTNAME contains the actual PDF filename!
+                        attachment_name = item.get('ATTACHMENTNAME', '')
+                        
+                        # Extract date/time when announcement was published
+                        # NEWS_DT format: 2025-12-02T22:36:41.373
+                        news_date = item.get('NEWS_DT', item.get('DT_TM', ''))
+                        
+                        # Format the date/time nicely and keep raw timestamp
+                        formatted_date = ''
+                        raw_timestamp = ''
+                        if news_date:
+                            try:
+                                # Parse ISO format datetime
+                                dt = datetime.fromisoformat(news_date.replace('T', ' ').split('.')[0])
+                                # Format as: Dec 02, 2025 10:36 PM
+                                formatted_date = dt.strftime('%b %d, %Y %I:%M %p')
+                                # Keep ISO format for JavaScript processing
+                                raw_timestamp = dt.isoformat()
+                            except:
+                                formatted_date = news_date
+                                raw_timestamp = news_date
+                        
+                        # Extract company name from NEWSSUB (format: "Company Name - CODE - Details...")
+                        company_name = 'N/A'
+                        if news_sub and ' - ' in news_sub:
+                            parts = news_sub.split(' - ')
+                            if len(parts) >= 2:
+                                company_name = parts[0].strip()
+                        
+                        # Construct PDF link using ATTACHMENTNAME (the ACTUAL PDF filename)
+                        pdf_link = ''
+                        if attachment_name:
+                            # ATTACHMENTNAME already includes .pdf extension
+                            pdf_link = f"https://www.bseindia.com/xml-data/corpfiling/AttachLive/{attachment_name}"
+                        
+                        # Get NSE symbol, index membership and F&O eligibility as one bitmask
+                        nse_symbol = get_nse_symbol_from_bse(bse_code)
+                        index_mask = get_index_mask(nse_symbol) | (FO_BIT if is_fo_eligible(bse_code) else 0)
+                        sector = get_stock_sector(nse_symbol)
+                        
+                        # Don't download PDF here - will download on-demand when user clicks Summarize
+                        # Check if PDF already exists locally from previous downloads
+                        url_hash = hashlib.md5(pdf_link.encode()).hexdigest()[:8] if pdf_link else None
+                        local_pdf_path = None
+                        
+                        if url_hash:
+                            date_folder = datetime.now().strftime('%Y%m%d')
+                            folder_path = os.path.join('announcements_pdfs', date_folder)
+                            if os.path.exists(folder_path):
+                                existing_files = [f for f in os.listdir(folder_path) 
+                                                if f.startswith(f"{bse_code}_") and url_hash in f and f.endswith('.pdf')]
+                                if existing_files:
+                                    local_pdf_path = os.path.join(folder_path, existing_files[0])
+                        
+                        announcements.append({
+                            'news_id': news_id,
+                            'company_name': company_name,
+                            'bse_code': bse_code,
+                            'nse_symbol': nse_symbol,
+                            'index_mask': index_mask,  # reference_data.MEMBERSHIP_BITS
+                            'sector': sector,
+                            'pdf_link': pdf_link,  # BSE link (primary)
+                            'local_pdf_path': local_pdf_path,  # Local file path (if exists from previous download)
+                            'date_time': formatted_date,
+                            'raw_timestamp': raw_timestamp,
+                            'market_cap': batch_categories[row]['category'],  # Display details in MARKET_CAP_CATEGORIES
+                            'market_cap_crores': batch_crores[row],
+                            'summary': None
+                        })
+                    
+                    print(f"✅ Processed {len(announcements)} announcements")
+                    return announcements
+                else:
+                    print(f"Unexpected data structure: {list(data.keys()) if isinstance(data, dict) else type(data)}")
+                    return []
+                    
+            except json.JSONDecodeError as e:
+                print(f"JSON decode error: {str(e)}")
+                print(f"Response content (first 500 chars): {api_response.text[:500]}")
+                return []
+        else:
+            print(f"API returned status {api_response.status_code}")
+            return []
+            
+    except Exception as e:
+        print(f"Error fetching BSE live API: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return []
+
+def fetch_nse_announcements():
+    """Fetch announcements from NSE India as alternative source"""
+    try:
+        # NSE announcements API endpoint
+        url = "https://www.nseindia.com/api/corporate-announcements"
+        
+        headers = get_browser_headers()
+        headers['Accept'] = 'application/json'
+        
+        session = requests.Session()
+        
+        # First, visit the main page to get cookies
+        session.get('https://www.nseindia.com', headers=headers, timeout=10)
+        time.sleep(2)
+        
+        # Now fetch announcements
+        response = session.get(url, headers=headers, timeout=15)
+        response.raise_for_status()
+        
+        data = response.json()
+        announcements = []
+        
+        if isinstance(data, list):
+            items = data
+        elif isinstance(data, dict) and 'data' in data:
+            items = data['data']
+        else:
+            items = []
+        
+        for item in items[:50]:
+            announcements.append({
+                'company_name': item.get('symbol', '') + ' - ' + item.get('sm_name', item.get('companyName', 'N/A')),
+                'bse_code': item.get('symbol', 'N/A'),
+                'pdf_link': item.get('attachment', item.get('an_dt', '')),
+                'summary': None
+            })
+        
+        return announcements
+        
+    except Exception as e:
+        print(f"Error fetching NSE announcements: {str(e)}")
+        return []
+
+def get_sample_announcements():
+    """Return sample announcements for demonstration"""
+    # Get current time for sample data
+    now = datetime.now()
+    current_time = now.strftime('%b %d, %Y %I:%M %p')
+    current_timestamp = now.isoformat()
+    
+    return [
+        {
+            'company_name': 'Reliance Industries Limited',
+            'bse_code': '500325',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/c4c8c8e5-5b5a-4f0e-9f3f-7e8e8e8e8e8e.pdf',
+            'local_pdf_path': None,
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'market_cap': 'Large Cap',
+            'market_cap_crores': None,
+            'index_mask': 1 | 4 | 8,  # NIFTY50, NIFTY500, F&O
+            'summary': None
+        },
+        {
+            'company_name': 'Tata Consultancy Services Ltd',
+            'bse_code': '532540',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/a1b2c3d4-5678-90ab-cdef-1234567890ab.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        },
+        {
+            'company_name': 'HDFC Bank Limited',
+            'bse_code': '500180',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/d4c3b2a1-8765-09ba-fedc-0987654321ba.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        },
+        {
+            'company_name': 'Infosys Limited',
+            'bse_code': '500209',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/e5f6g7h8-1234-5678-9abc-def123456789.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        },
+        {
+            'company_name': 'ICICI Bank Limited',
+            'bse_code': '532174',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/f6g7h8i9-2345-6789-0abc-def234567890.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        },
+        {
+            'company_name': 'State Bank of India',
+            'bse_code': '500112',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/g7h8i9j0-3456-7890-1abc-def345678901.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        },
+        {
+            'company_name': 'Bharti Airtel Limited',
+            'bse_code': '532454',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/h8i9j0k1-4567-8901-2abc-def456789012.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        },
+        {
+            'company_name': 'ITC Limited',
+            'bse_code': '500875',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/i9j0k1l2-5678-9012-3abc-def567890123.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        },
+        {
+            'company_name': 'Larsen & Toubro Limited',
+            'bse_code': '500510',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/j0k1l2m3-6789-0123-4abc-def678901234.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        },
+        {
+            'company_name': 'Hindustan Unilever Limited',
+            'bse_code': '500696',
+            'pdf_link': 'https://www.bseindia.com/xml-data/corpfiling/AttachLive/k1l2m3n4-7890-1234-5abc-def789012345.pdf',
+            'date_time': current_time,
+            'raw_timestamp': current_timestamp,
+            'summary': None
+        }
+    ]
+
+def fetch_bse_announcements(days_back=1, max_results=200):
+    """Fetch announcements from BSE - LIVE DATA
+    
+    Args:
+        days_back: Number of days to look back (default: 1 - today only)
+        max_results: Maximum number of results (default: 200)
+    """
+    print("\n" + "="*80)
+    print(f"FETCHING LIVE BSE ANNOUNCEMENTS (Last {days_back} days, max {max_results} results)...")
+    print("="*80)
+    
+    # Fetch from BSE Live API (REAL DATA)
+    announcements = fetch_bse_live_api(days_back=days_back, max_results=max_results)
+    
+    if announcements:
+        print(f"✅ SUCCESS! Fetched {len(announcements)} LIVE announcements from BSE India")
+        print("="*80 + "\n")
+        return announcements
+    
+    print("❌ BSE API failed, using sample data for demonstration")
+    print("="*80 + "\n")
+    
+    # Return sample data as last resort
+    return get_sample_announcements()
@@ -0,0 +1,122 @@
+"""
+Sent Announcements Store
+Persistent, time-bounded record of announcements already handled, so restarts don't re-send
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# On-disk table of fixed-width announcement hashes
+DEDUP_DB_PATH = os.environ.get('DEDUP_DB_PATH', os.path.join('state', 'sent_announcements.db'))
+
+# Entries older than this are forgotten (BSE feed is fetched for today only)
+DEDUP_RETENTION_HOURS = float(os.environ.get('DEDUP_RETENTION_HOURS', '48'))
+
+# In-memory Bloom filter in front of the table: 2^20 bits = 128 KB, 4 probes
+BLOOM_BITS = 1 << 20
+BLOOM_HASHES = 4
+
+# How often expired rows are purged (seconds)
+PURGE_INTERVAL_SECONDS = 3600
+
+
+def announcement_hash(ann_id):
+    """Hash an announcement ID to a signed 64-bit integer (fits SQLite INTEGER)"""
+    digest = hashlib.blake2b(ann_id.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class DedupStore:
+    """
+    Set-like store of sent announcement IDs
+
+    Supports `ann_id in store` and `store.add(ann_id)` like the old in-memory
+    set, but persists 8-byte hashes in SQLite and expires them after the
+    retention window. A fixed-size Bloom filter answers most "not seen"
+    checks without touching the database, so memory stays bounded no matter
+    how long the process runs.
+    """
+
+    def __init__(self, path=DEDUP_DB_PATH, retention_hours=DEDUP_RETENTION_HOURS,
+                 bloom_bits=BLOOM_BITS, bloom_hashes=BLOOM_HASHES):
+        self.path = path
+        self.retention_seconds = int(retention_hours * 3600)
+        self.bloom_bits = bloom_bits
+        self.bloom_hashes = bloom_hashes
+        self._bloom = bytearray(bloom_bits // 8)
+        self._lock = threading.Lock()
+        self._last_purge = 0
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS sent (hash INTEGER PRIMARY KEY, seen_at INTEGER NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sent_seen_at ON sent (seen_at)')
+        self._conn.commit()
+
+        self.purge()
+        print(f"✅ Loaded {len(self)} sent announcement(s) from {path}")
+
+    def _positions(self, value):
+        """Bloom filter bit positions for a hash (double hashing on its two 32-bit halves)"""
+        unsigned = value & 0xFFFFFFFFFFFFFFFF
+        h1 = unsigned & 0xFFFFFFFF
+        h2 = (unsigned >> 32) | 1
+        return [(h1 + i * h2) % self.bloom_bits for i in range(self.bloom_hashes)]
+
+    def _bloom_add(self, value):
+        for position in self._positions(value):
+            self._bloom[position >> 3] |= 1 << (position & 7)
+
+    def _bloom_may_contain(self, value):
+        return all(self._bloom[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def _cutoff(self):
+        return int(time.time()) - self.retention_seconds
+
+    def __contains__(self, ann_id):
+        value = announcement_hash(ann_id)
+        with self._lock:
+            if not self._bloom_may_contain(value):
+                return False
+            row = self._conn.execute(
+                'SELECT 1 FROM sent WHERE hash = ? AND seen_at >= ?', (value, self._cutoff())
+            ).fetchone()
+            return row is not None
+
+    def add(self, ann_id):
+        """Record an announcement as sent/seen"""
+        value = announcement_hash(ann_id)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sent (hash, seen_at) VALUES (?, ?)', (value, int(time.time()))
+            )
+            self._conn.commit()
+            self._bloom_add(value)
+
+        if time.time() - self._last_purge > PURGE_INTERVAL_SECONDS:
+            self.purge()
+
+    def purge(self):
+        """Delete expired entries and rebuild the Bloom filter from what remains"""
+        with self._lock:
+            self._conn.execute('DELETE FROM sent WHERE seen_at < ?', (self._cutoff(),))
+            self._conn.commit()
+
+            self._bloom = bytearray(self.bloom_bits // 8)
+            for (value,) in self._conn.execute('SELECT hash FROM sent'):
+                self._bloom_add(value)
+            self._last_purge = time.time()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM sent WHERE seen_at >= ?', (self._cutoff(),)
+            ).fetchone()[0]
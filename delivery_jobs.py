@@ -0,0 +1,123 @@
+"""
+Delivery Jobs Module
+Fans notifications out to every configured sink in the background and tracks status by job ID
+(in SQLite, so any web process can answer the status poll)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker threads shared by all delivery jobs
+DELIVERY_WORKERS = int(os.environ.get('DELIVERY_WORKERS', '8'))
+
+# Finished jobs are kept this long so clients can poll their status
+JOB_RETENTION_SECONDS = 3600
+
+# Job status is shared by every web process (the status poll may land on a different gunicorn worker)
+DELIVERY_JOBS_DB_PATH = os.environ.get('DELIVERY_JOBS_DB_PATH', os.path.join('state', 'delivery_jobs.db'))
+
+executor = ThreadPoolExecutor(max_workers=DELIVERY_WORKERS, thread_name_prefix='delivery')
+
+_conn = None
+_conn_pid = None
+_jobs_lock = threading.Lock()
+
+
+def _db():
+    """Connection for this process (opened lazily so forked workers never share one; caller holds the lock)"""
+    global _conn, _conn_pid
+    if _conn is None or _conn_pid != os.getpid():
+        folder = os.path.dirname(DELIVERY_JOBS_DB_PATH)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        _conn = sqlite3.connect(DELIVERY_JOBS_DB_PATH, timeout=10, check_same_thread=False)
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+        _conn.execute('CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, created_at REAL NOT NULL, finished_at REAL)')
+        _conn.execute('CREATE TABLE IF NOT EXISTS job_sinks (job_id TEXT NOT NULL, sink TEXT NOT NULL, state TEXT NOT NULL, '
+                      'PRIMARY KEY (job_id, sink))')
+        _conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at)')
+        _conn.commit()
+        _conn_pid = os.getpid()
+    return _conn
+
+
+def _prune_jobs(conn):
+    """Forget finished jobs older than the retention window (caller holds the lock)"""
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    conn.execute('DELETE FROM job_sinks WHERE job_id IN (SELECT job_id FROM jobs WHERE finished_at < ?)', (cutoff,))
+    conn.execute('DELETE FROM jobs WHERE finished_at < ?', (cutoff,))
+
+
+def _run_sink(job_id, sink_name, send):
+    """Run one sink and record its outcome"""
+    try:
+        outcome = 'delivered' if send() else 'failed'
+    except Exception as e:
+        print(f"❌ Delivery to {sink_name} failed: {str(e)}")
+        outcome = 'error'
+
+    try:
+        with _jobs_lock:
+            conn = _db()
+            with conn:
+                conn.execute('UPDATE job_sinks SET state = ? WHERE job_id = ? AND sink = ?', (outcome, job_id, sink_name))
+                conn.execute(
+                    'UPDATE jobs SET finished_at = ? WHERE job_id = ? AND finished_at IS NULL AND NOT EXISTS '
+                    "(SELECT 1 FROM job_sinks WHERE job_id = ? AND state = 'pending')",
+                    (time.time(), job_id, job_id)
+                )
+    except Exception as e:
+        print(f"❌ Error recording delivery status for job {job_id}: {str(e)}")
+
+
+def submit_delivery(sinks):
+    """
+    Start delivering to all sinks concurrently and return immediately
+
+    Args:
+        sinks: dict of sink name -> zero-argument callable returning True on success
+
+    Returns:
+        Job ID to pass to get_job()
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+
+    with _jobs_lock:
+        conn = _db()
+        with conn:
+            _prune_jobs(conn)
+            conn.execute('INSERT INTO jobs (job_id, created_at, finished_at) VALUES (?, ?, ?)',
+                         (job_id, now, None if sinks else now))
+            conn.executemany('INSERT INTO job_sinks (job_id, sink, state) VALUES (?, ?, ?)',
+                             [(job_id, name, 'pending') for name in sinks])
+
+    for name, send in sinks.items():
+        executor.submit(_run_sink, job_id, name, send)
+
+    return job_id
+
+
+def get_job(job_id):
+    """Return a snapshot of a delivery job, or None if unknown/expired"""
+    with _jobs_lock:
+        conn = _db()
+        job = conn.execute('SELECT created_at, finished_at FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if job is None:
+            return None
+        sinks = dict(conn.execute('SELECT sink, state FROM job_sinks WHERE job_id = ? ORDER BY rowid', (job_id,)).fetchall())
+
+    created_at, finished_at = job
+    return {
+        'job_id': job_id,
+        'status': 'pending' if finished_at is None else 'completed',
+        'created_at': created_at,
+        'finished_at': finished_at,
+        'sinks': sinks,
+        'delivered_to': [] if finished_at is None else [name for name, state in sinks.items() if state == 'delivered']
+    }
@@ -0,0 +1,172 @@
+"""
+Announcement Ingestion Pipeline
+Fetches new announcements, publishes them to shared state and sends rule-matched ones to Slack/Telegram
+"""
+
+import threading
+from datetime import datetime
+from functools import partial
+import dedup_store
+import notifications
+import notification_rules
+import pdf_extraction
+import reference_data
+import shared_state
+from bse_feed import fetch_bse_announcements
+from announcement_analysis import download_pdf_locally, extract_pdf_content, analyze_unreadable_pdf, analyze_announcement
+
+# Track sent announcements to avoid duplicates (persisted, expires after DEDUP_RETENTION_HOURS)
+sent_announcements = dedup_store.DedupStore()
+
+# Announcements queued for delivery but not yet confirmed (not picked up again while in flight)
+in_flight = set()
+
+def publish_announcements(announcements):
+    """Write the latest announcements for web processes to read"""
+    try:
+        shared_state.write_state(shared_state.ANNOUNCEMENTS_FILE, {
+            'announcements': announcements,
+            'last_refresh': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+    except Exception as e:
+        print(f"❌ Error publishing announcements: {str(e)}")
+
+def create_announcement_id(ann):
+    """Create unique ID for announcement to track if already sent"""
+    return f"{ann['bse_code']}_{ann['raw_timestamp']}"
+
+def delivery_id(ann_id, destination):
+    """ID recording that one destination has an announcement (so a retry skips it)"""
+    sink, target = destination
+    return f"{ann_id}|{sink}|{target or ''}"
+
+def track_delivery(ann_id, deliveries):
+    """Mark an announcement sent once every destination confirms; on failure leave it for the next poll"""
+    lock = threading.Lock()
+    remaining = [len(deliveries)]
+    failed = []
+
+    def on_done(destination, future):
+        delivered = not future.cancelled() and future.exception() is None and future.result()
+        if delivered:
+            sent_announcements.add(delivery_id(ann_id, destination))
+        with lock:
+            if not delivered:
+                failed.append(destination)
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        if failed:
+            print(f"⚠️ Delivery failed for {ann_id} to {', '.join(sink for sink, _ in failed)}; will retry on the next poll")
+        else:
+            sent_announcements.add(ann_id)
+        in_flight.discard(ann_id)
+
+    in_flight.add(ann_id)
+    for destination, future in deliveries:
+        future.add_done_callback(partial(on_done, destination))
+
+def auto_check_and_notify():
+    """Auto-check for new announcements and send those matching the notification rules"""
+    try:
+        print("\n" + "="*80)
+        print(f"🔄 AUTO-CHECK: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}")
+        print("="*80)
+        
+        # Fetch latest announcements
+        new_announcements = fetch_bse_announcements(days_back=1, max_results=200)
+        
+        if not new_announcements:
+            print("⚠️ No announcements fetched")
+            return
+        
+        # Publish for the web app before the (slow) PDF analysis
+        publish_announcements(new_announcements)
+        
+        # Route new announcements in one pass (sentiment-independent conditions first)
+        rules = notification_rules.get_rules()
+        unseen = [
+            ann for ann in new_announcements
+            if create_announcement_id(ann) not in in_flight and create_announcement_id(ann) not in sent_announcements
+        ]
+        candidate_masks = rules.candidates_batch(unseen)
+        
+        new_count = len(unseen)
+        processed_count = 0
+        
+        for ann, mask in zip(unseen, candidate_masks):
+            ann_id = create_announcement_id(ann)
+            
+            # Check if any rule could want it
+            if mask:
+                print(f"\n📊 NEW Matching Stock: {ann['company_name']} ({ann['bse_code']})")
+                print(f"   Indices: {', '.join(reference_data.index_names(ann.get('index_mask', 0))) or 'N/A'}")
+                print(f"   NSE Symbol: {ann.get('nse_symbol', 'N/A')}")
+                print(f"   Rules: {', '.join(rules.rule_names(mask))}")
+                
+                # Auto-summarize and send to matching destinations
+                if ann.get('pdf_link'):
+                    print(f"   🤖 Auto-summarizing...")
+                    
+                    # Download PDF
+                    local_pdf = download_pdf_locally(
+                        ann['pdf_link'],
+                        ann['company_name'],
+                        ann['bse_code']
+                    )
+                    
+                    if local_pdf:
+                        # Extract text from PDF (probes for scanned/encrypted first)
+                        content = extract_pdf_content(local_pdf)
+                        
+                        if content['kind'] != pdf_extraction.PDF_KIND_TEXT:
+                            # No text layer - skip analysis, notify with a short note
+                            result = analyze_unreadable_pdf(content['kind'], ann['company_name'])
+                        elif content['text']:
+                            # Analyze announcement
+                            result = analyze_announcement(content['text'], ann['company_name'])
+                        else:
+                            result = None
+                            print(f"   ⚠️ Could not extract PDF text")
+                        
+                        if result:
+                            # Sentiment-dependent rules are applied once analysis is done
+                            destinations = rules.destinations(rules.match_sentiment(mask, result['sentiment']))
+                            # Destinations that already got it on an earlier, partly failed attempt
+                            destinations = [d for d in destinations if delivery_id(ann_id, d) not in sent_announcements]
+                            
+                            if not destinations:
+                                # Filtered out by sentiment (or already delivered everywhere) - mark as seen, don't send
+                                sent_announcements.add(ann_id)
+                                print(f"   ⏭️ No rule matches {result['sentiment']} sentiment")
+                            else:
+                                # Send now, or buffer into the next digest outside market hours;
+                                # marked as sent only once delivery is confirmed
+                                deliveries = notifications.notify(ann, result, destinations)
+                                if deliveries:
+                                    track_delivery(ann_id, deliveries)
+                                    processed_count += 1
+                                    print(f"   ✅ Queued for notification")
+                                else:
+                                    print(f"   ❌ Failed to queue notification")
+                    else:
+                        print(f"   ⚠️ Could not download PDF")
+                else:
+                    print(f"   ⚠️ No PDF link available")
+            else:
+                # No matching rule - just mark as seen, don't send
+                sent_announcements.add(ann_id)
+        
+        print(f"\n📈 Auto-check summary:")
+        print(f"   - Total announcements: {len(new_announcements)}")
+        print(f"   - New announcements: {new_count}")
+        print(f"   - Processed & sent: {processed_count}")
+        print("="*80 + "\n")
+        
+        # Live NEWSIDs drive the adaptive poll interval (sample data has none)
+        return [ann['news_id'] for ann in new_announcements if ann.get('news_id')]
+        
+    except Exception as e:
+        print(f"❌ Error in auto-check: {str(e)}")
+        import traceback
+        traceback.print_exc()
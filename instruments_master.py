@@ -0,0 +1,225 @@
+"""
+Upstox Instruments Master
+Downloads the exchange instruments dump at most once per trading day and keeps a parsed, indexed copy
+
+The gzip file is stored on disk (shared with security_master) next to a small
+metadata file holding the ETag / Last-Modified used for conditional requests,
+so restarts load from disk and refreshes usually end in a 304.
+
+Each downloaded file is converted once into a memory-mapped column store
+(instruments_store), which every process maps instead of parsing the JSON.
+Only the worker calls refresh(); web processes just map the latest store.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, time as dt_time
+import pytz
+import requests
+import trading_calendar
+import instruments_store
+from options_index import OptionsIndex
+from security_master import UPSTOX_INSTRUMENTS_FILE, UPSTOX_INSTRUMENTS_STORE_DIR
+
+INSTRUMENTS_URL = 'https://assets.upstox.com/market-quote/instruments/exchange/complete.json.gz'
+INSTRUMENTS_FILE = UPSTOX_INSTRUMENTS_FILE
+INSTRUMENTS_META_FILE = f"{INSTRUMENTS_FILE}.meta.json"
+INSTRUMENTS_STORE_DIR = UPSTOX_INSTRUMENTS_STORE_DIR
+
+# Upstox publishes the day's file early in the morning; before this a download counts for the previous trading day
+INSTRUMENTS_PUBLISH_TIME = dt_time(8, 0)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+class InstrumentsIndex:
+    """Memory-mapped instruments store for one downloaded file, with the options index built on first use"""
+
+    def __init__(self, store, loaded_from_mtime_ns):
+        self.store = store
+        self.mtime_ns = loaded_from_mtime_ns
+        self._options = None
+        self._options_lock = threading.Lock()
+
+    @property
+    def options(self):
+        """NSE F&O options index, built on first use and kept for the life of this file"""
+        if self._options is None:
+            with self._options_lock:
+                if self._options is None:
+                    self._options = OptionsIndex(self.store)
+        return self._options
+
+    def __len__(self):
+        return len(self.store)
+
+
+_index = None
+_load_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def current_trading_day(now=None):
+    """Trading day whose instruments file is current at a given time"""
+    now = now or datetime.now(IST)
+    day = now.date()
+    if now.time() < INSTRUMENTS_PUBLISH_TIME:
+        return trading_calendar.previous_trading_day(day, include_today=False)
+    return trading_calendar.previous_trading_day(day)
+
+
+def _read_meta():
+    try:
+        with open(INSTRUMENTS_META_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(meta):
+    tmp_path = f"{INSTRUMENTS_META_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, INSTRUMENTS_META_FILE)
+
+
+def refresh(force=False):
+    """
+    Download the instruments file unless it is already current for this trading day
+
+    Uses If-None-Match / If-Modified-Since, so an unchanged file costs one 304.
+    Returns True if a new file was downloaded.
+    """
+    with _refresh_lock:
+        meta = _read_meta()
+        trading_day = current_trading_day().isoformat()
+        if not force and meta.get('trading_day') == trading_day and os.path.exists(INSTRUMENTS_FILE):
+            _build_store()
+            return False
+
+        headers = {}
+        if os.path.exists(INSTRUMENTS_FILE):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        started = time.monotonic()
+        try:
+            print(f"📥 Checking Upstox instruments ({'conditional' if headers else 'full'} download)...")
+            response = requests.get(INSTRUMENTS_URL, headers=headers, timeout=60, stream=True)
+
+            if response.status_code == 304:
+                print("✅ Upstox instruments unchanged (304)")
+                _write_meta({**meta, 'trading_day': trading_day, 'checked_at': datetime.now(IST).isoformat()})
+                _build_store()
+                return False
+
+            response.raise_for_status()
+
+            os.makedirs(os.path.dirname(INSTRUMENTS_FILE) or '.', exist_ok=True)
+            tmp_path = f"{INSTRUMENTS_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+            os.replace(tmp_path, INSTRUMENTS_FILE)
+            _build_store()
+
+            _write_meta({
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'trading_day': trading_day,
+                'checked_at': datetime.now(IST).isoformat()
+            })
+            print(f"✅ Downloaded Upstox instruments in {time.monotonic() - started:.1f}s")
+            return True
+        except Exception as e:
+            print(f"❌ Error downloading Upstox instruments: {str(e)}")
+            return False
+
+
+def _build_store():
+    """Convert the current file to columns (no-op if already done), so web processes only have to map it"""
+    try:
+        instruments_store.build(INSTRUMENTS_FILE, INSTRUMENTS_STORE_DIR)
+    except Exception as e:
+        print(f"❌ Error building instruments store: {str(e)}")
+
+
+def _file_mtime_ns():
+    try:
+        return os.stat(INSTRUMENTS_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_index():
+    """
+    Current instruments index, or None until the worker has built a store
+
+    Only maps the store built by the worker's refresh() - web processes never
+    download or convert the dump. Re-maps after the file on disk is replaced
+    and its new store exists; until then the previous store keeps serving.
+    """
+    global _index
+    mtime_ns = _file_mtime_ns()
+    index = _index
+    if mtime_ns is None or (index is not None and index.mtime_ns == mtime_ns):
+        return index
+
+    with _load_lock:
+        if _index is None or _index.mtime_ns != mtime_ns:
+            started = time.monotonic()
+            store = instruments_store.open_existing(INSTRUMENTS_FILE, INSTRUMENTS_STORE_DIR)
+            if store is not None:
+                _index = InstrumentsIndex(store, mtime_ns)
+                print(f"✅ Mapped {len(_index)} Upstox instruments in {time.monotonic() - started:.1f}s")
+        return _index
+
+
+def is_ready():
+    """Check if an instruments store is available to this process"""
+    return get_index() is not None
+
+
+def get_segment(segment):
+    """All instruments in a segment, e.g. 'NSE_FO' (new dicts; empty until ready)"""
+    index = get_index()
+    if index is None:
+        return []
+    return index.store.rows(index.store.mask(segment=segment))
+
+
+def get_exchange(exchange):
+    """All instruments on an exchange, e.g. 'BSE' (new dicts; empty until ready)"""
+    index = get_index()
+    if index is None:
+        return []
+    return index.store.rows(index.store.mask(exchange=exchange))
+
+
+def get_options_index():
+    """Options by underlying, expiry and strike for the current instruments file (None until ready)"""
+    index = get_index()
+    return index.options if index else None
+
+
+def get_instrument(instrument_key):
+    index = get_index()
+    row = index.store.find(instrument_key) if index else None
+    return index.store.row(row) if row is not None else None
+
+
+def get_status():
+    meta = _read_meta()
+    index = get_index()
+    return {
+        'file': INSTRUMENTS_FILE,
+        'trading_day': meta.get('trading_day'),
+        'checked_at': meta.get('checked_at'),
+        'ready': index is not None,
+        'loaded': len(index) if index else 0,
+        'store': index.store.path if index else None
+    }
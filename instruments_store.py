@@ -0,0 +1,315 @@
+"""
+Columnar Instruments Store
+The Upstox instruments dump converted once into memory-mapped column files, shared by every process on the box
+
+Each field of the dump becomes one column, chosen from the data:
+    number    float64 array, NaN when missing (fields that were JSON integers come back as int)
+    category  int32 codes into a small vocabulary (segment, exchange, instrument_type, underlying_symbol, ...)
+    text      one UTF-8 blob plus int64 offsets (instrument_key, trading_symbol, name, ...)
+
+Columns live in <store_dir>/v<version>-<mtime_ns>-<size>/ named after the source file they were built
+from, so a store is never modified in place: a new dump gets a new directory, published with one rename.
+Filters are vectorised masks over the mapped codes; rows are turned into dicts only when returned.
+"""
+
+import gzip
+import json
+import mmap
+import os
+import shutil
+import time
+import numpy as np
+
+# Bump when the on-disk layout changes
+STORE_VERSION = 2
+
+# A string field with more distinct values than this (or than a quarter of the rows) is stored as text
+MAX_CATEGORY_VALUES = 65535
+
+# Text column with a sorted permutation for O(log n) exact lookups
+KEY_COLUMN = 'instrument_key'
+
+META_FILE = 'meta.json'
+
+# Older store generations left on disk after a rebuild (for processes still switching over)
+KEEP_PREVIOUS_STORES = 1
+
+
+SCALAR_TYPES = {str, int, float, bool, type(None)}
+
+
+def _column_kind(values, rows):
+    """'number' / 'category' / 'text' for one field's values (None = field can't be stored)"""
+    types = set(map(type, values))
+    if not types <= SCALAR_TYPES:
+        return None
+    if types <= {int, float, type(None)}:
+        return 'number'
+    if len(set(values)) <= min(MAX_CATEGORY_VALUES, max(rows // 4, 256)):
+        return 'category'
+    return 'text'
+
+
+def _write_number(path, values):
+    np.save(f"{path}.npy", np.array([np.nan if value is None else value for value in values], dtype=np.float64))
+    return {'kind': 'number', 'integer': float not in set(map(type, values))}
+
+
+def _write_category(path, values):
+    vocab = [None]  # Code 0 = missing
+    # bool and int hash alike (True == 1), so key on the type too
+    codes_by_value = {(type(None), None): 0}
+    for value in dict.fromkeys(zip(map(type, values), values)):
+        if value not in codes_by_value:
+            codes_by_value[value] = len(vocab)
+            vocab.append(value[1])
+    codes = np.fromiter((codes_by_value[value] for value in zip(map(type, values), values)), dtype=np.int32, count=len(values))
+    np.save(f"{path}.npy", codes)
+    return {'kind': 'category', 'vocab': vocab}
+
+
+def _write_text(path, values):
+    encoded = [b'' if value is None else str(value).encode('utf-8') for value in values]
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    with open(f"{path}.text", 'wb') as f:
+        f.write(b''.join(encoded))
+    np.save(f"{path}.offsets.npy", offsets)
+    np.save(f"{path}.present.npy", np.array([value is not None for value in values], dtype=bool))
+    return {'kind': 'text'}
+
+
+WRITERS = {'number': _write_number, 'category': _write_category, 'text': _write_text}
+
+
+def store_path(source_path, store_dir):
+    """Directory holding the store for the current version of the source file"""
+    stat = os.stat(source_path)
+    return os.path.join(store_dir, f"v{STORE_VERSION}-{stat.st_mtime_ns}-{stat.st_size}")
+
+
+def build(source_path, store_dir):
+    """
+    Convert the gzip JSON dump into a column store (no-op if one exists for this file)
+
+    Writes into a private temporary directory and publishes it with a rename, so
+    concurrent builders only duplicate work and readers never see a partial store.
+    Returns the store directory.
+    """
+    target = store_path(source_path, store_dir)
+    if os.path.exists(os.path.join(target, META_FILE)):
+        return target
+
+    started = time.monotonic()
+    with gzip.open(source_path, 'rb') as f:
+        instruments = json.load(f)
+
+    tmp_dir = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        # Column order follows the dump's own field order so rows read back like the original dicts
+        field_order = list(dict.fromkeys(name for item in instruments for name in item))
+        columns = {}
+        for name in field_order:
+            values = [item.get(name) for item in instruments]
+            kind = _column_kind(values, len(instruments))
+            if name == KEY_COLUMN and kind == 'category':
+                # Small dumps would otherwise make the key a category with no sorted order for find()
+                kind = 'text'
+            if kind is None:
+                print(f"⚠️ Instruments store: skipping non-scalar field '{name}'")
+                continue
+            columns[name] = WRITERS[kind](os.path.join(tmp_dir, f"c{len(columns)}"), values)
+            columns[name]['file'] = f"c{len(columns) - 1}"
+
+        key_order = []
+        if columns.get(KEY_COLUMN, {}).get('kind') == 'text':
+            keys = [str(item.get(KEY_COLUMN) or '') for item in instruments]
+            key_order = sorted(range(len(keys)), key=keys.__getitem__)
+        np.save(os.path.join(tmp_dir, 'key_order.npy'), np.array(key_order, dtype=np.int64))
+
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+            json.dump({
+                'version': STORE_VERSION,
+                'rows': len(instruments),
+                'source': os.path.basename(source_path),
+                'columns': columns
+            }, f)
+
+        try:
+            os.rename(tmp_dir, target)
+        except OSError:
+            # Another process published the same store first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    print(f"✅ Built instruments store ({len(instruments)} rows, {len(columns)} columns) in {time.monotonic() - started:.1f}s")
+    _remove_old_stores(store_dir, keep=target)
+    return target
+
+
+def _remove_old_stores(store_dir, keep):
+    """
+    Delete stores for older dumps, keeping the newest KEEP_PREVIOUS_STORES besides the current one
+
+    A process that noticed the previous dump may still be opening its store;
+    keeping that generation means it is only removed after the next rebuild.
+    """
+    stores = []
+    for entry in os.listdir(store_dir):
+        path = os.path.join(store_dir, entry)
+        if path != keep and entry.startswith('v') and not entry.endswith('.tmp') and os.path.isdir(path):
+            stores.append((os.stat(path).st_mtime_ns, path))
+    for _, path in sorted(stores, reverse=True)[KEEP_PREVIOUS_STORES:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _map_blob(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class InstrumentsStore:
+    """Read-only, memory-mapped instruments table with vectorised filters"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"instruments store {path} has version {meta.get('version')}, expected {STORE_VERSION}")
+
+        self.rows_count = meta['rows']
+        self.columns = meta['columns']
+        self._arrays = {}
+        self._codes_by_value = {}
+        for name, column in self.columns.items():
+            base = os.path.join(path, column['file'])
+            if column['kind'] == 'text':
+                self._arrays[name] = (
+                    np.load(f"{base}.offsets.npy", mmap_mode='r'),
+                    np.load(f"{base}.present.npy", mmap_mode='r'),
+                    _map_blob(f"{base}.text")
+                )
+            else:
+                self._arrays[name] = np.load(f"{base}.npy", mmap_mode='r')
+            if column['kind'] == 'category':
+                self._codes_by_value[name] = {(type(v), v): code for code, v in enumerate(column['vocab']) if code}
+        self._key_order = np.load(os.path.join(path, 'key_order.npy'), mmap_mode='r')
+
+    def __len__(self):
+        return self.rows_count
+
+    def codes(self, name):
+        """Category codes of a column (0 = missing)"""
+        return self._arrays[name]
+
+    def vocab(self, name):
+        return self.columns[name]['vocab']
+
+    def code_of(self, name, value):
+        return self._codes_by_value[name].get((type(value), value), -1)
+
+    def numbers(self, name):
+        return self._arrays[name]
+
+    def mask(self, **conditions):
+        """
+        Boolean row mask, e.g. mask(segment='NSE_FO', instrument_type=('CE', 'PE'))
+
+        Each condition is a value or a tuple/list of allowed values, on a
+        category or number column; conditions are ANDed.
+        """
+        selected = np.ones(self.rows_count, dtype=bool)
+        for name, wanted in conditions.items():
+            values = wanted if isinstance(wanted, (tuple, list, set, frozenset)) else (wanted,)
+            column = self.columns.get(name)
+            if column is None:
+                return np.zeros(self.rows_count, dtype=bool)
+            if column['kind'] == 'category':
+                selected &= np.isin(self._arrays[name], [self.code_of(name, value) for value in values])
+            elif column['kind'] == 'number':
+                selected &= np.isin(self._arrays[name], np.array(values, dtype=np.float64))
+            else:
+                raise ValueError(f"'{name}' is a text column; filter on a category or number column")
+        return selected
+
+    def _column_values(self, name, rows):
+        column = self.columns[name]
+        if column['kind'] == 'category':
+            vocab = column['vocab']
+            return [vocab[code] for code in self._arrays[name][rows].tolist()]
+        if column['kind'] == 'number':
+            values = self._arrays[name][rows].tolist()
+            if column['integer']:
+                return [None if value != value else int(value) for value in values]
+            return [None if value != value else value for value in values]
+        offsets, present, blob = self._arrays[name]
+        starts = offsets[rows].tolist()
+        ends = offsets[rows + 1].tolist()
+        return [
+            blob[start:end].decode('utf-8') if flag else None
+            for start, end, flag in zip(starts, ends, present[rows].tolist())
+        ]
+
+    def rows(self, selection):
+        """Rows as new dicts (missing fields omitted), for a boolean mask or an array of row numbers"""
+        rows = np.asarray(selection)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        rows = rows.astype(np.int64, copy=False)
+        if not len(rows):
+            return []
+        names = list(self.columns)
+        values = [self._column_values(name, rows) for name in names]
+        return [
+            {name: value for name, value in zip(names, row) if value is not None}
+            for row in zip(*values)
+        ]
+
+    def row(self, row):
+        return self.rows(np.array([row]))[0]
+
+    def text(self, name, row):
+        offsets, present, blob = self._arrays[name]
+        return blob[int(offsets[row]):int(offsets[row + 1])].decode('utf-8') if present[row] else None
+
+    def find(self, instrument_key):
+        """Row number of an instrument key (binary search over the mapped sorted order), or None"""
+        low, high = 0, len(self._key_order)
+        while low < high:
+            middle = (low + high) // 2
+            if (self.text(KEY_COLUMN, int(self._key_order[middle])) or '') < instrument_key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._key_order):
+            row = int(self._key_order[low])
+            if self.text(KEY_COLUMN, row) == instrument_key:
+                return row
+        return None
+
+
+def open_store(source_path, store_dir):
+    """Open the store for the source file, building it first if needed"""
+    return InstrumentsStore(build(source_path, store_dir))
+
+
+def open_existing(source_path, store_dir):
+    """Open the store already built for the source file, or None if there is none yet (never builds)"""
+    try:
+        path = store_path(source_path, store_dir)
+    except OSError:
+        return None
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return None
+    try:
+        return InstrumentsStore(path)
+    except FileNotFoundError:
+        # Removed while opening (the source was replaced twice in quick succession)
+        return None
@@ -3,16 +3,22 @@ Third-party integrations module
 Contains integrations for Slack, Telegram, and Upstox
 """
 
-from .slack_integration import send_to_slack, slack_client
-from .telegram_integration import send_to_telegram, telegram_bot
+from .slack_integration import send_to_slack, queue_to_slack, queue_blocks_to_slack, slack_client, slack_outbox
+from .telegram_integration import send_to_telegram, queue_to_telegram, queue_text_to_telegram, telegram_bot, telegram_sender
 from .upstox_integration import upstox_client, is_authenticated, UpstoxAPI
 
 __all__ = [
     'send_to_slack',
+    'queue_to_slack',
+    'queue_blocks_to_slack',
     'send_to_telegram',
+    'queue_to_telegram',
+    'queue_text_to_telegram',
     'upstox_client',
     'is_authenticated',
     'UpstoxAPI',
     'slack_client',
-    'telegram_bot'
+    'slack_outbox',
+    'telegram_bot',
+    'telegram_sender'
 ]
@@ -4,6 +4,10 @@ Handles sending notifications to Slack channels
 """
 
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 
@@ -12,44 +16,68 @@ slack_token = os.environ.get('SLACK_BOT_TOKEN', '')
 slack_channel = os.environ.get('SLACK_CHANNEL', '#bse-announcements')
 slack_client = WebClient(token=slack_token) if slack_token else None
 
+# Outbox settings: messages queued within the batch window are coalesced into one post
+SLACK_BATCH_WINDOW_SECONDS = float(os.environ.get('SLACK_BATCH_WINDOW_SECONDS', '3'))
+SLACK_MAX_ANNOUNCEMENTS_PER_POST = 20
+SLACK_MAX_BLOCKS_PER_POST = 50  # Slack limit; one is reserved for the batch header
+SLACK_MAX_RETRIES = 5
+SLACK_MAX_BACKOFF_SECONDS = 60
+
+# Errors that will not succeed on retry
+SLACK_FATAL_ERRORS = {'channel_not_found', 'not_in_channel', 'invalid_auth', 'account_inactive',
+                      'token_revoked', 'missing_scope', 'is_archived', 'invalid_blocks'}
+
+
+def format_sentiment(sentiment):
+    """Format sentiment with emoji"""
+    return {
+        'positive': '📈 POSITIVE',
+        'negative': '📉 NEGATIVE',
+        'neutral': '➖ NEUTRAL'
+    }.get(sentiment, '❓ UNKNOWN')
+
+
+def build_announcement_blocks(company_name, bse_code, sentiment, pdf_url, announcement_time=None):
+    """Build the Slack blocks and fallback text for one announcement"""
+    sentiment_emoji = format_sentiment(sentiment)
+
+    # Format announcement time
+    time_text = f"\n*📅 Published:* {announcement_time}" if announcement_time else ""
+
+    # Create concise Slack message for quick decision-making
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"*🏛️ {company_name}*\n*BSE:* `{bse_code}` | *Sentiment:* {sentiment_emoji}{time_text}\n<{pdf_url}|📄 View PDF>"
+            }
+        },
+        {
+            "type": "divider"
+        }
+    ]
+
+    return blocks, f"{company_name} - {sentiment_emoji}"  # Fallback text
+
 
 def send_to_slack(company_name, bse_code, sentiment, summary, pdf_url, announcement_time=None):
     """Send announcement summary to Slack"""
     if not slack_client:
         print("⚠️ Slack not configured (SLACK_BOT_TOKEN not set)")
         return False
-    
+
     try:
-        # Format sentiment with emoji
-        sentiment_emoji = {
-            'positive': '📈 POSITIVE',
-            'negative': '📉 NEGATIVE',
-            'neutral': '➖ NEUTRAL'
-        }.get(sentiment, '❓ UNKNOWN')
-        
-        # Format announcement time
-        time_text = f"\n*📅 Published:* {announcement_time}" if announcement_time else ""
-        
-        # Create concise Slack message for quick decision-making
-        blocks = [
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"*🏛️ {company_name}*\n*BSE:* `{bse_code}` | *Sentiment:* {sentiment_emoji}{time_text}\n<{pdf_url}|📄 View PDF>"
-                }
-            },
-            {
-                "type": "divider"
-            }
-        ]
-        
+        blocks, fallback_text = build_announcement_blocks(
+            company_name, bse_code, sentiment, pdf_url, announcement_time
+        )
+
         response = slack_client.chat_postMessage(
             channel=slack_channel,
             blocks=blocks,
-            text=f"{company_name} - {sentiment_emoji}"  # Fallback text
+            text=fallback_text
         )
-        
+
         if response['ok']:
             print(f"✅ Sent to Slack channel: {slack_channel}")
             print(f"   Message timestamp: {response['ts']}")
@@ -57,10 +85,193 @@ def send_to_slack(company_name, bse_code, sentiment, summary, pdf_url, announcem
         else:
             print(f"❌ Slack response not OK: {response}")
             return False
-        
+
     except SlackApiError as e:
         print(f"❌ Slack API Error: {e.response['error']}")
         return False
     except Exception as e:
         print(f"❌ Error sending to Slack: {str(e)}")
         return False
+
+
+class SlackOutbox:
+    """
+    Background Slack delivery queue
+
+    Callers enqueue announcements and return immediately. A worker thread
+    coalesces everything queued within the batch window into a single
+    multi-block post per channel, honours Retry-After on 429 responses and
+    retries other transient failures with exponential backoff. Each message
+    gets a Future that resolves to True/False once its post has succeeded or
+    failed for good, so callers can record delivery only when it happened.
+    """
+
+    def __init__(self, client, default_channel, batch_window=SLACK_BATCH_WINDOW_SECONDS,
+                 max_per_post=SLACK_MAX_ANNOUNCEMENTS_PER_POST):
+        self.client = client
+        self.default_channel = default_channel
+        self.batch_window = batch_window
+        self.max_per_post = max_per_post
+        self._queue = queue.Queue()
+        self._carry = None  # Message that didn't fit in the previous batch
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {
+            'enqueued': 0,
+            'posts': 0,
+            'delivered': 0,
+            'failed': 0,
+            'rate_limited': 0
+        }
+
+    def start(self):
+        """Start the worker thread (idempotent)"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='slack-outbox', daemon=True)
+                self._thread.start()
+
+    def enqueue(self, blocks, text, channel=None):
+        """Queue one announcement's blocks for delivery; returns a Future resolving to True/False"""
+        self.start()
+        future = Future()
+        self._queue.put({
+            'channel': channel or self.default_channel,
+            'blocks': blocks,
+            'text': text,
+            'future': future
+        })
+        self.stats['enqueued'] += 1
+        return future
+
+    def pending(self):
+        """Number of messages waiting to be posted"""
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until everything queued so far has been handled"""
+        self._queue.join()
+
+    def _collect_batch(self):
+        """Wait for one message, then gather whatever else arrives within the batch window"""
+        if self._carry is not None:
+            batch, self._carry = [self._carry], None
+        else:
+            batch = [self._queue.get()]
+        block_count = len(batch[0]['blocks'])
+        deadline = time.monotonic() + self.batch_window
+
+        while len(batch) < self.max_per_post:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            # Keep room for the batch header block
+            if block_count + len(item['blocks']) > SLACK_MAX_BLOCKS_PER_POST - 1:
+                self._carry = item
+                break
+            batch.append(item)
+            block_count += len(item['blocks'])
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                by_channel = {}
+                for item in batch:
+                    by_channel.setdefault(item['channel'], []).append(item)
+
+                for channel, items in by_channel.items():
+                    delivered = self._post(channel, items)
+                    for item in items:
+                        item['future'].set_result(delivered)
+            except Exception as e:
+                print(f"❌ Slack outbox error: {str(e)}")
+            finally:
+                for item in batch:
+                    if not item['future'].done():
+                        item['future'].set_result(False)
+                    self._queue.task_done()
+
+    def _post(self, channel, items):
+        """Post a batch as one message, retrying on rate limits and transient errors"""
+        if len(items) == 1:
+            blocks = items[0]['blocks']
+            text = items[0]['text']
+        else:
+            blocks = [{
+                "type": "header",
+                "text": {"type": "plain_text", "text": f"🔔 {len(items)} new announcements"}
+            }]
+            for item in items:
+                blocks.extend(item['blocks'])
+            text = f"{len(items)} new announcements: " + ', '.join(item['text'] for item in items[:5])
+
+        for attempt in range(1, SLACK_MAX_RETRIES + 1):
+            try:
+                response = self.client.chat_postMessage(channel=channel, blocks=blocks, text=text)
+                if response['ok']:
+                    self.stats['posts'] += 1
+                    self.stats['delivered'] += len(items)
+                    print(f"✅ Sent {len(items)} announcement(s) to Slack channel: {channel}")
+                    return True
+                print(f"❌ Slack response not OK: {response}")
+
+            except SlackApiError as e:
+                error = e.response.get('error', '') if e.response is not None else ''
+
+                if e.response is not None and e.response.status_code == 429:
+                    retry_after = int(e.response.headers.get('Retry-After', 1))
+                    self.stats['rate_limited'] += 1
+                    print(f"⏳ Slack rate limited, retrying in {retry_after}s")
+                    time.sleep(retry_after)
+                    continue
+
+                if error in SLACK_FATAL_ERRORS:
+                    print(f"❌ Slack API Error (not retrying): {error}")
+                    break
+
+                print(f"❌ Slack API Error: {error} (attempt {attempt}/{SLACK_MAX_RETRIES})")
+            except Exception as e:
+                print(f"❌ Error sending to Slack: {str(e)} (attempt {attempt}/{SLACK_MAX_RETRIES})")
+
+            time.sleep(min(2 ** attempt, SLACK_MAX_BACKOFF_SECONDS))
+
+        self.stats['failed'] += len(items)
+        print(f"❌ Gave up posting {len(items)} Slack announcement(s) to {channel} after retries (not marked sent)")
+        return False
+
+
+# Global outbox (only when Slack is configured)
+slack_outbox = SlackOutbox(slack_client, slack_channel) if slack_client else None
+
+
+def queue_to_slack(company_name, bse_code, sentiment, summary, pdf_url, announcement_time=None, channel=None):
+    """
+    Queue announcement summary for batched background delivery to Slack (never blocks)
+
+    Returns a Future that resolves to True/False once posted, or None if Slack is not configured
+    """
+    if not slack_outbox:
+        print("⚠️ Slack not configured (SLACK_BOT_TOKEN not set)")
+        return None
+
+    blocks, fallback_text = build_announcement_blocks(
+        company_name, bse_code, sentiment, pdf_url, announcement_time
+    )
+    return slack_outbox.enqueue(blocks, fallback_text, channel=channel)
+
+
+def queue_blocks_to_slack(blocks, text, channel=None):
+    """Queue a pre-built message (e.g. a digest, at most 49 blocks); returns a Future or None if not configured"""
+    if not slack_outbox:
+        print("⚠️ Slack not configured (SLACK_BOT_TOKEN not set)")
+        return None
+
+    return slack_outbox.enqueue(blocks, text, channel=channel)
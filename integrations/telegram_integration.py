@@ -5,31 +5,36 @@ Handles sending notifications to Telegram channels/groups
 
 import os
 import asyncio
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import telegram
-from telegram.error import TelegramError
+from telegram.error import BadRequest, RetryAfter, TelegramError
 
 # Initialize Telegram bot
 telegram_token = os.environ.get('TELEGRAM_BOT_TOKEN', '')
 telegram_chat_id = os.environ.get('TELEGRAM_CHAT_ID', '')
 telegram_bot = telegram.Bot(token=telegram_token) if telegram_token else None
 
+# Telegram rate limits: ~1 message/sec per chat, 20 messages/min per group, 30 messages/sec overall
+TELEGRAM_CHAT_INTERVAL_SECONDS = float(os.environ.get('TELEGRAM_CHAT_INTERVAL_SECONDS', '1.0'))
+TELEGRAM_GROUP_INTERVAL_SECONDS = float(os.environ.get('TELEGRAM_GROUP_INTERVAL_SECONDS', '3.0'))
+TELEGRAM_GLOBAL_INTERVAL_SECONDS = 1 / 30
+TELEGRAM_MAX_RETRIES = 3
+TELEGRAM_SEND_TIMEOUT_SECONDS = 60
 
-def send_to_telegram(company_name, bse_code, sentiment, summary, pdf_url):
-    """Send announcement summary to Telegram"""
-    if not telegram_bot or not telegram_chat_id:
-        print("⚠️ Telegram not configured (TELEGRAM_BOT_TOKEN or TELEGRAM_CHAT_ID not set)")
-        return False
-    
-    try:
-        # Format sentiment with emoji
-        sentiment_emoji = {
-            'positive': '📈 POSITIVE',
-            'negative': '📉 NEGATIVE',
-            'neutral': '➖ NEUTRAL'
-        }.get(sentiment, '❓ UNKNOWN')
-        
-        # Create formatted message
-        message = f"""🔔 *{company_name}*
+
+def build_telegram_message(company_name, bse_code, sentiment, summary, pdf_url):
+    """Build the Markdown message for one announcement"""
+    # Format sentiment with emoji
+    sentiment_emoji = {
+        'positive': '📈 POSITIVE',
+        'negative': '📉 NEGATIVE',
+        'neutral': '➖ NEUTRAL'
+    }.get(sentiment, '❓ UNKNOWN')
+
+    # Create formatted message
+    return f"""🔔 *{company_name}*
 
 *BSE Code:* `{bse_code}`
 *Sentiment:* {sentiment_emoji}
@@ -38,26 +43,215 @@ def send_to_telegram(company_name, bse_code, sentiment, summary, pdf_url):
 {summary}
 
 [📄 View PDF on BSE]({pdf_url})"""
-        
-        # Send message using async run in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(
-            telegram_bot.send_message(
-                chat_id=telegram_chat_id,
-                text=message,
-                parse_mode='Markdown',
-                disable_web_page_preview=True
-            )
-        )
-        loop.close()
-        
-        print(f"✅ Sent to Telegram chat: {telegram_chat_id}")
-        return True
-        
-    except TelegramError as e:
-        print(f"❌ Telegram Error: {str(e)}")
+
+
+class TelegramSender:
+    """
+    Long-lived Telegram delivery service
+
+    Owns one asyncio event loop on a dedicated thread and one initialized
+    bot session (a single HTTP connection pool), instead of creating a new
+    loop and connection per message. Any thread can submit messages; they
+    are handed to the loop through a thread-safe call and sent in order
+    while respecting per-chat rate limits and RetryAfter responses.
+    """
+
+    def __init__(self, bot, default_chat_id):
+        self.bot = bot
+        self.default_chat_id = default_chat_id
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._next_send_at = {}  # chat_id -> monotonic time the chat may be messaged again
+        self._last_send_at = 0.0
+        self._started_at = None
+        self.stats = {
+            'enqueued': 0,
+            'sent': 0,
+            'failed': 0,
+            'retry_after': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0
+        }
+
+    def start(self):
+        """Start the delivery thread and wait until the bot session is ready (idempotent)"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._ready.clear()
+                self._thread = threading.Thread(target=self._thread_main, name='telegram-sender', daemon=True)
+                self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=10):
+        """Drain queued messages, close the bot session and stop the thread"""
+        if self._thread and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+            self._thread.join(timeout)
+
+    def submit(self, text, chat_id=None):
+        """Queue a message from any thread (chat_id None = default chat); returns a Future resolving to True/False"""
+        self.start()
+        future = Future()
+        item = (chat_id or self.default_chat_id, text, time.monotonic(), future)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        self.stats['enqueued'] += 1
+        return future
+
+    def pending(self):
+        """Number of messages waiting to be sent"""
+        return self._queue.qsize() if self._queue else 0
+
+    def get_stats(self):
+        """Throughput and latency figures since the service started"""
+        delivered = self.stats['sent']
+        uptime = time.monotonic() - self._started_at if self._started_at else 0
+        return {
+            **self.stats,
+            'pending': self.pending(),
+            'avg_latency_ms': round(self.stats['total_latency'] / delivered * 1000, 1) if delivered else 0.0,
+            'max_latency_ms': round(self.stats['max_latency'] * 1000, 1),
+            'throughput_per_min': round(delivered / uptime * 60, 2) if uptime else 0.0
+        }
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._started_at = time.monotonic()
+        try:
+            self._loop.run_until_complete(self.bot.initialize())
+        except Exception as e:
+            print(f"⚠️ Telegram bot initialization failed, will retry on send: {str(e)}")
+        self._ready.set()
+
+        try:
+            self._loop.run_until_complete(self._worker())
+        finally:
+            try:
+                self._loop.run_until_complete(self.bot.shutdown())
+            except Exception:
+                pass
+            self._loop.close()
+
+    async def _wait_for_rate_limit(self, chat_id):
+        """Sleep until both the per-chat and the global send intervals have passed"""
+        now = time.monotonic()
+        ready_at = max(self._next_send_at.get(chat_id, 0.0),
+                       self._last_send_at + TELEGRAM_GLOBAL_INTERVAL_SECONDS)
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+        # Groups and channels have negative chat IDs and a stricter limit
+        interval = TELEGRAM_GROUP_INTERVAL_SECONDS if str(chat_id).startswith('-') else TELEGRAM_CHAT_INTERVAL_SECONDS
+        self._last_send_at = time.monotonic()
+        self._next_send_at[chat_id] = self._last_send_at + interval
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+
+            chat_id, text, enqueued_at, future = item
+            success = await self._send(chat_id, text)
+
+            if success:
+                latency = time.monotonic() - enqueued_at
+                self.stats['sent'] += 1
+                self.stats['total_latency'] += latency
+                self.stats['max_latency'] = max(self.stats['max_latency'], latency)
+            else:
+                self.stats['failed'] += 1
+
+            if not future.done():
+                future.set_result(success)
+
+    async def _send(self, chat_id, text):
+        parse_mode = 'Markdown'
+        for attempt in range(1, TELEGRAM_MAX_RETRIES + 1):
+            await self._wait_for_rate_limit(chat_id)
+            try:
+                await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    parse_mode=parse_mode,
+                    disable_web_page_preview=True
+                )
+                print(f"✅ Sent to Telegram chat: {chat_id}")
+                return True
+
+            except BadRequest as e:
+                # The same request would be rejected again, so don't back off and block the queue
+                if parse_mode and "can't parse" in str(e).lower():
+                    print(f"⚠️ Telegram rejected the Markdown ({str(e)}), resending as plain text")
+                    parse_mode = None
+                    continue
+                print(f"❌ Telegram rejected the message for chat {chat_id}: {str(e)}")
+                return False
+
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+                self.stats['retry_after'] += 1
+                print(f"⏳ Telegram flood control, retrying in {retry_after}s")
+                self._next_send_at[chat_id] = time.monotonic() + retry_after
+            except TelegramError as e:
+                print(f"❌ Telegram Error: {str(e)} (attempt {attempt}/{TELEGRAM_MAX_RETRIES})")
+                await asyncio.sleep(2 ** attempt)
+            except Exception as e:
+                print(f"❌ Error sending to Telegram: {str(e)} (attempt {attempt}/{TELEGRAM_MAX_RETRIES})")
+                await asyncio.sleep(2 ** attempt)
+
+        return False
+
+
+# Global sender whenever there is a bot token (TELEGRAM_CHAT_ID is only the default for messages without a chat_id)
+telegram_sender = TelegramSender(telegram_bot, telegram_chat_id or None) if telegram_bot else None
+
+
+def _is_deliverable(chat_id):
+    """Check there is a sender and a chat to send to, warning if not"""
+    if not telegram_sender:
+        print("⚠️ Telegram not configured (TELEGRAM_BOT_TOKEN not set)")
+        return False
+    if not (chat_id or telegram_sender.default_chat_id):
+        print("⚠️ No Telegram chat to send to (no chat_id given and TELEGRAM_CHAT_ID not set)")
         return False
-    except Exception as e:
-        print(f"❌ Error sending to Telegram: {str(e)}")
+    return True
+
+
+def queue_to_telegram(company_name, bse_code, sentiment, summary, pdf_url, chat_id=None):
+    """
+    Queue announcement summary for background delivery to Telegram (never blocks on the network)
+
+    Returns a Future that resolves to True/False once delivered, or None if Telegram is not configured
+    or there is no chat (chat_id not given and no TELEGRAM_CHAT_ID default)
+    """
+    if not _is_deliverable(chat_id):
+        return None
+
+    message = build_telegram_message(company_name, bse_code, sentiment, summary, pdf_url)
+    return telegram_sender.submit(message, chat_id=chat_id)
+
+
+def queue_text_to_telegram(text, chat_id=None):
+    """Queue a pre-built Markdown message (e.g. a digest); returns a Future or None if it can't be delivered"""
+    if not _is_deliverable(chat_id):
+        return None
+
+    return telegram_sender.submit(text, chat_id=chat_id)
+
+
+def send_to_telegram(company_name, bse_code, sentiment, summary, pdf_url):
+    """Send announcement summary to Telegram"""
+    future = queue_to_telegram(company_name, bse_code, sentiment, summary, pdf_url)
+    if future is None:
+        return False
+
+    try:
+        return future.result(timeout=TELEGRAM_SEND_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        print(f"❌ Telegram send timed out after {TELEGRAM_SEND_TIMEOUT_SECONDS}s (still queued)")
         return False
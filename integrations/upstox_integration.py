@@ -327,40 +327,10 @@ class UpstoxAPI:
             return {'error': str(e)}
     
     def get_next_expiry_date(self):
-        """Calculate next monthly expiry date (last Thursday of current/next month)"""
-        from datetime import datetime, timedelta
-        import calendar
-        
-        today = datetime.now()
-        
-        # Start with current month
-        year = today.year
-        month = today.month
-        
-        # Get last day of the month
-        last_day = calendar.monthrange(year, month)[1]
-        
-        # Find last Thursday
-        for day in range(last_day, 0, -1):
-            date = datetime(year, month, day)
-            if date.weekday() == 3:  # Thursday is 3
-                # If the expiry is in the past, move to next month
-                if date < today:
-                    # Move to next month
-                    if month == 12:
-                        year += 1
-                        month = 1
-                    else:
-                        month += 1
-                    last_day = calendar.monthrange(year, month)[1]
-                    for day in range(last_day, 0, -1):
-                        date = datetime(year, month, day)
-                        if date.weekday() == 3:
-                            return date.strftime('%Y-%m-%d')
-                else:
-                    return date.strftime('%Y-%m-%d')
-        
-        return today.strftime('%Y-%m-%d')
+        """Next monthly F&O expiry (last Tuesday, moved earlier for exchange holidays)"""
+        import trading_calendar
+        
+        return trading_calendar.next_monthly_expiry().strftime('%Y-%m-%d')
     
     def get_options_chain(self, symbol, expiry_date=None):
         """Get options chain (all CE/PE) for a symbol"""
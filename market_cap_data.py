@@ -4,17 +4,42 @@ Fetches and determines market cap category for BSE listed companies
 """
 import requests
 import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
-def get_market_cap_category(bse_code):
-    """
-    Determine market cap category for a company
-    
-    Categories:
-    - Large Cap: Market cap >= 20,000 Cr
-    - Mid Cap: Market cap >= 5,000 Cr and < 20,000 Cr
-    - Small Cap: Market cap >= 500 Cr and < 5,000 Cr
-    - Micro Cap: Market cap < 500 Cr
-    """
+# Persistent cache: BSE code -> {'crores': float or None, 'fetched_at': epoch seconds}
+MARKET_CAP_CACHE_FILE = os.path.join(os.environ.get('STATE_DIR', 'state'), 'market_cap_cache.json')
+
+# Market caps move slowly; failed lookups are retried much sooner
+MARKET_CAP_TTL_HOURS = float(os.environ.get('MARKET_CAP_TTL_HOURS', '24'))
+MARKET_CAP_NEGATIVE_TTL_MINUTES = float(os.environ.get('MARKET_CAP_NEGATIVE_TTL_MINUTES', '30'))
+
+# Concurrent BSE quote requests during a prefetch
+MARKET_CAP_FETCH_WORKERS = int(os.environ.get('MARKET_CAP_FETCH_WORKERS', '8'))
+
+# Category boundaries in crores, ascending: Micro < 500 <= Small < 5,000 <= Mid < 20,000 <= Large
+MARKET_CAP_BREAKPOINTS = tuple(float(x) for x in os.environ.get('MARKET_CAP_BREAKPOINTS', '500,5000,20000').split(','))
+
+# One shared object per category (index 0 = Unknown, then one per breakpoint bucket, smallest first)
+MARKET_CAP_CATEGORIES = (
+    {'category': 'Unknown', 'emoji': '⚪', 'color': '#9ca3af'},
+    {'category': 'Micro Cap', 'emoji': '🔴', 'color': '#ef4444'},
+    {'category': 'Small Cap', 'emoji': '🟠', 'color': '#f97316'},
+    {'category': 'Mid Cap', 'emoji': '🟡', 'color': '#f59e0b'},
+    {'category': 'Large Cap', 'emoji': '🟢', 'color': '#10b981'},
+)
+
+if len(MARKET_CAP_BREAKPOINTS) != len(MARKET_CAP_CATEGORIES) - 2:
+    raise ValueError(f"MARKET_CAP_BREAKPOINTS needs {len(MARKET_CAP_CATEGORIES) - 2} values, got {MARKET_CAP_BREAKPOINTS}")
+
+_breakpoints = np.array(MARKET_CAP_BREAKPOINTS)
+
+def fetch_market_cap(bse_code):
+    """Fetch market cap in crores from the BSE quote header API (None if the request fails or has no market cap)"""
     try:
         # Try to fetch from BSE API
         url = f"https://api.bseindia.com/BseIndiaAPI/api/ComHeadernew/w"
@@ -38,16 +63,30 @@ def get_market_cap_category(bse_code):
             # Extract market cap (in Crores)
             market_cap_str = data.get('MktCap', '0')
             
-            # Clean and convert market cap
+            # Clean and convert market cap; a missing or unparsable value is a failed
+            # lookup (negative TTL), not a real zero that would be cached as Micro Cap
             market_cap = parse_market_cap(market_cap_str)
-            
-            # Classify
-            return classify_market_cap(market_cap)
+            return market_cap if market_cap > 0 else None
         
     except Exception as e:
         print(f"Error fetching market cap for {bse_code}: {str(e)}")
     
-    return 'Unknown'
+    return None
+
+def get_market_cap_category(bse_code):
+    """
+    Determine market cap category for a company
+    
+    Categories:
+    - Large Cap: Market cap >= 20,000 Cr
+    - Mid Cap: Market cap >= 5,000 Cr and < 20,000 Cr
+    - Small Cap: Market cap >= 500 Cr and < 5,000 Cr
+    - Micro Cap: Market cap < 500 Cr
+    """
+    market_cap = fetch_market_cap(bse_code)
+    if market_cap is None:
+        return 'Unknown'
+    return classify_market_cap(market_cap)
 
 def parse_market_cap(market_cap_str):
     """Parse market cap string to float (in Crores)"""
@@ -63,46 +102,162 @@ def parse_market_cap(market_cap_str):
         return 0
 
 def classify_market_cap(market_cap_crores):
-    """Classify market cap into categories"""
-    if market_cap_crores >= 20000:
-        return {
-            'category': 'Large Cap',
-            'emoji': '🟢',
-            'color': '#10b981'
-        }
-    elif market_cap_crores >= 5000:
-        return {
-            'category': 'Mid Cap',
-            'emoji': '🟡',
-            'color': '#f59e0b'
-        }
-    elif market_cap_crores >= 500:
-        return {
-            'category': 'Small Cap',
-            'emoji': '🟠',
-            'color': '#f97316'
-        }
-    elif market_cap_crores > 0:
-        return {
-            'category': 'Micro Cap',
-            'emoji': '🔴',
-            'color': '#ef4444'
-        }
-    else:
-        return {
-            'category': 'Unknown',
-            'emoji': '⚪',
-            'color': '#9ca3af'
-        }
+    """Classify market cap into categories (returns a shared category object - don't modify it)"""
+    if not market_cap_crores or market_cap_crores <= 0:
+        return MARKET_CAP_CATEGORIES[0]
+    return MARKET_CAP_CATEGORIES[bisect_right(MARKET_CAP_BREAKPOINTS, market_cap_crores) + 1]
 
-# Cache for market cap data (to avoid repeated API calls)
-market_cap_cache = {}
+def category_indices(crores):
+    """Category index into MARKET_CAP_CATEGORIES for an array of market caps (NaN or <= 0 -> Unknown)"""
+    crores = np.asarray(crores, dtype=np.float64)
+    indices = np.searchsorted(_breakpoints, crores, side='right') + 1
+    indices[~(crores > 0)] = 0
+    return indices
 
-def get_market_cap_with_cache(bse_code):
-    """Get market cap with caching"""
-    if bse_code in market_cap_cache:
-        return market_cap_cache[bse_code]
+# Cache for market cap data (to avoid repeated API calls), loaded from disk on first use
+market_cap_cache = None
+_cache_lock = threading.Lock()
+_cache_version = 0  # Bumped on every change so the array table knows to rebuild
+
+def _load_cache():
+    global market_cap_cache
+    with _cache_lock:
+        if market_cap_cache is None:
+            try:
+                with open(MARKET_CAP_CACHE_FILE, 'r') as f:
+                    market_cap_cache = json.load(f)
+                print(f"📂 Loaded {len(market_cap_cache)} cached market caps")
+            except FileNotFoundError:
+                market_cap_cache = {}
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable market cap cache: {str(e)}")
+                market_cap_cache = {}
+        return market_cap_cache
+
+def save_cache():
+    """Write the cache to disk (atomic replace)"""
+    cache = _load_cache()
+    try:
+        os.makedirs(os.path.dirname(MARKET_CAP_CACHE_FILE) or '.', exist_ok=True)
+        tmp_path = f"{MARKET_CAP_CACHE_FILE}.{os.getpid()}.tmp"
+        with _cache_lock:
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f)
+        os.replace(tmp_path, MARKET_CAP_CACHE_FILE)
+        return True
+    except Exception as e:
+        print(f"❌ Error saving market cap cache: {str(e)}")
+        return False
+
+def _is_expired(entry, now=None):
+    now = now or time.time()
+    if entry.get('crores') is None:
+        return now - entry['fetched_at'] >= MARKET_CAP_NEGATIVE_TTL_MINUTES * 60
+    return now - entry['fetched_at'] >= MARKET_CAP_TTL_HOURS * 3600
+
+def _store(bse_code, crores):
+    global _cache_version
+    cache = _load_cache()
+    with _cache_lock:
+        cache[str(bse_code)] = {'crores': crores, 'fetched_at': time.time()}
+        _cache_version += 1
+
+def get_cached_market_cap(bse_code):
+    """Market cap category from the cache only - never touches the network (stale values are still used)"""
+    entry = _load_cache().get(str(bse_code))
+    return classify_market_cap((entry or {}).get('crores'))
+
+class MarketCapTable:
+    """Market caps as two parallel arrays: sorted int64 BSE codes and float64 crores (NaN = unknown)"""
+
+    def __init__(self, cache):
+        items = sorted((int(code), entry.get('crores')) for code, entry in cache.items() if code.isdigit())
+        self.codes = np.array([code for code, _ in items], dtype=np.int64)
+        self.crores = np.array([np.nan if value is None else value for _, value in items], dtype=np.float64)
+
+    def lookup(self, bse_codes):
+        """Market caps for a batch of BSE codes (NaN where unknown)"""
+        keys = np.array([int(code) if str(code).isdigit() else -1 for code in bse_codes], dtype=np.int64)
+        if not len(self.codes) or not len(keys):
+            return np.full(len(keys), np.nan)
+        positions = np.minimum(np.searchsorted(self.codes, keys), len(self.codes) - 1)
+        return np.where(self.codes[positions] == keys, self.crores[positions], np.nan)
+
+_table = None
+_table_version = -1
+
+def market_cap_table():
+    """Array table for the current cache (rebuilt only after the cache changes)"""
+    global _table, _table_version
+    cache = _load_cache()
+    with _cache_lock:
+        if _table is None or _table_version != _cache_version:
+            _table = MarketCapTable(cache)
+            _table_version = _cache_version
+        return _table
+
+def classify_batch(bse_codes):
+    """Market caps and category objects for a batch of BSE codes from the cache - never touches the network
+    
+    Returns (crores, categories): floats or None where unknown, and shared category objects.
+    """
+    crores = market_cap_table().lookup(bse_codes)
+    categories = [MARKET_CAP_CATEGORIES[i] for i in category_indices(crores)]
+    return [None if np.isnan(value) else float(value) for value in crores], categories
+
+def select_by_market_cap(announcements, categories=None, min_crores=None, sort_desc=False):
+    """Filter announcements by market cap category names / minimum crores and optionally sort largest first"""
+    if not announcements or not (categories or min_crores or sort_desc):
+        return announcements
+    
+    crores = np.array([np.nan if a.get('market_cap_crores') is None else a['market_cap_crores'] for a in announcements])
+    keep = np.ones(len(announcements), dtype=bool)
+    if categories:
+        names = np.array([a.get('market_cap') or 'Unknown' for a in announcements])
+        keep &= np.isin(names, list(categories))
+    if min_crores:
+        keep &= crores >= min_crores
+    
+    order = np.flatnonzero(keep)
+    if sort_desc:
+        # Stable, so equal or unknown market caps keep their time order (unknown last)
+        order = order[np.argsort(-np.nan_to_num(crores[order], nan=-1.0), kind='stable')]
+    return [announcements[i] for i in order]
+
+def prefetch_market_caps(bse_codes, force=False):
+    """
+    Fetch market caps for every code that is missing or expired, concurrently, then save the cache
     
-    result = get_market_cap_category(bse_code)
-    market_cap_cache[bse_code] = result
-    return result
+    Returns the number of codes fetched.
+    """
+    cache = _load_cache()
+    now = time.time()
+    codes = sorted({
+        str(code) for code in bse_codes
+        if force or str(code) not in cache or _is_expired(cache[str(code)], now)
+    })
+    if not codes:
+        return 0
+    
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=MARKET_CAP_FETCH_WORKERS) as pool:
+        for code, crores in zip(codes, pool.map(fetch_market_cap, codes)):
+            _store(code, crores)
+    
+    save_cache()
+    failed = sum(1 for code in codes if cache[code]['crores'] is None)
+    print(f"📈 Prefetched {len(codes)} market caps in {time.monotonic() - started:.1f}s ({failed} failed)")
+    return len(codes)
+
+def refresh_all_market_caps():
+    """Nightly job: re-fetch every cached code plus all F&O stocks"""
+    import reference_data
+    codes = set(_load_cache()) | set(reference_data.current().fo_bse_codes)
+    return prefetch_market_caps(codes, force=True)
+
+def get_market_cap_with_cache(bse_code):
+    """Get market cap with caching (fetches on a miss or expired entry)"""
+    entry = _load_cache().get(str(bse_code))
+    if entry is None or _is_expired(entry):
+        prefetch_market_caps([bse_code])
+    return get_cached_market_cap(bse_code)
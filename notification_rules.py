@@ -0,0 +1,168 @@
+"""
+Notification Routing Rules
+Loads per-channel routing rules from JSON and compiles them into bitmask indexes
+"""
+
+import json
+import os
+import threading
+import nse_indices
+import reference_data
+
+# Rules file (reloaded automatically when it changes on disk)
+NOTIFICATION_RULES_FILE = os.environ.get('NOTIFICATION_RULES_FILE', os.path.join('resources', 'notification_rules.json'))
+
+# Attributes a rule can match on; each maps to a function returning the announcement's values
+MATCH_ATTRIBUTES = {
+    'indices': lambda ann: nse_indices.indices_from_mask(ann.get('index_mask', 0)),
+    'sector': lambda ann: [ann['sector']] if ann.get('sector') else [],
+    'market_cap': lambda ann: [ann.get('market_cap') or 'Unknown'],
+    'fo_eligible': lambda ann: [bool(ann.get('index_mask', 0) & reference_data.FO_BIT)],
+    'symbols': lambda ann: [v for v in (ann.get('nse_symbol'), ann.get('bse_code')) if v],
+}
+
+# Sentiment is only known after analysis, so it is matched in a second phase
+SENTIMENT_ATTRIBUTE = 'sentiment'
+
+SINKS = ('slack', 'telegram')
+
+# Used when the rules file is missing: the original Nifty-index-to-Slack behaviour
+DEFAULT_RULES = [{
+    'name': 'nifty-indices',
+    'sink': 'slack',
+    'match': {'indices': ['NIFTY50', 'NIFTYNEXT50', 'NIFTY500']}
+}]
+
+
+def normalize_value(value):
+    """Rule and announcement values compare case-insensitively"""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().upper()
+
+
+class RoutingRules:
+    """
+    Compiled routing rules
+
+    Every rule gets one bit. For each attribute the compiler builds an
+    inverted index value -> bitmask of rules accepting that value, plus a
+    mask of rules that don't constrain the attribute. Matching an
+    announcement ORs the masks for its values and ANDs across attributes,
+    so the cost depends on the number of attributes, not the number of rules.
+    """
+
+    def __init__(self, rules):
+        self.rules = []
+        self.index = {attr: {} for attr in list(MATCH_ATTRIBUTES) + [SENTIMENT_ATTRIBUTE]}
+        self.unconstrained = {attr: 0 for attr in self.index}
+        self._destinations = {}
+
+        for rule in rules:
+            self._compile(rule)
+
+    def _compile(self, rule):
+        if not rule.get('enabled', True):
+            return
+
+        sink = rule.get('sink', 'slack')
+        if sink not in SINKS:
+            print(f"⚠️ Skipping rule {rule.get('name')}: unknown sink {sink}")
+            return
+
+        match = rule.get('match', {})
+        unknown = set(match) - set(self.index)
+        if unknown:
+            print(f"⚠️ Skipping rule {rule.get('name')}: unknown attributes {sorted(unknown)}")
+            return
+
+        bit = 1 << len(self.rules)
+        self.rules.append({
+            'name': rule.get('name', f'rule-{len(self.rules) + 1}'),
+            'sink': sink,
+            'target': rule.get('channel') or rule.get('chat_id'),  # None = integration default
+        })
+
+        for attr in self.index:
+            values = match.get(attr)
+            if values is None:
+                self.unconstrained[attr] |= bit
+                continue
+            if not isinstance(values, list):
+                values = [values]
+            for value in values:
+                key = normalize_value(value)
+                self.index[attr][key] = self.index[attr].get(key, 0) | bit
+
+    def _attribute_mask(self, attr, values):
+        mask = self.unconstrained[attr]
+        lookup = self.index[attr]
+        for value in values:
+            mask |= lookup.get(normalize_value(value), 0)
+        return mask
+
+    def candidates(self, ann):
+        """Bitmask of rules whose pre-analysis conditions match the announcement"""
+        mask = (1 << len(self.rules)) - 1
+        for attr, get_values in MATCH_ATTRIBUTES.items():
+            mask &= self._attribute_mask(attr, get_values(ann))
+            if not mask:
+                break
+        return mask
+
+    def candidates_batch(self, announcements):
+        """Candidate masks for a whole batch in one pass"""
+        return [self.candidates(ann) for ann in announcements]
+
+    def match_sentiment(self, mask, sentiment):
+        """Narrow a candidate mask once the sentiment is known"""
+        return mask & self._attribute_mask(SENTIMENT_ATTRIBUTE, [sentiment])
+
+    def destinations(self, mask):
+        """Unique (sink, target) pairs for a mask (memoised per mask)"""
+        if mask not in self._destinations:
+            found = []
+            for i, rule in enumerate(self.rules):
+                if mask >> i & 1 and (rule['sink'], rule['target']) not in found:
+                    found.append((rule['sink'], rule['target']))
+            self._destinations[mask] = found
+        return self._destinations[mask]
+
+    def rule_names(self, mask):
+        return [rule['name'] for i, rule in enumerate(self.rules) if mask >> i & 1]
+
+
+_rules = None
+_rules_mtime = None
+_rules_lock = threading.Lock()
+
+
+def load_rules(path=NOTIFICATION_RULES_FILE):
+    """Load and compile rules from JSON ({"rules": [...]}), falling back to DEFAULT_RULES"""
+    try:
+        with open(path, 'r') as f:
+            rules = json.load(f).get('rules', [])
+        compiled = RoutingRules(rules)
+        print(f"✅ Loaded {len(compiled.rules)} notification rule(s) from {path}")
+        return compiled
+    except FileNotFoundError:
+        print(f"⚠️ {path} not found, using default rule (Nifty indices → Slack)")
+    except Exception as e:
+        print(f"❌ Error loading notification rules: {str(e)}")
+    return RoutingRules(DEFAULT_RULES)
+
+
+def get_rules(path=NOTIFICATION_RULES_FILE):
+    """Compiled rules, recompiled only when the file's mtime changes"""
+    global _rules, _rules_mtime
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+
+    with _rules_lock:
+        if _rules is None or mtime != _rules_mtime:
+            _rules = load_rules(path)
+            _rules_mtime = mtime
+        return _rules
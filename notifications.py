@@ -0,0 +1,353 @@
+"""
+Notification Dispatch Module
+Routes analysed announcements to Slack/Telegram, immediately or batched into digests
+"""
+
+import os
+import threading
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+import pytz
+import nse_indices
+import shared_state
+from integrations import slack_integration, telegram_integration
+from integrations.slack_integration import format_sentiment
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# Opt-in digest windows in IST, comma separated HH:MM-HH:MM (may wrap past midnight), e.g. '15:30-09:00'
+# to batch after-hours filings; empty (the default) sends every announcement immediately
+DIGEST_WINDOWS = os.environ.get('DIGEST_WINDOWS', '')
+
+# How often buffered announcements are sent as one digest
+DIGEST_INTERVAL_MINUTES = int(os.environ.get('DIGEST_INTERVAL_MINUTES', '30'))
+
+# Buffered announcements survive restarts in this state file until their digest is posted
+DIGEST_BUFFER_FILE = 'digest_buffer.json'
+
+# Digest grouping order (an announcement is listed under its largest index)
+DIGEST_INDEX_ORDER = ['NIFTY50', 'NIFTYNEXT50', 'NIFTY500']
+DIGEST_SENTIMENT_ORDER = ['positive', 'negative', 'neutral']
+
+# Message size limits
+SLACK_SECTION_MAX_CHARS = 2900  # Slack allows 3000 per section
+SLACK_DIGEST_MAX_BLOCKS = 45
+TELEGRAM_MAX_CHARS = 4000  # Telegram allows 4096
+
+
+def parse_windows(spec):
+    """Parse 'HH:MM-HH:MM,...' into a list of (start_minute, end_minute) tuples"""
+    windows = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            start, end = part.split('-')
+            start_h, start_m = (int(x) for x in start.split(':'))
+            end_h, end_m = (int(x) for x in end.split(':'))
+            windows.append((start_h * 60 + start_m, end_h * 60 + end_m))
+        except ValueError:
+            print(f"⚠️ Ignoring invalid digest window: {part}")
+    return windows
+
+
+digest_windows = parse_windows(DIGEST_WINDOWS)
+
+
+def in_digest_window(now=None):
+    """Check if notifications should be buffered into a digest at this time"""
+    now = now or datetime.now(IST)
+    minute = now.hour * 60 + now.minute
+
+    for start, end in digest_windows:
+        if start <= end:
+            if start <= minute < end:
+                return True
+        elif minute >= start or minute < end:  # Wraps past midnight
+            return True
+    return False
+
+
+class DigestBuffer:
+    """
+    Thread-safe, persisted list of (destination, announcement) pairs waiting for the next digest
+
+    Every change is written atomically to a state file, so a crash or SIGTERM
+    before the digest goes out loses nothing. Entries are taken for a flush
+    and only removed once that digest has been posted; failed flushes put
+    them back for the next interval.
+    """
+
+    def __init__(self, name=DIGEST_BUFFER_FILE):
+        self.name = name
+        self._items = []  # {'id', 'destination': [sink, target], 'entry'}
+        self._taken = set()
+        self._lock = threading.Lock()
+
+        data = shared_state.read_state(name)
+        if data:
+            self._items = data.get('items', [])
+            if self._items:
+                print(f"🗂️ Restored {len(self._items)} buffered digest item(s) from {shared_state.state_path(name)}")
+
+    def _persist(self):
+        try:
+            shared_state.write_state(self.name, {'items': self._items})
+            return True
+        except Exception as e:
+            print(f"❌ Error saving digest buffer: {str(e)}")
+            return False
+
+    def add(self, item):
+        """Buffer one (destination, entry) pair; returns True once it is on disk"""
+        destination, entry = item
+        with self._lock:
+            self._items.append({'id': uuid.uuid4().hex, 'destination': list(destination), 'entry': entry})
+            return self._persist()
+
+    def take(self):
+        """Claim everything buffered and not already being flushed, as [(id, destination, entry)]"""
+        with self._lock:
+            taken = [item for item in self._items if item['id'] not in self._taken]
+            self._taken.update(item['id'] for item in taken)
+        return [(item['id'], tuple(item['destination']), item['entry']) for item in taken]
+
+    def done(self, ids):
+        """Remove delivered items"""
+        ids = set(ids)
+        with self._lock:
+            self._items = [item for item in self._items if item['id'] not in ids]
+            self._taken -= ids
+            self._persist()
+
+    def release(self, ids):
+        """Return items whose digest failed, for the next flush"""
+        with self._lock:
+            self._taken -= set(ids)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+digest_buffer = DigestBuffer()
+
+
+def primary_index(index_mask):
+    """Largest index an announcement belongs to, or 'OTHER'"""
+    for index_name in DIGEST_INDEX_ORDER:
+        if index_mask & nse_indices.INDEX_BITS[index_name]:
+            return index_name
+    return 'OTHER'
+
+
+def _send_now(entry, sink, target):
+    """Queue one announcement for one destination (target None = integration default); returns a Future or None"""
+    if sink == 'slack':
+        return slack_integration.queue_to_slack(
+            entry['company_name'], entry['bse_code'], entry['sentiment'],
+            entry['summary'], entry['pdf_link'], entry['date_time'], channel=target
+        )
+
+    if sink == 'telegram':
+        return telegram_integration.queue_to_telegram(
+            entry['company_name'], entry['bse_code'], entry['sentiment'],
+            entry['summary'], entry['pdf_link'], chat_id=target
+        )
+
+    return None
+
+
+def _resolved(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def notify(ann, result, destinations):
+    """
+    Send an analysed announcement to its routed destinations, or buffer it when inside a digest window
+
+    Args:
+        destinations: list of (sink, target) pairs from notification_rules
+
+    Returns a list of (destination, Future) for every destination it was queued or buffered for;
+    each Future resolves to True once the destination has the announcement (buffering counts).
+    """
+    entry = {
+        'company_name': ann['company_name'],
+        'bse_code': ann['bse_code'],
+        'index_mask': ann.get('index_mask', 0),
+        'pdf_link': ann.get('pdf_link'),
+        'date_time': ann.get('date_time', 'N/A'),
+        'raw_timestamp': ann.get('raw_timestamp', ''),
+        'sentiment': result['sentiment'],
+        'summary': result['summary']
+    }
+
+    if in_digest_window():
+        deliveries = [(destination, _resolved(digest_buffer.add((destination, entry)))) for destination in destinations]
+        print(f"   🗂️ Buffered for digest ({len(digest_buffer)} pending)")
+        return deliveries
+
+    deliveries = []
+    for sink, target in destinations:
+        future = _send_now(entry, sink, target)
+        if future is not None:
+            deliveries.append(((sink, target), future))
+    return deliveries
+
+
+def group_digest(entries):
+    """Group entries as [(index, [(sentiment, [entries sorted by time])])] in display order"""
+    groups = {}
+    for entry in entries:
+        key = (primary_index(entry['index_mask']), entry['sentiment'])
+        groups.setdefault(key, []).append(entry)
+
+    grouped = []
+    for index_name in DIGEST_INDEX_ORDER + ['OTHER']:
+        sentiments = []
+        for sentiment in DIGEST_SENTIMENT_ORDER + ['unknown']:
+            items = groups.pop((index_name, sentiment), None)
+            if items:
+                sentiments.append((sentiment, sorted(items, key=lambda e: e['raw_timestamp'])))
+        if sentiments:
+            grouped.append((index_name, sentiments))
+
+    # Anything with an unexpected sentiment value
+    for (index_name, sentiment), items in groups.items():
+        grouped.append((index_name, [(sentiment, sorted(items, key=lambda e: e['raw_timestamp']))]))
+
+    return grouped
+
+
+def _chunk_lines(header, lines, max_chars):
+    """
+    Split (line, item_id) pairs into (text, item_ids) of at most max_chars, repeating the header on each
+
+    item_id is None for group headings; every item's line lands in exactly one chunk.
+    """
+    chunks = []
+    current = header
+    ids = set()
+    for line, item_id in lines:
+        if len(current) + len(line) + 1 > max_chars and current != header:
+            chunks.append((current, ids))
+            current = header
+            ids = set()
+        current += '\n' + line
+        if item_id is not None:
+            ids.add(item_id)
+    chunks.append((current, ids))
+    return chunks
+
+
+def build_slack_digest(grouped, total, title):
+    """Build Slack digest messages as a list of (blocks, fallback_text, buffer ids listed in that message)"""
+    blocks = []
+    for index_name, sentiments in grouped:
+        blocks.append(({"type": "header", "text": {"type": "plain_text", "text": f"🏷️ {index_name}"}}, set()))
+        for sentiment, items in sentiments:
+            header = f"*{format_sentiment(sentiment)}* ({len(items)})"
+            lines = [(f"• <{e['pdf_link']}|{e['company_name']}> `{e['bse_code']}` {e['date_time']}", e['id']) for e in items]
+            for text, ids in _chunk_lines(header, lines, SLACK_SECTION_MAX_CHARS):
+                blocks.append(({"type": "section", "text": {"type": "mrkdwn", "text": text}}, ids))
+
+    messages = []
+    for start in range(0, len(blocks), SLACK_DIGEST_MAX_BLOCKS):
+        part = blocks[start:start + SLACK_DIGEST_MAX_BLOCKS]
+        message_blocks = [{"type": "header", "text": {"type": "plain_text", "text": f"🗞️ {title} - {total} announcement(s)"}}]
+        message_blocks.extend(block for block, _ in part)
+        messages.append((message_blocks, f"{title}: {total} announcement(s)", set().union(*(ids for _, ids in part))))
+    return messages
+
+
+def build_telegram_digest(grouped, total, title):
+    """Build Telegram digest messages as (text, buffer ids listed in it), split to stay under the size limit"""
+    lines = []
+    for index_name, sentiments in grouped:
+        lines.append((f"\n🏷️ *{index_name}*", None))
+        for sentiment, items in sentiments:
+            lines.append((f"{format_sentiment(sentiment)} ({len(items)})", None))
+            lines.extend((f"• [{e['company_name']}]({e['pdf_link']}) `{e['bse_code']}`", e['id']) for e in items)
+
+    return _chunk_lines(f"🗞️ *{title}* - {total} announcement(s)", lines, TELEGRAM_MAX_CHARS)
+
+
+def flush_digest():
+    """
+    Send everything buffered as one sorted summary per destination (scheduled every DIGEST_INTERVAL_MINUTES)
+
+    A long digest goes out as several messages, each listing its own items; an item
+    leaves the persisted buffer only when the message listing it has been posted.
+    """
+    taken = digest_buffer.take()
+    if not taken:
+        return 0
+
+    by_destination = {}
+    for item_id, destination, entry in taken:
+        by_destination.setdefault(destination, []).append({**entry, 'id': item_id})
+
+    title = f"Announcements digest {datetime.now(IST).strftime('%d %b %H:%M')} IST"
+
+    for (sink, target), entries in by_destination.items():
+        grouped = group_digest(entries)
+
+        if sink == 'slack':
+            parts = [
+                (slack_integration.queue_blocks_to_slack(blocks, text, channel=target), ids)
+                for blocks, text, ids in build_slack_digest(grouped, len(entries), title)
+            ]
+        elif sink == 'telegram':
+            parts = [
+                (telegram_integration.queue_text_to_telegram(text, chat_id=target), ids)
+                for text, ids in build_telegram_digest(grouped, len(entries), title)
+            ]
+        else:
+            parts = [(None, {entry['id'] for entry in entries})]
+
+        if any(future is None for future, _ in parts):
+            # Destination can never be reached - don't keep its items forever
+            print(f"⚠️ Discarding {len(entries)} digest item(s) for unavailable {sink} {target or '(default)'}")
+            digest_buffer.done(entry['id'] for entry in entries)
+            continue
+
+        for number, (future, ids) in enumerate(parts, 1):
+            def on_posted(future, ids=ids, sink=sink, target=target, part=f"{number}/{len(parts)}"):
+                if not future.cancelled() and future.exception() is None and future.result():
+                    digest_buffer.done(ids)
+                    print(f"🗞️ Sent digest part {part} ({len(ids)} announcement(s)) to {sink} {target or '(default)'}")
+                else:
+                    digest_buffer.release(ids)
+                    print(f"❌ Digest part {part} to {sink} {target or '(default)'} failed; {len(ids)} item(s) kept for the next flush")
+
+            future.add_done_callback(on_posted)
+
+    return len(taken)
+
+
+def wait_for_delivery():
+    """Block until queued Slack posts have been handled (used on shutdown)"""
+    if slack_integration.slack_outbox:
+        slack_integration.slack_outbox.flush()
+
+
+def get_stats():
+    """Delivery queue depth, throughput and latency per integration, plus digest state"""
+    return {
+        'slack': {
+            **slack_integration.slack_outbox.stats,
+            'pending': slack_integration.slack_outbox.pending()
+        } if slack_integration.slack_outbox else None,
+        'telegram': telegram_integration.telegram_sender.get_stats() if telegram_integration.telegram_sender else None,
+        'digest': {
+            'active': in_digest_window(),
+            'pending': len(digest_buffer),
+            'windows': DIGEST_WINDOWS,
+            'interval_minutes': DIGEST_INTERVAL_MINUTES
+        }
+    }
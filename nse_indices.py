@@ -6,6 +6,8 @@ Fetches and caches Nifty 50, Nifty Next 50, and Nifty 500 stock lists
 import requests
 import json
 import os
+import threading
+import time
 from datetime import datetime, timedelta
 
 # Cache file paths
@@ -14,9 +16,28 @@ NIFTY50_CACHE = os.path.join(CACHE_DIR, 'nifty50.json')
 NIFTYNEXT50_CACHE = os.path.join(CACHE_DIR, 'niftynext50.json')
 NIFTY500_CACHE = os.path.join(CACHE_DIR, 'nifty500.json')
 
+CACHE_FILES = {
+    'NIFTY50': NIFTY50_CACHE,
+    'NIFTYNEXT50': NIFTYNEXT50_CACHE,
+    'NIFTY500': NIFTY500_CACHE
+}
+
+# Index membership bits. 8 is taken by F&O eligibility (reference_data.FO_BIT), so
+# further indices such as NIFTYBANK and NIFTYIT continue at 16, 32, ...
+INDEX_BITS = {
+    'NIFTY50': 1,
+    'NIFTYNEXT50': 2,
+    'NIFTY500': 4
+}
+
 # Cache validity (refresh daily)
 CACHE_VALIDITY_HOURS = 24
 
+# Parsed index data per index name -> (cache file mtime_ns, data); avoids re-reading unchanged files
+_loaded = {}
+_symbol_masks = None  # NSE symbol -> OR of INDEX_BITS, built on first membership check
+_lock = threading.Lock()
+
 # NSE official URLs for index constituents
 NSE_URLS = {
     'NIFTY50': 'https://www.niftyindices.com/IndexConstituent/ind_nifty50list.csv',
@@ -30,20 +51,20 @@ def ensure_cache_dir():
         os.makedirs(CACHE_DIR)
         print(f"✅ Created cache directory: {CACHE_DIR}")
 
-def is_cache_valid(cache_file):
-    """Check if cache file exists and is still valid"""
-    if not os.path.exists(cache_file):
+def is_data_fresh(data):
+    """Check if fetched index data is younger than CACHE_VALIDITY_HOURS"""
+    if not data or 'cached_at' not in data:
         return False
-    
+    age = datetime.now() - datetime.fromisoformat(data['cached_at'])
+    return age.total_seconds() < (CACHE_VALIDITY_HOURS * 3600)
+
+def is_cache_valid(cache_file):
+    """Check if cache file exists and is still valid (by file modification time - the file is written when fetched)"""
     try:
-        with open(cache_file, 'r') as f:
-            data = json.load(f)
-            cached_time = datetime.fromisoformat(data['cached_at'])
-            age = datetime.now() - cached_time
-            return age.total_seconds() < (CACHE_VALIDITY_HOURS * 3600)
-    except Exception as e:
-        print(f"⚠️ Cache validation error: {e}")
+        age = time.time() - os.path.getmtime(cache_file)
+    except OSError:
         return False
+    return age < (CACHE_VALIDITY_HOURS * 3600)
 
 def parse_nse_csv(csv_text):
     """Parse NSE CSV data and extract stock information"""
@@ -126,20 +147,52 @@ def load_from_cache(cache_file):
         print(f"❌ Error loading cache: {e}")
         return None
 
-def get_index_stocks(index_name, cache_file):
-    """Get index stocks with caching"""
+def get_index_stocks(index_name, cache_file, fetch=True):
+    """
+    Get index stocks with caching (each cache file is parsed once until it changes)
+
+    With fetch=False only the cache file is read (an expired one is used as is);
+    web processes do this and leave downloading to the worker.
+    """
+    global _symbol_masks
+    
     # Try cache first
     if is_cache_valid(cache_file):
+        mtime_ns = os.stat(cache_file).st_mtime_ns
+        memo = _loaded.get(index_name)
+        if memo and memo[0] == mtime_ns:
+            return memo[1]
+        
         print(f"📂 Loading {index_name} from cache...")
         data = load_from_cache(cache_file)
         if data:
             print(f"✅ Loaded {data['count']} stocks from cache")
+            _loaded[index_name] = (mtime_ns, data)
+            _symbol_masks = None
             return data
     
     # Fetch from NSE
-    data = fetch_index_from_nse(index_name)
+    data = fetch_index_from_nse(index_name) if fetch else None
     if data:
         save_to_cache(data, cache_file)
+        try:
+            _loaded[index_name] = (os.stat(cache_file).st_mtime_ns, data)
+        except OSError:
+            pass
+        _symbol_masks = None
+        return data
+    
+    # NSE unreachable: an expired list is better than none
+    memo = _loaded.get(index_name)
+    if memo:
+        return memo[1]
+    if os.path.exists(cache_file):
+        if fetch:
+            print(f"⚠️ Using expired {index_name} cache")
+        data = load_from_cache(cache_file)
+        if data:
+            _loaded[index_name] = (os.stat(cache_file).st_mtime_ns, data)
+            _symbol_masks = None
     
     return data
 
@@ -155,48 +208,61 @@ def get_nifty500():
     """Get Nifty 500 stocks"""
     return get_index_stocks('NIFTY500', NIFTY500_CACHE)
 
-def get_all_indices():
-    """Get all NSE indices"""
+def get_all_indices(fetch=True):
+    """Get all NSE indices (fetch=False reads the cache files only)"""
     return {
-        'nifty50': get_nifty50(),
-        'niftynext50': get_niftynext50(),
-        'nifty500': get_nifty500()
+        'nifty50': get_index_stocks('NIFTY50', NIFTY50_CACHE, fetch),
+        'niftynext50': get_index_stocks('NIFTYNEXT50', NIFTYNEXT50_CACHE, fetch),
+        'nifty500': get_index_stocks('NIFTY500', NIFTY500_CACHE, fetch)
     }
 
-def create_symbol_lookup():
-    """Create a lookup dictionary for quick checking if a symbol is in any index"""
-    all_data = get_all_indices()
-    lookup = {}
-    
+def build_symbol_masks(all_data):
+    """Map each NSE symbol to the OR of INDEX_BITS for the indices it belongs to"""
+    masks = {}
     for index_name, data in all_data.items():
-        if data and 'stocks' in data:
+        bit = INDEX_BITS.get(index_name.upper())
+        if bit and data and 'stocks' in data:
             for stock in data['stocks']:
                 symbol = stock['nse_symbol']
-                if symbol not in lookup:
-                    lookup[symbol] = []
-                lookup[symbol].append(index_name.upper())
+                masks[symbol] = masks.get(symbol, 0) | bit
+    return masks
+
+def indices_from_mask(mask):
+    """Index names set in a membership mask, in INDEX_BITS order"""
+    return [index_name for index_name, bit in INDEX_BITS.items() if mask & bit]
+
+def create_symbol_lookup(all_data=None):
+    """Create a lookup dictionary for quick checking if a symbol is in any index
     
-    return lookup
+    Pass already loaded data (from get_all_indices) to avoid loading it again.
+    Symbols with the same membership share one list - treat them as read-only.
+    """
+    masks = build_symbol_masks(all_data if all_data is not None else get_all_indices())
+    lists = {mask: indices_from_mask(mask) for mask in set(masks.values())}
+    return {symbol: lists[mask] for symbol, mask in masks.items()}
+
+def get_symbol_masks():
+    """Symbol -> membership mask for the loaded indices (loaded once, rebuilt after a cache refresh)"""
+    global _symbol_masks
+    with _lock:
+        if _symbol_masks is None:
+            _symbol_masks = build_symbol_masks(get_all_indices())
+        return _symbol_masks
+
+def get_index_mask(nse_symbol):
+    """Membership mask of a stock (0 if in no tracked index)"""
+    return get_symbol_masks().get(nse_symbol, 0)
+
+def get_stock_indices(nse_symbol):
+    """List of indices a stock belongs to"""
+    return indices_from_mask(get_index_mask(nse_symbol))
 
 def is_in_index(nse_symbol, index_name):
     """Check if a stock is in a specific index"""
-    index_name = index_name.upper()
-    
-    cache_files = {
-        'NIFTY50': NIFTY50_CACHE,
-        'NIFTYNEXT50': NIFTYNEXT50_CACHE,
-        'NIFTY500': NIFTY500_CACHE
-    }
-    
-    cache_file = cache_files.get(index_name)
-    if not cache_file:
+    bit = INDEX_BITS.get(index_name.upper())
+    if not bit:
         return False
-    
-    data = get_index_stocks(index_name, cache_file)
-    if not data or 'stocks' not in data:
-        return False
-    
-    return any(stock['nse_symbol'] == nse_symbol for stock in data['stocks'])
+    return bool(get_index_mask(nse_symbol) & bit)
 
 if __name__ == '__main__':
     """Test the module"""
@@ -0,0 +1,142 @@
+"""
+Options Index
+NSE F&O option contracts arranged as underlying -> expiry -> sorted strikes -> (CE, PE), built once per instruments refresh
+
+Built with vectorised sorts over the columnar instruments store; the index holds
+only row numbers, and contracts are materialised as dicts when a query returns them.
+"""
+
+from bisect import bisect_left
+from datetime import date, timedelta
+import numpy as np
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+
+MS_PER_DAY = 86_400_000
+IST_OFFSET_MS = 19_800_000  # +05:30
+EPOCH = date(1970, 1, 1)
+
+
+def _underlying(item):
+    """Exact underlying symbol of a contract (never a substring match on the trading symbol)"""
+    return (item.get('underlying_symbol') or item.get('asset_symbol') or item.get('trading_symbol', '').split(' ')[0]).upper()
+
+
+class OptionChain:
+    """One expiry of one underlying: strikes sorted ascending, with the store rows of the CE and PE (-1 if none)"""
+
+    __slots__ = ('strikes', 'calls', 'puts')
+
+    def __init__(self, strikes, calls, puts):
+        self.strikes = strikes
+        self.calls = calls
+        self.puts = puts
+
+    def between(self, strike_min=None, strike_max=None):
+        """Slice of strikes in [strike_min, strike_max]"""
+        start = 0 if strike_min is None else int(np.searchsorted(self.strikes, strike_min, side='left'))
+        end = len(self.strikes) if strike_max is None else int(np.searchsorted(self.strikes, strike_max, side='right'))
+        return slice(start, end)
+
+
+class OptionsIndex:
+    """Option contracts by exact underlying, with expiries and strikes sorted for O(log n) range queries"""
+
+    def __init__(self, store):
+        self._store = store
+        self._expiries = {}
+        self._chains = {}
+        if 'instrument_type' not in store.columns or 'expiry' not in store.columns:
+            return
+
+        rows = np.flatnonzero(store.mask(segment='NSE_FO', instrument_type=('CE', 'PE')))
+        rows = rows[~np.isnan(store.numbers('expiry')[rows]) & ~np.isnan(store.numbers('strike_price')[rows])]
+        if not len(rows):
+            return
+
+        # Expiry as an IST calendar day number, computed for all contracts at once
+        days = ((store.numbers('expiry')[rows].astype(np.int64) + IST_OFFSET_MS) // MS_PER_DAY)
+        strikes = np.asarray(store.numbers('strike_price')[rows])
+        is_call = np.asarray(store.codes('instrument_type')[rows]) == store.code_of('instrument_type', 'CE')
+        underlyings = self._underlying_names(store, rows)
+        names, underlying_ids = np.unique(underlyings, return_inverse=True)
+
+        order = np.lexsort((strikes, days, underlying_ids))
+        rows, days, strikes, is_call, underlying_ids = rows[order], days[order], strikes[order], is_call[order], underlying_ids[order]
+
+        # One chain per (underlying, expiry) run in the sorted order
+        starts = np.flatnonzero(np.r_[True, (underlying_ids[1:] != underlying_ids[:-1]) | (days[1:] != days[:-1])])
+        ends = np.r_[starts[1:], len(rows)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            unique_strikes, slot = np.unique(strikes[start:end], return_inverse=True)
+            calls = np.full(len(unique_strikes), -1, dtype=np.int64)
+            puts = np.full(len(unique_strikes), -1, dtype=np.int64)
+            group_calls = is_call[start:end]
+            calls[slot[group_calls]] = rows[start:end][group_calls]
+            puts[slot[~group_calls]] = rows[start:end][~group_calls]
+
+            underlying = str(names[underlying_ids[start]])
+            expiry = EPOCH + timedelta(days=int(days[start]))
+            self._expiries.setdefault(underlying, []).append(expiry)
+            self._chains.setdefault(underlying, {})[expiry] = OptionChain(unique_strikes, calls, puts)
+
+    @staticmethod
+    def _underlying_names(store, rows):
+        """Upper-cased underlying per row, from the category codes (rows without one fall back per row)"""
+        for column in ('underlying_symbol', 'asset_symbol'):
+            if column in store.columns and store.columns[column]['kind'] == 'category':
+                vocab = np.array([(value or '').upper() if isinstance(value, str) else '' for value in store.vocab(column)], dtype=object)
+                names = vocab[np.asarray(store.codes(column)[rows])]
+                break
+        else:
+            names = np.full(len(rows), '', dtype=object)
+
+        for position in np.flatnonzero(names == '').tolist():
+            names[position] = _underlying(store.row(int(rows[position])))
+        return names.astype(str)
+
+    def __contains__(self, underlying):
+        return underlying.upper() in self._chains
+
+    def underlyings(self):
+        return sorted(self._chains)
+
+    def expiries(self, underlying, from_date=None):
+        """Sorted expiry dates, optionally only those on or after from_date (one bisect, no per-contract filtering)"""
+        expiries = self._expiries.get(underlying.upper(), [])
+        if from_date is None:
+            return list(expiries)
+        return expiries[bisect_left(expiries, from_date):]
+
+    def chain(self, underlying, expiry, strike_min=None, strike_max=None):
+        """[(strike, CE contract or None, PE contract or None)] for one expiry, optionally within a strike range"""
+        chain = self._chains.get(underlying.upper(), {}).get(expiry)
+        if chain is None:
+            return []
+        selected = chain.between(strike_min, strike_max)
+        calls, puts = chain.calls[selected], chain.puts[selected]
+        found = np.r_[calls[calls >= 0], puts[puts >= 0]]
+        contracts = dict(zip(found.tolist(), self._store.rows(found)))
+        return [
+            (strike, contracts.get(ce), contracts.get(pe))
+            for strike, ce, pe in zip(chain.strikes[selected].tolist(), calls.tolist(), puts.tolist())
+        ]
+
+    def option_rows(self, underlying, from_date=None, expiry=None, strike_min=None, strike_max=None):
+        """Store row numbers of contracts (CE then PE per strike), by expiry then strike"""
+        expiries = [expiry] if expiry else self.expiries(underlying, from_date)
+        chains = self._chains.get(underlying.upper(), {})
+        parts = []
+        for day in expiries:
+            chain = chains.get(day)
+            if chain is None:
+                continue
+            selected = chain.between(strike_min, strike_max)
+            pairs = np.stack([chain.calls[selected], chain.puts[selected]], axis=1).ravel()
+            parts.append(pairs[pairs >= 0])
+        return np.concatenate(parts) if parts else np.array([], dtype=np.int64)
+
+    def options(self, underlying, from_date=None, expiry=None, strike_min=None, strike_max=None):
+        """Flat list of contracts as new dicts (CE then PE per strike), by expiry then strike"""
+        return self._store.rows(self.option_rows(underlying, from_date, expiry, strike_min, strike_max))
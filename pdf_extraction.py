@@ -0,0 +1,311 @@
+"""
+PDF Text Extraction Module
+Pluggable text-extraction backends for announcement PDFs, selected by configuration
+"""
+
+import io
+import os
+import re
+
+# Backend used when PDF_EXTRACTION_BACKEND is not set (or names an unavailable backend)
+DEFAULT_BACKEND = 'pypdf2'
+
+# Pages are joined with a form feed so later stages can still tell pages apart
+PAGE_SEPARATOR = '\f'
+
+# Document kinds reported by probe_pdf()
+PDF_KIND_TEXT = 'text'              # Has a text layer - worth extracting
+PDF_KIND_IMAGE_ONLY = 'image_only'  # Scanned pages, images but no text operators
+PDF_KIND_EMPTY = 'empty'            # Neither text nor images on the probed pages
+PDF_KIND_ENCRYPTED = 'encrypted'    # Cannot be opened without a password
+
+# Pages inspected by the probe (filings put their content up front)
+PROBE_PAGES = 2
+
+# Text-showing operators in a content stream: Tj, TJ, ' and "
+TEXT_OPERATOR_PATTERN = re.compile(rb'(?:\bT[jJ]|[\'"])\s')
+
+# Nesting limit when following Form XObjects (guards against reference cycles)
+MAX_FORM_DEPTH = 5
+
+
+class PDFBackend:
+    """Base class for a PDF text-extraction backend"""
+
+    name = None
+
+    def is_available(self):
+        """Return True if the library behind this backend can be imported"""
+        raise NotImplementedError
+
+    def extract_pages(self, pdf_bytes, max_pages=None):
+        """Return (page_texts, total_page_count) for the given PDF bytes"""
+        raise NotImplementedError
+
+
+class PyPDF2Backend(PDFBackend):
+    """Pure-Python extraction using PyPDF2 (the original behaviour)"""
+
+    name = 'pypdf2'
+
+    def is_available(self):
+        try:
+            import PyPDF2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def extract_pages(self, pdf_bytes, max_pages=None):
+        import PyPDF2
+
+        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        pages = reader.pages if max_pages is None else reader.pages[:max_pages]
+        return [page.extract_text() or '' for page in pages], len(reader.pages)
+
+
+class PdfMinerBackend(PDFBackend):
+    """Layout-aware extraction using pdfminer.six (slower, better with odd encodings)"""
+
+    name = 'pdfminer'
+
+    def is_available(self):
+        try:
+            import pdfminer.high_level  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def extract_pages(self, pdf_bytes, max_pages=None):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+        from pdfminer.pdfpage import PDFPage
+
+        total_pages = sum(1 for _ in PDFPage.get_pages(io.BytesIO(pdf_bytes)))
+
+        page_texts = []
+        for page_layout in extract_pages(io.BytesIO(pdf_bytes), maxpages=max_pages or 0):
+            page_texts.append(''.join(
+                element.get_text() for element in page_layout if isinstance(element, LTTextContainer)
+            ))
+        return page_texts, total_pages
+
+
+class PyMuPDFBackend(PDFBackend):
+    """Native extraction using PyMuPDF (fitz) - usually the fastest option"""
+
+    name = 'pymupdf'
+
+    def is_available(self):
+        try:
+            import fitz  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def extract_pages(self, pdf_bytes, max_pages=None):
+        import fitz
+
+        with fitz.open(stream=pdf_bytes, filetype='pdf') as document:
+            page_count = document.page_count if max_pages is None else min(max_pages, document.page_count)
+            page_texts = [document.load_page(i).get_text() for i in range(page_count)]
+            return page_texts, document.page_count
+
+
+# Registry of all known backends (name -> instance)
+BACKENDS = {
+    backend.name: backend
+    for backend in (PyPDF2Backend(), PdfMinerBackend(), PyMuPDFBackend())
+}
+
+
+def available_backends():
+    """Return names of backends whose libraries are installed"""
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
+
+
+def get_backend(name=None):
+    """
+    Resolve an extraction backend
+
+    Uses the explicit name if given, otherwise PDF_EXTRACTION_BACKEND from the
+    environment. Falls back to PyPDF2 when the requested backend is unknown or
+    its library is not installed.
+    """
+    name = (name or os.environ.get('PDF_EXTRACTION_BACKEND', DEFAULT_BACKEND)).lower()
+    backend = BACKENDS.get(name)
+
+    if backend is None:
+        print(f"⚠️ Unknown PDF backend '{name}', using {DEFAULT_BACKEND}")
+        return BACKENDS[DEFAULT_BACKEND]
+
+    if not backend.is_available():
+        print(f"⚠️ PDF backend '{name}' is not installed, using {DEFAULT_BACKEND}")
+        return BACKENDS[DEFAULT_BACKEND]
+
+    return backend
+
+
+def read_pdf_bytes(pdf_source):
+    """Return raw bytes for a local file path or an in-memory PDF"""
+    if isinstance(pdf_source, (bytes, bytearray)):
+        return bytes(pdf_source)
+    with open(pdf_source, 'rb') as f:
+        return f.read()
+
+
+def _form_xobjects(resources):
+    """Form XObjects referenced from a resources dictionary"""
+    if not resources:
+        return []
+    xobjects = resources.get_object().get('/XObject')
+    if not xobjects:
+        return []
+    forms = []
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get('/Subtype') == '/Form':
+            forms.append(xobject)
+    return forms
+
+
+def _resource_summary(resources, depth=0):
+    """Return (has_fonts, image_count) for a resources dictionary, following nested Form XObjects"""
+    if not resources:
+        return False, 0
+
+    resources = resources.get_object()
+    has_fonts = bool(resources.get('/Font'))
+    image_count = 0
+
+    xobjects = resources.get('/XObject')
+    if xobjects:
+        for xobject in xobjects.get_object().values():
+            xobject = xobject.get_object()
+            subtype = xobject.get('/Subtype')
+            if subtype == '/Image':
+                image_count += 1
+            elif subtype == '/Form' and depth < MAX_FORM_DEPTH:
+                form_fonts, form_images = _resource_summary(xobject.get('/Resources'), depth + 1)
+                has_fonts = has_fonts or form_fonts
+                image_count += form_images
+
+    return has_fonts, image_count
+
+
+def _forms_have_text_operators(resources, depth=0):
+    """Check Form XObject streams (e.g. pages wrapped by show_pdf_page / stamping tools) for text operators"""
+    if depth >= MAX_FORM_DEPTH:
+        return False
+    for form in _form_xobjects(resources):
+        if TEXT_OPERATOR_PATTERN.search(form.get_data()):
+            return True
+        if _forms_have_text_operators(form.get('/Resources'), depth + 1):
+            return True
+    return False
+
+
+def _has_text_operators(page):
+    """Check a page's content stream(s), and the Form XObjects it draws, for text-showing operators"""
+    contents = page.get('/Contents')
+    if contents is not None:
+        contents = contents.get_object()
+        streams = contents if isinstance(contents, list) else [contents]
+        if any(TEXT_OPERATOR_PATTERN.search(stream.get_object().get_data()) for stream in streams):
+            return True
+
+    return _forms_have_text_operators(page.get('/Resources'))
+
+
+def probe_pdf(pdf_source, max_pages=PROBE_PAGES):
+    """
+    Cheaply classify a PDF without extracting its text
+
+    Looks at the first pages' font resources, image XObjects and content
+    stream operators. Scanned filings have images but no fonts or text
+    operators, so they can skip extraction and the LLM entirely.
+
+    Returns:
+        One of PDF_KIND_TEXT, PDF_KIND_IMAGE_ONLY, PDF_KIND_EMPTY, PDF_KIND_ENCRYPTED
+    """
+    import PyPDF2
+
+    pdf_bytes = read_pdf_bytes(pdf_source)
+
+    try:
+        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+        if reader.is_encrypted:
+            # Many filings are "encrypted" only with an empty user password
+            try:
+                if not reader.decrypt(''):
+                    return PDF_KIND_ENCRYPTED
+            except Exception:
+                return PDF_KIND_ENCRYPTED
+
+        has_text = False
+        image_count = 0
+
+        for page in reader.pages[:max_pages]:
+            page_fonts, page_images = _resource_summary(page.get('/Resources'))
+            image_count += page_images
+
+            if page_fonts and _has_text_operators(page):
+                has_text = True
+                break
+
+        if has_text:
+            return PDF_KIND_TEXT
+        if image_count:
+            return PDF_KIND_IMAGE_ONLY
+        return PDF_KIND_EMPTY
+
+    except Exception as e:
+        # Decryption errors can surface while reading pages
+        if b'/Encrypt' in pdf_bytes:
+            return PDF_KIND_ENCRYPTED
+        # If the probe can't make sense of it, let the full extractor try
+        print(f"⚠️ PDF probe failed ({str(e)}), assuming text")
+        return PDF_KIND_TEXT
+
+
+def extract_pdf(pdf_source, max_pages=5, max_chars=None, backend=None, probe=True):
+    """
+    Extract text from a PDF with the configured backend
+
+    Args:
+        pdf_source: Local file path or PDF bytes
+        max_pages: Number of pages to read from the start (None for all)
+        max_chars: Truncate the joined text to this many characters (None for no limit)
+        backend: Backend name to override the configured one
+        probe: Run probe_pdf() first and skip extraction for non-text documents
+
+    Returns:
+        dict with 'text' (pages joined by PAGE_SEPARATOR), 'pages' (pages read),
+        'total_pages', 'backend' and 'kind' (see probe_pdf)
+    """
+    extractor = get_backend(backend)
+    pdf_bytes = read_pdf_bytes(pdf_source)
+
+    kind = probe_pdf(pdf_bytes) if probe else PDF_KIND_TEXT
+    if kind != PDF_KIND_TEXT:
+        print(f"   ⏭️ Skipping text extraction: PDF is {kind}")
+        return {
+            'text': '',
+            'pages': 0,
+            'total_pages': None,
+            'backend': extractor.name,
+            'kind': kind
+        }
+
+    page_texts, total_pages = extractor.extract_pages(pdf_bytes, max_pages=max_pages)
+    text = PAGE_SEPARATOR.join(page_texts)
+    if max_chars is not None:
+        text = text[:max_chars]
+
+    return {
+        'text': text,
+        'pages': len(page_texts),
+        'total_pages': total_pages,
+        'backend': extractor.name,
+        'kind': kind
+    }
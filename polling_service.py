@@ -0,0 +1,203 @@
+"""
+Announcement Polling Service
+Runs the announcement check on one scheduler job, at most one run at a time, with cadence set by a polling policy
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import pytz
+from apscheduler.triggers.interval import IntervalTrigger
+import trading_calendar
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# Poll intervals (session hours and holidays come from trading_calendar)
+MARKET_HOURS_INTERVAL_SECONDS = int(os.environ.get('MARKET_HOURS_INTERVAL_SECONDS', '60'))
+OFF_HOURS_INTERVAL_SECONDS = int(os.environ.get('OFF_HOURS_INTERVAL_SECONDS', '600'))
+
+# How often the scheduler wakes up to check whether a poll is due
+POLL_TICK_SECONDS = 5
+
+# Adaptive polling: interval moves between floor and ceiling with the smoothed arrival rate
+ADAPTIVE_FLOOR_SECONDS = int(os.environ.get('ADAPTIVE_FLOOR_SECONDS', '10'))
+ADAPTIVE_CEILING_SECONDS = int(os.environ.get('ADAPTIVE_CEILING_SECONDS', '900'))
+ADAPTIVE_SMOOTHING = 0.3  # EWMA weight of the latest observation
+ADAPTIVE_TARGET_NEW_PER_POLL = 1.0  # Aim to pick up about one new filing per poll
+
+# Hard cap on requests to BSE per rolling hour (each poll = main page + API call)
+BSE_HOURLY_REQUEST_BUDGET = int(os.environ.get('BSE_HOURLY_REQUEST_BUDGET', '240'))
+BSE_REQUESTS_PER_POLL = 2
+
+
+class MarketSessionPolicy:
+    """Poll every minute during trading sessions (9:00-15:30 IST on trading days), every 10 minutes otherwise"""
+
+    def __init__(self, market_interval=MARKET_HOURS_INTERVAL_SECONDS, off_hours_interval=OFF_HOURS_INTERVAL_SECONDS):
+        self.market_interval = market_interval
+        self.off_hours_interval = off_hours_interval
+
+    def is_market_hours(self, now):
+        return trading_calendar.is_trading_session(now)
+
+    def session(self, now):
+        if self.is_market_hours(now):
+            return 'market'
+        return 'off_hours' if trading_calendar.is_trading_day(now.date()) else 'closed'
+
+    def next_interval(self, now, result=None):
+        """Seconds until the next poll (result is what the last run returned)"""
+        return self.market_interval if self.is_market_hours(now) else self.off_hours_interval
+
+    def get_status(self):
+        return {}
+
+
+class AdaptivePollingPolicy(MarketSessionPolicy):
+    """
+    Poll faster when filings are arriving, slower when quiet
+
+    The check returns the NEWSIDs it fetched; IDs not present in the
+    previous poll count as arrivals. An exponentially weighted moving
+    average of arrivals/second sets the next interval so that about
+    ADAPTIVE_TARGET_NEW_PER_POLL filings are expected per poll, clamped
+    between the floor and the session ceiling (the fixed market-hours
+    cadence during the session, ADAPTIVE_CEILING_SECONDS otherwise). A
+    rolling one-hour window enforces BSE_HOURLY_REQUEST_BUDGET.
+    """
+
+    def __init__(self, floor=ADAPTIVE_FLOOR_SECONDS, ceiling=ADAPTIVE_CEILING_SECONDS,
+                 hourly_budget=BSE_HOURLY_REQUEST_BUDGET, **kwargs):
+        super().__init__(**kwargs)
+        self.floor = floor
+        self.ceiling = ceiling
+        self.hourly_budget = hourly_budget
+        self.rate = 0.0  # Smoothed new filings per second
+        self._previous_ids = None
+        self._last_poll_at = None
+        self._polls = deque()  # Monotonic times of recent polls (for the budget)
+
+    def observe(self, news_ids):
+        """Update the arrival rate from the IDs returned by one poll"""
+        now = time.monotonic()
+        current = set(news_ids)
+
+        if self._previous_ids is not None and self._last_poll_at is not None:
+            elapsed = max(now - self._last_poll_at, 1.0)
+            arrivals = len(current - self._previous_ids)
+            self.rate = ADAPTIVE_SMOOTHING * (arrivals / elapsed) + (1 - ADAPTIVE_SMOOTHING) * self.rate
+
+        self._previous_ids = current
+        self._last_poll_at = now
+
+    def _budget_wait(self, now):
+        """Seconds until another poll fits in the hourly request budget"""
+        while self._polls and now - self._polls[0] >= 3600:
+            self._polls.popleft()
+
+        max_polls = max(1, self.hourly_budget // BSE_REQUESTS_PER_POLL)
+        if len(self._polls) < max_polls:
+            return 0
+        return 3600 - (now - self._polls[len(self._polls) - max_polls])
+
+    def next_interval(self, now, result=None):
+        self._polls.append(time.monotonic())
+        if result is not None:
+            self.observe(result)
+
+        ceiling = self.market_interval if self.is_market_hours(now) else self.ceiling
+        if self.rate > 0:
+            interval = ADAPTIVE_TARGET_NEW_PER_POLL / self.rate
+        else:
+            interval = ceiling
+        interval = min(max(interval, self.floor), ceiling)
+
+        return max(interval, self._budget_wait(time.monotonic()))
+
+    def get_status(self):
+        return {
+            'arrival_rate_per_min': round(self.rate * 60, 2),
+            'bse_requests_last_hour': len(self._polls) * BSE_REQUESTS_PER_POLL,
+            'bse_hourly_budget': self.hourly_budget
+        }
+
+
+class PollingService:
+    """
+    Single-flight poller
+
+    One scheduler job ticks every POLL_TICK_SECONDS (max_instances=1,
+    coalesce=True, so late ticks collapse into one) and runs the check when
+    the policy says it is due. A non-blocking lock guarantees manual runs
+    and scheduled runs never overlap.
+    """
+
+    def __init__(self, scheduler, check, policy=None, job_id='announcement_poller'):
+        self.scheduler = scheduler
+        self.check = check
+        self.policy = policy or MarketSessionPolicy()
+        self.job_id = job_id
+        self._run_lock = threading.Lock()
+        self._next_run_at = 0.0  # monotonic
+        self.stats = {
+            'runs': 0,
+            'skipped_busy': 0,
+            'errors': 0,
+            'last_run_at': None,
+            'last_duration_seconds': None,
+            'next_interval_seconds': None
+        }
+
+    def start(self):
+        """Register the tick job (replaces any existing job with the same ID)"""
+        self.scheduler.add_job(
+            self._tick,
+            IntervalTrigger(seconds=POLL_TICK_SECONDS, timezone=IST),
+            id=self.job_id,
+            name='Announcement Poller',
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+
+    def _tick(self):
+        if time.monotonic() >= self._next_run_at:
+            self.run_once()
+
+    def run_once(self):
+        """Run the check now unless a run is already in progress; returns False if skipped"""
+        if not self._run_lock.acquire(blocking=False):
+            self.stats['skipped_busy'] += 1
+            print("⏭️ Announcement check already running, skipping")
+            return False
+
+        started = time.monotonic()
+        result = None
+        try:
+            result = self.check()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"❌ Error in announcement check: {str(e)}")
+        finally:
+            now = datetime.now(IST)
+            interval = self.policy.next_interval(now, result)
+            self._next_run_at = started + interval
+            self.stats['runs'] += 1
+            self.stats['last_run_at'] = now.strftime('%Y-%m-%d %H:%M:%S')
+            self.stats['last_duration_seconds'] = round(time.monotonic() - started, 2)
+            self.stats['next_interval_seconds'] = interval
+            self._run_lock.release()
+
+        return True
+
+    def get_status(self):
+        """Current session, cadence and run counters"""
+        return {
+            **self.stats,
+            **self.policy.get_status(),
+            'session': self.policy.session(datetime.now(IST)),
+            'running': self._run_lock.locked(),
+            'next_run_in_seconds': max(0, round(self._next_run_at - time.monotonic(), 1))
+        }
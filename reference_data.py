@@ -0,0 +1,368 @@
+"""
+Reference Data Module
+F&O stock list, NSE index membership and BSE -> NSE symbol lookups
+
+All lookup tables live in one immutable ReferenceTables value. Reloads build
+new tables off to the side and swap the module reference in one assignment,
+so readers never take a lock and never see a half-built table. A watcher
+thread reloads whichever tables' source files change on disk.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+import nse_indices
+import reference_snapshot
+import security_master
+
+# Announcement membership bits: NSE indices plus F&O eligibility
+FO_BIT = 8
+MEMBERSHIP_BITS = {**nse_indices.INDEX_BITS, 'FO': FO_BIT}
+
+FO_STOCKS_FILE = os.path.join('resources', 'fo_stocks.json')
+FO_INSTRUMENT_KEYS_FILE = os.path.join('resources', 'fo_instrument_keys.json')
+
+# How often the watcher checks source files for changes
+RELOAD_CHECK_SECONDS = int(os.environ.get('REFERENCE_RELOAD_SECONDS', '30'))
+
+# Retry NSE index downloads (missing or expired lists) at most this often
+INDEX_RETRY_SECONDS = 300
+
+# Lookup tables reported by the readiness endpoint
+TABLES = ('fo_stocks', 'nse_indices', 'security_master')
+_load_status = {}  # table -> {'state': 'loaded'/'failed', 'count', 'error', 'loaded_at', 'seconds'}
+_status_lock = threading.Lock()
+
+# Treat every field as read-only: tables are shared by all readers until the next swap
+ReferenceTables = namedtuple('ReferenceTables', [
+    'fo_stocks_data',      # Parsed fo_stocks.json
+    'fo_bse_codes',        # frozenset of F&O BSE codes
+    'fo_nse_symbols',      # frozenset of F&O NSE symbols
+    'bse_to_nse_mapping',  # BSE code -> NSE symbol
+    'fo_sectors',          # NSE symbol -> sector from the F&O list
+    'instrument_keys',     # NSE symbol -> Upstox instrument key (NSE_EQ|<ISIN>)
+    'nse_indices_data',    # Index name -> constituent data
+    'nse_symbol_lookup',   # NSE symbol -> list of indices it belongs to
+    'nse_symbol_masks',    # NSE symbol -> index membership bitmask (nse_indices.INDEX_BITS)
+    'index_sectors'        # NSE symbol -> industry from the index lists
+])
+
+EMPTY_TABLES = ReferenceTables(None, frozenset(), frozenset(), {}, {}, {}, {}, {}, {}, {})
+
+_tables = EMPTY_TABLES
+_swap_lock = threading.Lock()  # Serialises writers only
+_source_stamps = {}  # 'fo' / 'indices' -> stamps of the files the current tables were built from
+_last_index_attempt = 0.0
+_watcher = None
+_fetch_indices = False  # Only the worker downloads index lists; web processes reload the cache files it writes
+
+def current():
+    """Current lookup tables (a consistent snapshot - hold on to it for multi-table reads)"""
+    return _tables
+
+def _swap(**changes):
+    """Atomically publish new tables, replacing only the given fields"""
+    global _tables
+    with _swap_lock:
+        _tables = _tables._replace(**changes)
+
+def _stamp(paths):
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+def _record_load(table, started, count=0, error=None):
+    """Record the outcome of loading a lookup table"""
+    with _status_lock:
+        _load_status[table] = {
+            'state': 'failed' if error else 'loaded',
+            'count': count,
+            'error': error,
+            'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'seconds': round(time.monotonic() - started, 3)
+        }
+
+def get_load_status():
+    """Load state of every lookup table ('pending' until its first load attempt finishes)"""
+    with _status_lock:
+        return {table: dict(_load_status.get(table, {'state': 'pending'})) for table in TABLES}
+
+def is_loaded(table):
+    with _status_lock:
+        return _load_status.get(table, {}).get('state') == 'loaded'
+
+def load_fo_stocks():
+    """Load F&O eligible stocks from JSON file (NSE-based), replacing the current F&O tables"""
+    started = time.monotonic()
+    stamps = _stamp((FO_STOCKS_FILE, FO_INSTRUMENT_KEYS_FILE))
+    try:
+        with open(FO_STOCKS_FILE, 'r') as f:
+            fo_stocks_data = json.load(f)
+
+        fo_bse_codes = set()
+        fo_nse_symbols = set()
+        bse_to_nse_mapping = {}
+        fo_sectors = {}
+        instrument_keys = {}
+
+        # Create sets for fast lookup and BSE to NSE mapping
+        for stock in fo_stocks_data['stocks']:
+            nse_symbol = stock.get('nse_symbol', '')
+            bse_code = stock.get('bse_code', '')
+
+            # Add NSE symbol (always present in new format)
+            if nse_symbol:
+                fo_nse_symbols.add(nse_symbol)
+                if stock.get('sector'):
+                    fo_sectors[nse_symbol] = stock['sector']
+
+            # Add BSE code only if present
+            if bse_code:
+                fo_bse_codes.add(bse_code)
+                bse_to_nse_mapping[bse_code] = nse_symbol
+
+            if nse_symbol and stock.get('isin'):
+                instrument_keys[nse_symbol] = f"NSE_EQ|{stock['isin']}"
+
+        # Keys fetched from Upstox take precedence over ones derived from the ISIN
+        try:
+            with open(FO_INSTRUMENT_KEYS_FILE, 'r') as f:
+                instrument_keys.update(json.load(f).get('instrument_keys', {}))
+        except FileNotFoundError:
+            pass
+
+        _swap(
+            fo_stocks_data=fo_stocks_data,
+            fo_bse_codes=frozenset(fo_bse_codes),
+            fo_nse_symbols=frozenset(fo_nse_symbols),
+            bse_to_nse_mapping=bse_to_nse_mapping,
+            fo_sectors=fo_sectors,
+            instrument_keys=instrument_keys
+        )
+        _source_stamps['fo'] = stamps
+
+        print(f"✅ Loaded {len(fo_nse_symbols)} F&O eligible stocks (NSE symbols)")
+        if fo_bse_codes:
+            print(f"   📄 {len(fo_bse_codes)} stocks have BSE codes mapped")
+        _record_load('fo_stocks', started, count=len(fo_nse_symbols))
+        return True
+    except Exception as e:
+        print(f"❌ Error loading F&O stocks: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        _source_stamps['fo'] = stamps  # Don't retry until the file changes again
+        _record_load('fo_stocks', started, error=str(e))
+        return False
+
+def is_fo_eligible(bse_code):
+    """Check if a stock is F&O eligible (by BSE code, or by its NSE symbol via the security master)"""
+    tables = _tables
+    bse_code = str(bse_code)
+    return bse_code in tables.fo_bse_codes or get_nse_symbol_from_bse(bse_code) in tables.fo_nse_symbols
+
+def load_nse_indices():
+    """Load NSE indices (Nifty 50, Nifty Next 50, Nifty 500), replacing the current index tables"""
+    global _last_index_attempt
+
+    started = time.monotonic()
+    _last_index_attempt = started
+    try:
+        print("\n📊 Loading NSE Indices...")
+        fetched = nse_indices.get_all_indices(fetch=_fetch_indices)
+
+        # Keep the previous list for any index that couldn't be loaded this time
+        previous = _tables.nse_indices_data
+        nse_indices_data = {name: data or previous.get(name) for name, data in fetched.items()}
+
+        # Count stocks in each index
+        counts = {}
+        for index_name, data in nse_indices_data.items():
+            if data:
+                counts[index_name] = data['count']
+
+        if not counts:
+            # Nothing cached and NSE unreachable (or not fetched yet by the worker)
+            error = 'No index data (NSE unreachable and no cache)' if _fetch_indices else 'No index data (waiting for the worker to download it)'
+            print(f"❌ {error}")
+            _record_load('nse_indices', started, error=error)
+            # Try again when the cache files change (or, when fetching, after INDEX_RETRY_SECONDS)
+            _source_stamps['indices'] = _stamp(nse_indices.CACHE_FILES.values())
+            return False
+
+        # Index files carry an industry for every constituent
+        index_sectors = {}
+        for data in nse_indices_data.values():
+            for stock in (data or {}).get('stocks', []):
+                if stock.get('industry'):
+                    index_sectors.setdefault(stock['nse_symbol'], stock['industry'])
+
+        nse_symbol_lookup = nse_indices.create_symbol_lookup(nse_indices_data)
+        _swap(
+            nse_indices_data=nse_indices_data,
+            nse_symbol_lookup=nse_symbol_lookup,
+            nse_symbol_masks=nse_indices.build_symbol_masks(nse_indices_data),
+            index_sectors=index_sectors
+        )
+        _source_stamps['indices'] = _stamp(nse_indices.CACHE_FILES.values())
+
+        print(f"✅ Loaded NSE Indices:")
+        print(f"   - Nifty 50: {counts.get('nifty50', 0)} stocks")
+        print(f"   - Nifty Next 50: {counts.get('niftynext50', 0)} stocks")
+        print(f"   - Nifty 500: {counts.get('nifty500', 0)} stocks")
+        print(f"   - Total unique symbols: {len(nse_symbol_lookup)}")
+
+        _record_load('nse_indices', started, count=len(nse_symbol_lookup))
+        return True
+    except Exception as e:
+        print(f"❌ Error loading NSE indices: {str(e)}")
+        _record_load('nse_indices', started, error=str(e))
+        return False
+
+def get_stock_indices(nse_symbol):
+    """Get list of indices a stock belongs to"""
+    if not nse_symbol:
+        return []
+    return _tables.nse_symbol_lookup.get(nse_symbol.upper(), [])
+
+def get_index_mask(nse_symbol):
+    """Get index membership bitmask of a stock (0 if in no tracked index)"""
+    if not nse_symbol:
+        return 0
+    return _tables.nse_symbol_masks.get(nse_symbol.upper(), 0)
+
+def index_names(mask):
+    """NSE index names set in a membership mask (F&O bit excluded)"""
+    return nse_indices.indices_from_mask(mask)
+
+def count_memberships(masks):
+    """Count of masks with each membership bit set, plus 'all'"""
+    masks = np.fromiter(masks, dtype=np.int64)
+    counts = {name: int(np.count_nonzero(masks & bit)) for name, bit in MEMBERSHIP_BITS.items()}
+    counts['all'] = len(masks)
+    return counts
+
+def get_stock_sector(nse_symbol):
+    """Get sector/industry of a stock (F&O list sectors take precedence over index industries)"""
+    if not nse_symbol:
+        return None
+    tables = _tables
+    nse_symbol = nse_symbol.upper()
+    return tables.fo_sectors.get(nse_symbol) or tables.index_sectors.get(nse_symbol)
+
+def load_security_master():
+    """Build the ISIN-keyed security master (BSE code <-> NSE symbol <-> instrument keys)"""
+    started = time.monotonic()
+    try:
+        master = security_master.load()
+        _record_load('security_master', started, count=len(master))
+        return True
+    except Exception as e:
+        print(f"❌ Error building security master: {str(e)}")
+        _record_load('security_master', started, error=str(e))
+        return False
+
+def _master_lookup(index, key):
+    """Security master lookup that never builds the master on a hot path"""
+    master = security_master._master
+    return getattr(master, index).get(key) if master else None
+
+def get_nse_symbol_from_bse(bse_code):
+    """Get NSE symbol from BSE code"""
+    bse_code = str(bse_code)
+    nse_symbol = _tables.bse_to_nse_mapping.get(bse_code)
+    if nse_symbol:
+        return nse_symbol
+    security = _master_lookup('by_bse_code', bse_code)
+    return security.nse_symbol if security else None
+
+def get_instrument_key(nse_symbol):
+    """Get Upstox instrument key for an NSE symbol"""
+    if not nse_symbol:
+        return None
+    key = _tables.instrument_keys.get(nse_symbol.upper())
+    if key:
+        return key
+    security = _master_lookup('by_nse_symbol', nse_symbol.upper())
+    return security.nse_key if security else None
+
+def _save_snapshot():
+    if is_loaded('fo_stocks') and is_loaded('nse_indices'):
+        reference_snapshot.save_snapshot(_tables._asdict())
+
+def load_all(fetch_indices=False):
+    """
+    Load every lookup table from the startup snapshot, or from the source files (then rebuild the snapshot)
+
+    fetch_indices: download missing/expired NSE index lists (worker only); otherwise only the cache files are read
+    """
+    global _fetch_indices
+    _fetch_indices = _fetch_indices or fetch_indices
+    started = time.monotonic()
+    tables = reference_snapshot.load_snapshot()
+
+    # Index lists still expire daily so they get refreshed from NSE
+    if tables and all(nse_indices.is_data_fresh(data) for data in tables['nse_indices_data'].values()):
+        _swap(**tables)
+        _source_stamps['fo'] = _stamp((FO_STOCKS_FILE, FO_INSTRUMENT_KEYS_FILE))
+        _source_stamps['indices'] = _stamp(nse_indices.CACHE_FILES.values())
+        print(f"✅ {len(tables['fo_nse_symbols'])} F&O stocks, {len(tables['nse_symbol_lookup'])} index symbols, {len(tables['instrument_keys'])} instrument keys")
+        _record_load('fo_stocks', started, count=len(tables['fo_nse_symbols']))
+        _record_load('nse_indices', started, count=len(tables['nse_symbol_lookup']))
+        load_security_master()
+        return
+
+    load_fo_stocks()
+    load_nse_indices()
+    load_security_master()
+    _save_snapshot()
+
+def check_for_changes():
+    """Reload any table whose source files changed (or whose index lists are missing/expired); returns True if anything reloaded"""
+    reloaded = False
+
+    if _stamp((FO_STOCKS_FILE, FO_INSTRUMENT_KEYS_FILE)) != _source_stamps.get('fo'):
+        print("🔁 F&O stock list changed, reloading")
+        reloaded |= load_fo_stocks()
+
+    index_files_changed = _stamp(nse_indices.CACHE_FILES.values()) != _source_stamps.get('indices')
+    # Only a fetching process retries downloads; others wait for the cache files to change
+    index_refresh_due = _fetch_indices and (not is_loaded('nse_indices') or not all(
+        nse_indices.is_data_fresh(data) for data in _tables.nse_indices_data.values()
+    ))
+    if index_files_changed or (index_refresh_due and time.monotonic() - _last_index_attempt >= INDEX_RETRY_SECONDS):
+        reloaded |= load_nse_indices()
+
+    if security_master.is_stale():
+        print("🔁 Security master sources changed, rebuilding")
+        reloaded |= load_security_master()
+
+    if reloaded:
+        _save_snapshot()
+    return reloaded
+
+def watch():
+    """Check for source changes every RELOAD_CHECK_SECONDS, forever"""
+    while True:
+        time.sleep(RELOAD_CHECK_SECONDS)
+        try:
+            check_for_changes()
+        except Exception as e:
+            print(f"❌ Error reloading reference data: {str(e)}")
+
+def start_watcher(fetch_indices=False):
+    """Start the background reload thread (once per process); fetch_indices as for load_all()"""
+    global _watcher, _fetch_indices
+    _fetch_indices = _fetch_indices or fetch_indices
+    with _swap_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=watch, name='reference-data-watcher', daemon=True)
+            _watcher.start()
+    return _watcher
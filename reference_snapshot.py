@@ -0,0 +1,110 @@
+"""
+Reference Data Snapshot
+Compiles the lookup tables built from resources/ and nse_cache/ into one versioned pickle file
+
+Startup reads the snapshot (one file, no JSON parsing) instead of every
+source file. The snapshot records each source's mtime, size and SHA-1;
+it is used only while those still match, so editing or replacing any
+source triggers a rebuild on the next load.
+"""
+
+import hashlib
+import os
+import pickle
+import time
+
+# Bump when the layout of the compiled tables changes
+SNAPSHOT_VERSION = 3
+
+SNAPSHOT_FILE = os.path.join(os.environ.get('STATE_DIR', 'state'), 'reference_snapshot.pickle')
+
+# Every file the compiled tables are built from
+SOURCE_FILES = (
+    os.path.join('resources', 'fo_stocks.json'),
+    os.path.join('resources', 'fo_instrument_keys.json'),
+    os.path.join('nse_cache', 'nifty50.json'),
+    os.path.join('nse_cache', 'niftynext50.json'),
+    os.path.join('nse_cache', 'nifty500.json'),
+)
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(paths=SOURCE_FILES):
+    """Current {path: {'mtime_ns', 'size', 'sha1'}} of the source files (missing files map to None)"""
+    sources = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            sources[path] = None
+            continue
+        sources[path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': _file_hash(path)}
+    return sources
+
+
+def _source_unchanged(path, recorded):
+    """Cheap stat check first; a changed mtime with identical content still counts as unchanged"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return recorded is None
+    if recorded is None:
+        return False
+    if stat.st_mtime_ns == recorded['mtime_ns'] and stat.st_size == recorded['size']:
+        return True
+    return stat.st_size == recorded['size'] and _file_hash(path) == recorded['sha1']
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """Compiled tables from the snapshot, or None if it is missing, from another version or out of date"""
+    started = time.monotonic()
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable reference snapshot {path}: {str(e)}")
+        return None
+
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        print(f"🔁 Reference snapshot is version {snapshot.get('version')}, expected {SNAPSHOT_VERSION} - rebuilding")
+        return None
+
+    sources = snapshot.get('sources', {})
+    if set(sources) != set(SOURCE_FILES):
+        return None
+    for source, recorded in sources.items():
+        if not _source_unchanged(source, recorded):
+            print(f"🔁 {source} changed since the reference snapshot was built - rebuilding")
+            return None
+
+    print(f"⚡ Loaded reference snapshot in {(time.monotonic() - started) * 1000:.1f} ms (built {snapshot['built_at']})")
+    return snapshot['tables']
+
+
+def save_snapshot(tables, path=SNAPSHOT_FILE):
+    """Write compiled tables with the current source fingerprints (atomic replace)"""
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({
+                'version': SNAPSHOT_VERSION,
+                'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'sources': fingerprint(),
+                'tables': tables
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        print(f"💾 Saved reference snapshot: {path}")
+        return True
+    except Exception as e:
+        print(f"❌ Error saving reference snapshot: {str(e)}")
+        return False
@@ -1,111 +1,261 @@
 #!/usr/bin/env python3
 """
 Update F&O stocks list from NSE India official API
+
+Diffs the NSE list against the current file, carries over known BSE codes
+and resolves missing ones by ISIN: first from the local security master
+(Upstox BSE_EQ instruments), then from BSE's quote search. Resolutions are
+kept in bse_code_cache.json, so re-running after a small list change only
+looks up the symbols that changed.
+
+Usage:
+    python resources/update_fo_stocks_from_nse.py                 # update fo_stocks_nse.json
+    python resources/update_fo_stocks_from_nse.py --diff          # only report additions/removals
+    python resources/update_fo_stocks_from_nse.py --output fo_stocks.json   # update the live list (hot reloaded)
 """
 
-import requests
+import argparse
 import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import requests
+
+RESOURCES_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(RESOURCES_DIR)
+RESOLUTION_CACHE_FILE = os.path.join(RESOURCES_DIR, 'bse_code_cache.json')
+
+BSE_QUOTE_SEARCH_URL = 'https://api.bseindia.com/Msource/1D/getQouteSearch.aspx'
+BSE_RESOLVE_WORKERS = 8
+
 def fetch_nse_fo_stocks():
     """Fetch F&O stocks from NSE India API"""
     url = "https://www.nseindia.com/api/equity-stockIndices?index=SECURITIES%20IN%20F%26O"
-    
+
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         'Accept': 'application/json',
         'Accept-Language': 'en-US,en;q=0.9',
     }
-    
+
     try:
         print("📥 Fetching F&O stocks from NSE India...")
         response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
-        
+
         data = response.json()
         stocks_data = data.get('data', [])
-        
+
         print(f"✅ Found {len(stocks_data)} F&O stocks from NSE")
-        
+
         return stocks_data
     except Exception as e:
         print(f"❌ Error fetching NSE data: {str(e)}")
         return []
 
-def update_fo_stocks_json(nse_stocks):
-    """Update fo_stocks.json with NSE data"""
-    
-    # Transform NSE data to our format
+def transform_nse_stocks(nse_stocks):
+    """Transform NSE data to our format (BSE codes filled in later)"""
     fo_stocks = []
-    
+
     for stock in nse_stocks:
         symbol = stock.get('symbol', '')
         company_name = stock.get('meta', {}).get('companyName', '')
         isin = stock.get('meta', {}).get('isin', '')
-        
-        # Skip if no symbol
-        if not symbol:
+
+        # Skip if no symbol (the index row itself has no meta)
+        if not symbol or not stock.get('meta'):
             continue
-        
+
         fo_stocks.append({
             'nse_symbol': symbol,
             'company_name': company_name,
             'isin': isin,
-            'bse_code': '',  # Will be populated later if available
+            'bse_code': '',
             'sector': stock.get('meta', {}).get('industry', 'Unknown')
         })
-    
+
     # Sort by NSE symbol
     fo_stocks.sort(key=lambda x: x['nse_symbol'])
-    
+    return fo_stocks
+
+def load_stocks(path):
+    """Stocks from an existing list file, keyed by NSE symbol"""
+    try:
+        with open(path, 'r') as f:
+            return {stock['nse_symbol']: stock for stock in json.load(f).get('stocks', [])}
+    except FileNotFoundError:
+        return {}
+
+def diff_stocks(current, new_stocks):
+    """Additions, removals and changed ISINs between the current list and the new one"""
+    new = {stock['nse_symbol']: stock for stock in new_stocks}
+    return {
+        'added': sorted(set(new) - set(current)),
+        'removed': sorted(set(current) - set(new)),
+        'isin_changed': sorted(s for s in set(new) & set(current) if new[s]['isin'] != current[s].get('isin'))
+    }
+
+def print_diff(diff):
+    print(f"\n📊 Changes:")
+    print(f"   ➕ Added ({len(diff['added'])}): {', '.join(diff['added']) or '-'}")
+    print(f"   ➖ Removed ({len(diff['removed'])}): {', '.join(diff['removed']) or '-'}")
+    print(f"   🔀 ISIN changed ({len(diff['isin_changed'])}): {', '.join(diff['isin_changed']) or '-'}")
+
+def write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_resolution_cache():
+    try:
+        with open(RESOLUTION_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def resolve_from_security_master(isin):
+    """BSE code from the local security master (Upstox BSE_EQ instruments), or None"""
+    try:
+        if ROOT_DIR not in sys.path:
+            sys.path.insert(0, ROOT_DIR)
+        import security_master
+        security = security_master.get_by_isin(isin)
+        return security.bse_code if security else None
+    except Exception as e:
+        print(f"⚠️ Security master unavailable: {str(e)}")
+        return None
+
+def _bse_codes_for_isin(html, isin):
+    """Scrip codes of the search result entries that name this ISIN (each <li>/<tr> is one entry)"""
+    codes = set()
+    for entry in re.split(r'<(?:li|tr)\b', html, flags=re.IGNORECASE):
+        if isin.upper() in entry.upper():
+            codes.update(re.findall(r'/(\d{6})/', entry))
+    return codes
+
+def resolve_from_bse(isin):
+    """BSE code from BSE's quote search, or None unless exactly one result entry carries the ISIN"""
+    try:
+        response = requests.get(
+            BSE_QUOTE_SEARCH_URL,
+            params={'Type': 'EQ', 'text': isin, 'flag': 'site'},
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                'Referer': 'https://www.bseindia.com/'
+            },
+            timeout=10
+        )
+        response.raise_for_status()
+        codes = _bse_codes_for_isin(response.text, isin)
+        if len(codes) > 1:
+            print(f"⚠️ BSE search returned several codes for {isin} ({', '.join(sorted(codes))}), skipping")
+        return codes.pop() if len(codes) == 1 else None
+    except Exception as e:
+        print(f"⚠️ BSE lookup failed for {isin}: {str(e)}")
+        return None
+
+def resolve_bse_codes(isins, cache, workers=BSE_RESOLVE_WORKERS):
+    """Resolve BSE codes for ISINs not already in the cache (updates the cache in place); returns the number looked up"""
+    todo = [
+        isin for isin in sorted(set(isins))
+        if isin and not (cache.get(isin) or {}).get('bse_code')
+    ]
+    if not todo:
+        return 0
+
+    print(f"\n🔎 Resolving BSE codes for {len(todo)} ISIN(s)...")
+
+    remote = []
+    for isin in todo:
+        bse_code = resolve_from_security_master(isin)
+        if bse_code:
+            cache[isin] = {'bse_code': bse_code, 'source': 'security_master', 'resolved_at': datetime.now().isoformat()}
+        else:
+            remote.append(isin)
+
+    if remote:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for isin, bse_code in zip(remote, pool.map(resolve_from_bse, remote)):
+                # Only verified codes are cached; misses are looked up again on the next run
+                if bse_code:
+                    cache[isin] = {'bse_code': bse_code, 'source': 'bse', 'resolved_at': datetime.now().isoformat()}
+
+    resolved = sum(1 for isin in todo if (cache.get(isin) or {}).get('bse_code'))
+    print(f"✅ Resolved {resolved}/{len(todo)} ({len(todo) - len(remote)} locally, {len(remote)} via BSE)")
+    return len(todo)
+
+def update_fo_stocks_json(nse_stocks, output_file='fo_stocks_nse.json', diff_only=False, workers=BSE_RESOLVE_WORKERS):
+    """Update the F&O list file with NSE data, keeping and resolving BSE codes"""
+    output_path = os.path.join(RESOURCES_DIR, output_file)
+    fo_stocks = transform_nse_stocks(nse_stocks)
+
+    # Compare against the file being updated (or the live list on first run)
+    current = load_stocks(output_path) or load_stocks(os.path.join(RESOURCES_DIR, 'fo_stocks.json'))
+    diff = diff_stocks(current, fo_stocks)
+    print_diff(diff)
+
+    if diff_only:
+        return diff
+
+    # Unchanged stocks keep their BSE code; the rest come from the resolution cache
+    cache = load_resolution_cache()
+    for stock in fo_stocks:
+        previous = current.get(stock['nse_symbol'])
+        if previous and previous.get('bse_code') and previous.get('isin') == stock['isin'] and stock['isin'] not in cache:
+            cache[stock['isin']] = {'bse_code': previous['bse_code'], 'source': 'previous_list', 'resolved_at': datetime.now().isoformat()}
+
+    if resolve_bse_codes([s['isin'] for s in fo_stocks], cache, workers):
+        write_json_atomic(RESOLUTION_CACHE_FILE, cache)
+
+    for stock in fo_stocks:
+        stock['bse_code'] = (cache.get(stock['isin']) or {}).get('bse_code') or ''
+
     # Create output structure
     output = {
         'metadata': {
             'source': 'NSE India Official API',
             'url': 'https://www.nseindia.com/api/equity-stockIndices?index=SECURITIES%20IN%20F%26O',
             'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'total_stocks': len(fo_stocks)
+            'total_stocks': len(fo_stocks),
+            'bse_codes_mapped': sum(1 for s in fo_stocks if s['bse_code'])
         },
         'stocks': fo_stocks
     }
-    
-    # Write to file
-    output_file = 'fo_stocks_nse.json'
-    with open(output_file, 'w') as f:
-        json.dump(output, f, indent=2)
-    
-    print(f"\n✅ Saved {len(fo_stocks)} stocks to {output_file}")
-    
-    # Print comparison
-    print(f"\n📊 Comparison:")
-    try:
-        with open('fo_stocks.json', 'r') as f:
-            old_data = json.load(f)
-            old_count = len(old_data.get('stocks', []))
-            print(f"   Old list: {old_count} stocks")
-            print(f"   New list: {len(fo_stocks)} stocks")
-            print(f"   Difference: +{len(fo_stocks) - old_count} stocks")
-    except FileNotFoundError:
-        print(f"   Old fo_stocks.json not found")
-    
-    # Show new stocks
-    print(f"\n📝 First 20 stocks:")
-    for i, stock in enumerate(fo_stocks[:20], 1):
-        print(f"   {i}. {stock['nse_symbol']} - {stock['company_name']}")
-    
+
+    write_json_atomic(output_path, output)
+
+    print(f"\n✅ Saved {len(fo_stocks)} stocks to {output_path} ({output['metadata']['bse_codes_mapped']} with BSE codes)")
+    unresolved = [s['nse_symbol'] for s in fo_stocks if not s['bse_code']]
+    if unresolved:
+        more = f" and {len(unresolved) - 20} more" if len(unresolved) > 20 else ''
+        print(f"⚠️ No BSE code for {len(unresolved)} stock(s): {', '.join(unresolved[:20])}{more} (looked up again on the next run)")
+
     return output
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Update the F&O stock list from NSE')
+    parser.add_argument('--diff', action='store_true', help='only report additions/removals, write nothing')
+    parser.add_argument('--output', default='fo_stocks_nse.json', help='file in resources/ to update (default: fo_stocks_nse.json)')
+    parser.add_argument('--workers', type=int, default=BSE_RESOLVE_WORKERS, help='concurrent BSE lookups')
+    args = parser.parse_args()
+
+    # Security master paths are relative to the project root
+    os.chdir(ROOT_DIR)
+
     print("=" * 80)
     print("NSE F&O Stocks Updater")
     print("=" * 80)
-    
+
     # Fetch from NSE
     nse_stocks = fetch_nse_fo_stocks()
-    
+
     if nse_stocks:
         # Update JSON file
-        result = update_fo_stocks_json(nse_stocks)
+        result = update_fo_stocks_json(nse_stocks, args.output, args.diff, args.workers)
         print("\n" + "=" * 80)
         print("✅ Update complete!")
         print("=" * 80)
@@ -0,0 +1,258 @@
+"""
+Security Master
+One table of listed securities keyed on ISIN, joining BSE code, NSE symbol and Upstox instrument keys
+
+Sources (filled in this order - the first source that knows a field wins):
+    fo_stocks           resources/fo_stocks.json (NSE symbol, name, sector, ISIN)
+    fo_instrument_keys  resources/fo_instrument_keys.json (NSE_EQ|<ISIN> keys)
+    upstox_keys         STOCK_INSTRUMENT_KEYS in integrations/upstox_integration.py
+    upstox_instruments  Upstox complete.json.gz dump, if present on disk, read through its column store
+                        (NSE_EQ rows give symbols, BSE_EQ rows give BSE codes)
+
+Each source's contribution is cached in state/security_master.pickle with
+the source's mtime and size, so a rebuild only re-parses sources that changed.
+"""
+
+import json
+import os
+import pickle
+import time
+from collections import namedtuple
+
+STATE_DIR = os.environ.get('STATE_DIR', 'state')
+MASTER_FILE = os.path.join(STATE_DIR, 'security_master.pickle')
+UPSTOX_INSTRUMENTS_FILE = os.environ.get('UPSTOX_INSTRUMENTS_FILE', os.path.join(STATE_DIR, 'upstox_instruments.json.gz'))
+UPSTOX_INSTRUMENTS_STORE_DIR = os.environ.get('INSTRUMENTS_STORE_DIR', os.path.join(STATE_DIR, 'instruments_store'))
+
+# Bump when the contribution format changes
+MASTER_VERSION = 1
+
+Security = namedtuple('Security', ['isin', 'nse_symbol', 'bse_code', 'company_name', 'sector', 'nse_key', 'bse_key'])
+FIELDS = Security._fields[1:]
+
+# Current joined table, replaced as a whole on rebuild (readers never see a partial table)
+_master = None
+
+
+def _isin_from_key(instrument_key):
+    """'NSE_EQ|INE002A01018' -> 'INE002A01018'"""
+    _, _, isin = (instrument_key or '').partition('|')
+    return isin if isin.startswith('IN') else None
+
+
+def _from_fo_stocks(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    rows = {}
+    for stock in data.get('stocks', []):
+        if stock.get('isin'):
+            rows[stock['isin']] = {
+                'nse_symbol': stock.get('nse_symbol'),
+                'bse_code': stock.get('bse_code') or None,
+                'company_name': stock.get('company_name'),
+                'sector': stock.get('sector')
+            }
+    return rows
+
+
+def _from_key_map(keys):
+    rows = {}
+    for symbol, key in keys.items():
+        isin = _isin_from_key(key)
+        if isin:
+            rows[isin] = {'nse_symbol': symbol, 'nse_key': key}
+    return rows
+
+
+def _from_fo_instrument_keys(path):
+    with open(path, 'r') as f:
+        return _from_key_map(json.load(f).get('instrument_keys', {}))
+
+
+def _from_upstox_keys(path):
+    from integrations.upstox_integration import STOCK_INSTRUMENT_KEYS
+    return _from_key_map(STOCK_INSTRUMENT_KEYS)
+
+
+def _from_upstox_instruments(path):
+    import instruments_store
+    # Built by the worker's instruments refresh; until then keep the previous rows and retry
+    store = instruments_store.open_existing(path, UPSTOX_INSTRUMENTS_STORE_DIR)
+    if store is None:
+        raise FileNotFoundError(f"no instruments store for {path} yet")
+    instruments = store.rows(store.mask(segment=('NSE_EQ', 'BSE_EQ')))
+    rows = {}
+    for item in instruments:
+        segment = item.get('segment')
+        isin = item.get('isin')
+        if not isin or segment not in ('NSE_EQ', 'BSE_EQ'):
+            continue
+        row = rows.setdefault(isin, {})
+        if segment == 'NSE_EQ':
+            row['nse_symbol'] = item.get('trading_symbol')
+            row['nse_key'] = item.get('instrument_key')
+            row['company_name'] = row.get('company_name') or item.get('name')
+        else:
+            row['bse_code'] = str(item.get('exchange_token') or '') or None
+            row['bse_key'] = item.get('instrument_key')
+            row['company_name'] = row.get('company_name') or item.get('name')
+    return rows
+
+
+SOURCES = (
+    ('fo_stocks', os.path.join('resources', 'fo_stocks.json'), _from_fo_stocks),
+    ('fo_instrument_keys', os.path.join('resources', 'fo_instrument_keys.json'), _from_fo_instrument_keys),
+    ('upstox_keys', os.path.join('integrations', 'upstox_integration.py'), _from_upstox_keys),
+    ('upstox_instruments', UPSTOX_INSTRUMENTS_FILE, _from_upstox_instruments),
+)
+
+
+class SecurityMaster:
+    """Joined, read-only security table with O(1) lookups by ISIN, NSE symbol, BSE code and instrument key"""
+
+    def __init__(self, contributions, stamps=None):
+        self.stamps = stamps or {}  # Source name -> (mtime_ns, size) this table was built from
+        merged = {}
+        for name, _, _ in SOURCES:
+            for isin, row in contributions.get(name, {}).items():
+                fields = merged.setdefault(isin, {})
+                for field, value in row.items():
+                    if value and not fields.get(field):
+                        fields[field] = value
+
+        self.by_isin = {isin: Security(isin, *(fields.get(f) for f in FIELDS)) for isin, fields in merged.items()}
+        self.by_nse_symbol = {}
+        self.by_bse_code = {}
+        self.by_instrument_key = {}
+        for security in self.by_isin.values():
+            if security.nse_symbol:
+                self.by_nse_symbol.setdefault(security.nse_symbol.upper(), security)
+            if security.bse_code:
+                self.by_bse_code.setdefault(security.bse_code, security)
+            for key in (security.nse_key, security.bse_key):
+                if key:
+                    self.by_instrument_key[key] = security
+
+    def __len__(self):
+        return len(self.by_isin)
+
+    def get_stats(self):
+        return {
+            'securities': len(self.by_isin),
+            'with_nse_symbol': len(self.by_nse_symbol),
+            'with_bse_code': len(self.by_bse_code),
+            'with_both': sum(1 for s in self.by_isin.values() if s.nse_symbol and s.bse_code)
+        }
+
+
+def _source_stamp(path):
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+def _read_cached_contributions(path=MASTER_FILE):
+    try:
+        with open(path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('version') == MASTER_VERSION:
+            return cached['sources']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable security master cache: {str(e)}")
+    return {}
+
+
+def _write_cached_contributions(sources, path=MASTER_FILE):
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': MASTER_VERSION, 'sources': sources}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"❌ Error saving security master cache: {str(e)}")
+
+
+def build():
+    """Build the security master, re-parsing only sources whose mtime/size changed since the last build"""
+    started = time.monotonic()
+    cached = _read_cached_contributions()
+    sources = {}
+    rebuilt = []
+
+    for name, path, parse in SOURCES:
+        stamp = _source_stamp(path)
+        previous = cached.get(name)
+        if previous and previous['stamp'] == stamp:
+            sources[name] = previous
+            continue
+
+        rows = {}
+        if stamp is not None:
+            try:
+                rows = parse(path)
+            except Exception as e:
+                # Keep what the source gave last time, and retry on the next build
+                print(f"❌ Error reading {name} from {path}: {str(e)}")
+                rows = previous['rows'] if previous else {}
+                stamp = None
+        sources[name] = {'stamp': stamp, 'rows': rows}
+        rebuilt.append(name)
+
+    if rebuilt:
+        _write_cached_contributions(sources)
+
+    master = SecurityMaster(
+        {name: source['rows'] for name, source in sources.items()},
+        {name: source['stamp'] for name, source in sources.items()}
+    )
+    stats = master.get_stats()
+    print(f"✅ Security master: {stats['securities']} securities, {stats['with_both']} with both NSE symbol and BSE code "
+          f"({time.monotonic() - started:.2f}s, re-read: {', '.join(rebuilt) or 'none'})")
+    return master
+
+
+def load():
+    """Build and install the security master; returns it"""
+    global _master
+    _master = build()
+    return _master
+
+
+def is_stale():
+    """Check if any source changed since the current master was built"""
+    if _master is None:
+        return True
+    return any(_source_stamp(path) != _master.stamps.get(name) for name, path, _ in SOURCES)
+
+
+def get_master():
+    """Current security master (built on first use)"""
+    return _master or load()
+
+
+def get_by_isin(isin):
+    return get_master().by_isin.get(isin)
+
+
+def get_by_nse_symbol(nse_symbol):
+    return get_master().by_nse_symbol.get((nse_symbol or '').upper())
+
+
+def get_by_bse_code(bse_code):
+    return get_master().by_bse_code.get(str(bse_code))
+
+
+def get_by_instrument_key(instrument_key):
+    return get_master().by_instrument_key.get(instrument_key)
+
+
+if __name__ == '__main__':
+    master = load()
+    print(json.dumps(master.get_stats(), indent=2))
+    for symbol in ['RELIANCE', 'TCS', 'M&M']:
+        print(get_by_nse_symbol(symbol))
@@ -0,0 +1,67 @@
+"""
+Shared State Module
+JSON snapshots written by the ingestion worker and read by any number of web processes
+"""
+
+import json
+import os
+import threading
+import time
+
+STATE_DIR = os.environ.get('STATE_DIR', 'state')
+ANNOUNCEMENTS_FILE = 'announcements.json'
+WORKER_STATUS_FILE = 'worker_status.json'
+
+# Parsed snapshots keyed by file name -> (mtime_ns, size, data), so readers only re-parse after a write
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def state_path(name):
+    return os.path.join(STATE_DIR, name)
+
+
+def write_state(name, data):
+    """Atomically replace a state file (write to a temp file, then os.replace)"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = state_path(name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, 'w') as f:
+        json.dump({**data, 'written_at': time.time()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_state(name):
+    """Latest snapshot of a state file, or None if the worker hasn't written it yet"""
+    path = state_path(name)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _cache.get(name)
+        if cached and cached[0] == key:
+            return cached[1]
+
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read {path}: {str(e)}")
+        return None
+
+    with _cache_lock:
+        _cache[name] = (key, data)
+    return data
+
+
+def state_age_seconds(data):
+    """Seconds since a snapshot was written"""
+    if not data or 'written_at' not in data:
+        return None
+    return round(time.time() - data['written_at'], 1)
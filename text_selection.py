@@ -0,0 +1,279 @@
+"""
+LLM Input Selection Module
+Cleans extracted announcement text and packs the most relevant sections into a token budget
+"""
+
+import os
+import re
+
+# Token budget for the announcement content sent to the LLM
+DEFAULT_TOKEN_BUDGET = int(os.environ.get('LLM_TOKEN_BUDGET', '1500'))
+
+# Rough chars-per-token ratio for English filings (avoids a tokenizer dependency)
+CHARS_PER_TOKEN = 4
+
+# Segments longer than this are split on line boundaries
+MAX_SEGMENT_CHARS = 600
+
+# Pages are separated by form feeds (see pdf_extraction.PAGE_SEPARATOR)
+PAGE_SEPARATOR = '\f'
+
+# Financially relevant terms and their weights
+FINANCIAL_TERMS = {
+    'revenue': 3, 'total income': 3, 'net profit': 4, 'profit': 3, 'loss': 3,
+    'ebitda': 4, 'pat': 2, 'pbt': 2, 'eps': 3, 'earnings per share': 3,
+    'margin': 2, 'dividend': 4, 'buyback': 4, 'bonus': 3, 'split': 2,
+    'crore': 2, 'lakh': 2, 'million': 1, 'quarter': 2, 'half year': 2,
+    'year ended': 2, 'yoy': 2, 'qoq': 2, 'growth': 2, 'order': 2,
+    'contract': 2, 'acquisition': 4, 'merger': 4, 'amalgamation': 3,
+    'stake': 2, 'capex': 3, 'guidance': 3, 'rating': 2, 'downgrade': 3,
+    'upgrade': 3, 'default': 3, 'penalty': 3, 'allotment': 2,
+    'resignation': 3, 'appointment': 1, 'fund raising': 3, 'qip': 3,
+    'preferential issue': 3, 'record date': 2, 'financial results': 4
+}
+
+# Cover-letter phrases that carry no information for sentiment
+BOILERPLATE_TERMS = (
+    'pursuant to regulation', 'listing obligations and disclosure',
+    'kindly take the same on record', 'take the above on record',
+    'yours faithfully', 'yours truly', 'thanking you', 'dear sir',
+    'dear madam', 'company secretary', 'compliance officer',
+    'this is for your information', 'scrip code', 'symbol:',
+    'membership no', 'din:'
+)
+
+# Whole-word matchers ("pat" must not score on "patent", "order" on "ordinary"); financial terms also match plurals
+FINANCIAL_TERM_PATTERNS = [
+    (re.compile(r'(?<!\w)' + re.escape(term) + r'(?:s|es)?(?!\w)'), weight) for term, weight in FINANCIAL_TERMS.items()
+]
+BOILERPLATE_PATTERNS = [re.compile(r'(?<!\w)' + re.escape(term) + r'(?!\w)') for term in BOILERPLATE_TERMS]
+
+# Address / contact lines (exchange addresses, registered office, CIN, phone, email, web)
+ADDRESS_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'\b(regd\.?|registered|corporate)\s+office\b',
+    r'\bcin\s*[:\-]?\s*[lu]\d{5}',
+    r'\bcorporate identity number\b',
+    r'\b(tel|phone|fax|ph|mob|t)\s*(no\.?)?\s*[:.]\s*\+?\d',
+    r'[\w.+-]+@[\w-]+\.[\w.]+',
+    r'\bwww\.',
+    r'\+\s?91[\s\d-]{6,}',
+    r'\b(phiroze jeejeebhoy|p\.?\s?j\.? towers?|dalal street|exchange plaza|bandra\W*kurla)\b',
+    r'^\s*(bse limited|national stock exchange of india limited)\s*,?\s*$'
+)]
+
+# Street-level address words; "Mumbai, India" alone is a press-release dateline, not an address
+STREET_CONTEXT = re.compile(
+    r'\b(pin(\s*code)?|road|rd\.|marg|street|lane|nagar|floor|building|bldg|tower|estate|sector|plot)\b',
+    re.IGNORECASE
+)
+
+# Cities and states that commonly precede a PIN code
+CITY_CONTEXT = re.compile(
+    r'\b(mumbai|delhi|bengaluru|bangalore|chennai|kolkata|hyderabad|pune|ahmedabad|gurugram|gurgaon|noida|'
+    r'thane|navi mumbai|jaipur|lucknow|chandigarh|kochi|coimbatore|vadodara|indore|nagpur|'
+    r'maharashtra|gujarat|karnataka|tamil nadu|telangana|west bengal|haryana|uttar pradesh|rajasthan|kerala)\b',
+    re.IGNORECASE
+)
+
+PIN_PATTERN = re.compile(r'[a-z]\s*[-–,]\s*\d{3}\s?\d{3}\b', re.IGNORECASE)  # "Mumbai - 400 001" / "Hyderabad, 500034"
+COUNTRY_PATTERN = re.compile(r',\s*india\b', re.IGNORECASE)
+
+# Lines within this many lines of the top or bottom of a page can be running headers/footers
+EDGE_LINES = 2
+
+SUBJECT_PATTERN = re.compile(r'^\s*(sub|subject|re)\s*[:.\-]', re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r'\d[\d,]*\.?\d*')
+
+# "Page 3", "Page 3 of 12", "3 of 12", "3/12", "- 3 -": dropped as footers even though they are mostly digits
+PAGE_NUMBER_PATTERN = re.compile(
+    r'^\s*(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+|[-–—]\s*\d+\s*[-–—])\s*$',
+    re.IGNORECASE
+)
+
+# A bare "3" is only a page number as the first or last line of a page (elsewhere it is a table cell)
+BARE_PAGE_NUMBER_PATTERN = re.compile(r'^\s*\d{1,3}\s*$')
+
+
+def estimate_tokens(text):
+    """Rough token estimate for a piece of text"""
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def _exact_line(line):
+    """A line compared word for word (only spacing and case ignored)"""
+    return re.sub(r'\s+', ' ', line).strip().lower()
+
+
+def _normalize_line(line):
+    """Normalize a line for header/footer detection (page numbers, dates and spacing vary)"""
+    return re.sub(r'\s+', ' ', re.sub(r'\d+', '#', line)).strip().lower()
+
+
+def _is_mostly_numbers(line):
+    """Results rows ("Revenue from operations 1,234 1,100 ...") are largely figures"""
+    words = line.split()
+    return bool(words) and len(NUMBER_PATTERN.findall(line)) / len(words) >= 1 / 3
+
+
+def _page_lines(page):
+    return [line.strip() for line in page.splitlines() if line.strip()]
+
+
+def _is_edge(position, count):
+    return position < EDGE_LINES or position >= count - EDGE_LINES
+
+
+def find_repeated_lines(pages):
+    """
+    Return (exact, edge) sets of lines repeated across pages
+
+    exact: lines that appear word for word on more than one page
+    edge:  digit-normalized lines repeated in the first/last EDGE_LINES of pages
+           (running headers/footers with page numbers or dates)
+    """
+    if len(pages) < 2:
+        return set(), set()
+
+    exact_counts = {}
+    edge_counts = {}
+    for page in pages:
+        lines = _page_lines(page)
+        for line in {_exact_line(l) for l in lines}:
+            exact_counts[line] = exact_counts.get(line, 0) + 1
+        for line in {_normalize_line(l) for i, l in enumerate(lines) if _is_edge(i, len(lines))}:
+            edge_counts[line] = edge_counts.get(line, 0) + 1
+
+    return (
+        {line for line, count in exact_counts.items() if count > 1},
+        {line for line, count in edge_counts.items() if count > 1}
+    )
+
+
+def is_repeated_line(line, position, count, repeated):
+    """Check if a line is a repeated header/footer (never a row of figures)"""
+    if PAGE_NUMBER_PATTERN.match(line):
+        return True
+    if BARE_PAGE_NUMBER_PATTERN.match(line) and position in (0, count - 1):
+        return True
+    if _is_mostly_numbers(line):
+        return False
+    exact, edge = repeated
+    if _exact_line(line) in exact:
+        return True
+    return _is_edge(position, count) and _normalize_line(line) in edge
+
+
+def is_address_line(line):
+    """Check if a line looks like an address or contact detail"""
+    if any(pattern.search(line) for pattern in ADDRESS_PATTERNS):
+        return True
+    street = STREET_CONTEXT.search(line)
+    if PIN_PATTERN.search(line) and (street or CITY_CONTEXT.search(line)):
+        return True
+    return bool(COUNTRY_PATTERN.search(line) and (street or PIN_PATTERN.search(line)))
+
+
+def split_segments(text):
+    """Split extracted text into cleaned segments, dropping repeated headers/footers and addresses"""
+    pages = text.split(PAGE_SEPARATOR)
+    repeated = find_repeated_lines(pages)
+
+    segments = []
+    for page in pages:
+        current = []
+        count = len(_page_lines(page))
+        position = 0
+        for line in page.splitlines() + ['']:
+            stripped = line.strip()
+
+            # Blank line (or end of page) closes the current paragraph
+            if not stripped:
+                if current:
+                    segments.extend(_chunk_paragraph(current))
+                    current = []
+                continue
+
+            position += 1
+            if is_repeated_line(stripped, position - 1, count, repeated) or is_address_line(stripped):
+                continue
+
+            current.append(stripped)
+
+    return segments
+
+
+def _chunk_paragraph(lines):
+    """Join paragraph lines, splitting long paragraphs on line boundaries"""
+    chunks = []
+    current = []
+    length = 0
+
+    for line in lines:
+        if current and length + len(line) > MAX_SEGMENT_CHARS:
+            chunks.append(' '.join(current))
+            current = []
+            length = 0
+        current.append(line)
+        length += len(line) + 1
+
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def score_segment(segment):
+    """Score a segment for financial relevance (higher is more useful to the LLM)"""
+    lower = segment.lower()
+
+    score = sum(weight for pattern, weight in FINANCIAL_TERM_PATTERNS if pattern.search(lower))
+    score -= 2 * sum(1 for pattern in BOILERPLATE_PATTERNS if pattern.search(lower))
+
+    # Substantive prose beats one-line fragments
+    score += min(len(segment) / 200, 3)
+
+    # Results tables are number-dense; reward that (capped so tables don't crowd out text)
+    words = segment.split()
+    if words:
+        numeric_ratio = len(NUMBER_PATTERN.findall(segment)) / len(words)
+        score += min(numeric_ratio * 10, 5)
+    if '%' in segment:
+        score += 1
+
+    # The subject line says what the filing is about
+    if SUBJECT_PATTERN.match(segment):
+        score += 5
+
+    return score
+
+
+def select_relevant_text(text, token_budget=None):
+    """
+    Pick the most relevant segments of an announcement within a token budget
+
+    Segments are ranked by relevance per token, packed greedily into the
+    budget and returned in their original document order.
+    """
+    token_budget = token_budget or DEFAULT_TOKEN_BUDGET
+    if not text:
+        return ''
+
+    segments = split_segments(text)
+    if not segments:
+        return ''
+
+    scores = [score_segment(segment) for segment in segments]
+    tokens = [estimate_tokens(segment) for segment in segments]
+    ranked = sorted(range(len(segments)), key=lambda i: scores[i] / tokens[i], reverse=True)
+
+    chosen = []
+    used_tokens = 0
+    for i in ranked:
+        # Never spend budget on boilerplate once something useful is in
+        if scores[i] < 0 and chosen:
+            break
+        if used_tokens + tokens[i] > token_budget:
+            continue
+        chosen.append(i)
+        used_tokens += tokens[i]
+
+    return '\n\n'.join(segments[i] for i in sorted(chosen))
@@ -0,0 +1,138 @@
+"""
+Exchange Trading Calendar
+NSE/BSE trading days, sessions and F&O monthly expiry dates from a local holiday file
+"""
+
+import json
+import os
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+HOLIDAYS_FILE = os.environ.get('TRADING_HOLIDAYS_FILE', os.path.join('resources', 'trading_holidays.json'))
+
+# Session window used for polling (includes the 9:00-9:15 pre-open)
+SESSION_START = time(9, 0)
+SESSION_END = time(15, 30)
+
+# SEBI moved NSE monthly stock/index derivative expiry from last Thursday to last Tuesday
+EXPIRY_WEEKDAY_CHANGE_DATE = date(2025, 9, 1)
+THURSDAY = 3
+TUESDAY = 1
+
+_holidays = {}  # date -> holiday name
+_special_sessions = {}  # date -> (start time, end time), e.g. Muhurat trading
+_covered_years = set()
+_warned_years = set()
+
+
+def load_holidays(path=HOLIDAYS_FILE):
+    """Load the holiday file (safe to call again after the file is updated)"""
+    global _holidays, _special_sessions, _covered_years
+
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+
+        _holidays = {date.fromisoformat(day): name for day, name in data.get('holidays', {}).items()}
+        _special_sessions = {
+            date.fromisoformat(day): (time.fromisoformat(start), time.fromisoformat(end))
+            for day, (start, end) in data.get('special_sessions', {}).items()
+        }
+        _covered_years = set(data.get('metadata', {}).get('years', [])) or {d.year for d in _holidays}
+        print(f"✅ Loaded {len(_holidays)} trading holidays for {sorted(_covered_years)}")
+    except Exception as e:
+        print(f"⚠️ Could not load trading holidays ({str(e)}), treating only weekends as closed")
+        _holidays, _special_sessions, _covered_years = {}, {}, set()
+
+    is_trading_day.cache_clear()
+    monthly_expiry.cache_clear()
+
+
+def _check_coverage(day):
+    if day.year not in _covered_years and day.year not in _warned_years:
+        _warned_years.add(day.year)
+        print(f"⚠️ No trading holidays for {day.year} in {HOLIDAYS_FILE}, treating only weekends as closed")
+
+
+@lru_cache(maxsize=1024)
+def is_trading_day(day):
+    """Check if a date is a trading day (weekday and not an exchange holiday)"""
+    _check_coverage(day)
+    return day.weekday() < 5 and day not in _holidays
+
+
+def holiday_name(day):
+    """Name of the holiday on a date, or None"""
+    return _holidays.get(day)
+
+
+def is_trading_session(now):
+    """Check if the market is open at a datetime (regular hours on trading days, or a special session)"""
+    day = now.date()
+    special = _special_sessions.get(day)
+    if special and special[0] <= now.time() <= special[1]:
+        return True
+    return is_trading_day(day) and SESSION_START <= now.time() <= SESSION_END
+
+
+def next_trading_day(day, include_today=True):
+    """First trading day on or after (or strictly after) a date"""
+    if not include_today:
+        day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def previous_trading_day(day, include_today=True):
+    """Last trading day on or before (or strictly before) a date"""
+    if not include_today:
+        day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def next_session_start(now):
+    """Datetime the next regular session opens (keeps now's timezone)"""
+    day = now.date()
+    if not (now.time() < SESSION_START and is_trading_day(day)):
+        day = next_trading_day(day, include_today=False)
+
+    start = datetime.combine(day, SESSION_START)
+    if now.tzinfo is None:
+        return start
+    if hasattr(now.tzinfo, 'localize'):  # pytz
+        return now.tzinfo.localize(start)
+    return start.replace(tzinfo=now.tzinfo)
+
+
+def expiry_weekday(day):
+    """Scheduled monthly expiry weekday for the month containing a date"""
+    return TUESDAY if day >= EXPIRY_WEEKDAY_CHANGE_DATE else THURSDAY
+
+
+@lru_cache(maxsize=256)
+def monthly_expiry(year, month):
+    """Monthly F&O expiry: last Tuesday (Thursday before Sep 2025), moved to the previous trading day on holidays"""
+    if month == 12:
+        last = date(year, 12, 31)
+    else:
+        last = date(year, month + 1, 1) - timedelta(days=1)
+
+    weekday = expiry_weekday(last)
+    scheduled = last - timedelta(days=(last.weekday() - weekday) % 7)
+    return previous_trading_day(scheduled)
+
+
+def next_monthly_expiry(day=None):
+    """Current month's expiry if it hasn't passed, otherwise next month's"""
+    day = day or date.today()
+    expiry = monthly_expiry(day.year, day.month)
+    if expiry < day:
+        year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+        expiry = monthly_expiry(year, month)
+    return expiry
+
+
+load_holidays()
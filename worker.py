@@ -0,0 +1,190 @@
+"""
+Ingestion Worker
+Runs the announcement poller, notifications and digests - exactly one active instance per host
+
+Usage:
+    python worker.py
+
+Any number of workers may be started (e.g. one per web server); a file lock
+elects one leader and the others wait on standby, taking over if it exits.
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+import pytz
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_FILE = os.path.join(os.environ.get('STATE_DIR', 'state'), 'poller.lock')
+
+# Standby workers retry the leader lock this often
+STANDBY_RETRY_SECONDS = 30
+
+# How often the leader publishes poller/notification status for the web app
+STATUS_INTERVAL_SECONDS = 15
+
+
+def try_acquire_leadership(lock_path=LOCK_FILE):
+    """Take the poller lock without blocking; returns the open lock file, or None if another worker holds it"""
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    lock_file = open(lock_path, 'a+')
+
+    try:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        lock_file.close()
+        return None
+
+    # Record the leader's PID for operators (the lock itself is what matters)
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(f"{os.getpid()}\n")
+    lock_file.flush()
+    return lock_file
+
+
+def wait_for_leadership(lock_path=LOCK_FILE):
+    """Block until this process is the leader (the lock is released automatically if the leader dies)"""
+    lock_file = try_acquire_leadership(lock_path)
+    if lock_file:
+        return lock_file
+
+    print(f"⏸️ Another worker holds {lock_path}, waiting on standby...")
+    while lock_file is None:
+        time.sleep(STANDBY_RETRY_SECONDS)
+        lock_file = try_acquire_leadership(lock_path)
+    return lock_file
+
+
+def run():
+    """Become leader, then run the poller and digest jobs until the process exits"""
+    lock_file = wait_for_leadership()
+    print(f"👑 Worker {os.getpid()} is the active poller")
+
+    # Imported after election so standby workers stay idle (no DB, no integrations)
+    import reference_data
+    import ingestion
+    import notifications
+    import notification_rules
+    import polling_service
+    import shared_state
+    import market_cap_data
+    import instruments_master
+
+    # The worker is the only process that downloads NSE index lists
+    reference_data.load_all(fetch_indices=True)
+    reference_data.start_watcher(fetch_indices=True)
+
+    scheduler = BackgroundScheduler(timezone=pytz.timezone('Asia/Kolkata'))
+
+    # One single-flight polling job. Interval adapts to the arrival rate of
+    # new filings: 10s floor, at most 1 minute during market hours (9:00-15:30
+    # IST on trading days) and 15 minutes otherwise, within the hourly BSE
+    # request budget
+    poller = polling_service.PollingService(
+        scheduler, ingestion.auto_check_and_notify, polling_service.AdaptivePollingPolicy()
+    )
+    poller.start()
+
+    # Digest: announcements buffered inside DIGEST_WINDOWS go out as one summary per interval
+    scheduler.add_job(
+        notifications.flush_digest,
+        IntervalTrigger(minutes=notifications.DIGEST_INTERVAL_MINUTES, timezone='Asia/Kolkata'),
+        id='notification_digest',
+        name=f'Notification Digest (Every {notifications.DIGEST_INTERVAL_MINUTES} min)',
+        max_instances=1,
+        coalesce=True
+    )
+
+    # Nightly market cap refresh, so polls during the day only fetch codes never seen before
+    scheduler.add_job(
+        market_cap_data.refresh_all_market_caps,
+        CronTrigger(hour=2, minute=0, timezone='Asia/Kolkata'),
+        id='market_cap_refresh',
+        name='Market Cap Refresh (Nightly 2:00 AM)',
+        max_instances=1,
+        coalesce=True
+    )
+
+    # Upstox instruments: conditional download once the day's file is published (8:00 AM IST).
+    # The first run starts with the scheduler, alongside the first poll instead of before it (a cold
+    # start downloads and builds the whole store); the reference data watcher then picks up the new
+    # store for the security master
+    scheduler.add_job(
+        instruments_master.refresh,
+        CronTrigger(hour=8, minute=15, timezone='Asia/Kolkata'),
+        id='instruments_refresh',
+        name='Upstox Instruments Refresh (Daily 8:15 AM)',
+        next_run_time=datetime.now(pytz.timezone('Asia/Kolkata')),
+        max_instances=1,
+        coalesce=True
+    )
+
+    def publish_status():
+        try:
+            shared_state.write_state(shared_state.WORKER_STATUS_FILE, {
+                'leader_pid': os.getpid(),
+                'polling': poller.get_status(),
+                'notifications': notifications.get_stats()
+            })
+        except Exception as e:
+            print(f"❌ Error publishing worker status: {str(e)}")
+
+    scheduler.add_job(
+        publish_status,
+        IntervalTrigger(seconds=STATUS_INTERVAL_SECONDS),
+        id='worker_status',
+        name='Worker Status',
+        max_instances=1,
+        coalesce=True
+    )
+
+    print("\n" + "="*80)
+    print("🔔 AUTO-NOTIFICATION SCHEDULER CONFIGURED")
+    print("="*80)
+    print(f"⚡ Adaptive polling: every {polling_service.ADAPTIVE_FLOOR_SECONDS}s when filings are arriving")
+    print("🟢 Market Hours (9:00 AM - 3:30 PM IST, trading days): At least every 1 minute")
+    print(f"🟡 Non-Market Hours (3:31 PM - 8:59 AM IST, weekends & holidays): At least every {polling_service.ADAPTIVE_CEILING_SECONDS // 60} minutes")
+    print(f"🧮 BSE request budget: {polling_service.BSE_HOURLY_REQUEST_BUDGET} requests/hour")
+    print("🔒 Single-flight: one polling job, runs never overlap")
+    print(f"🎯 Auto-send: routed by {notification_rules.NOTIFICATION_RULES_FILE}")
+    print(f"📈 Market caps: cached {market_cap_data.MARKET_CAP_TTL_HOURS:g}h in {market_cap_data.MARKET_CAP_CACHE_FILE}, refreshed nightly at 2:00 AM")
+    print(f"🧾 Upstox instruments: {instruments_master.INSTRUMENTS_FILE}, refreshed once per trading day (8:15 AM IST)")
+    print(f"🗞️ Digest windows (IST): {notifications.DIGEST_WINDOWS or 'disabled'} - sent every {notifications.DIGEST_INTERVAL_MINUTES} minutes")
+    print("="*80 + "\n")
+
+    scheduler.start()
+
+    # Run initial check
+    print("🚀 Running initial announcement check...")
+    poller.run_once()
+    publish_status()
+
+    try:
+        while True:
+            time.sleep(3600)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        scheduler.shutdown()
+        # Try to send the buffered digest now (it stays in state/ if this does not finish)
+        if notifications.flush_digest():
+            notifications.wait_for_delivery()
+        lock_file.close()
+
+
+if __name__ == '__main__':
+    sys.exit(run())